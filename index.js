@@ -3,8 +3,11 @@ const cors = require("cors");
 const multer = require("multer");
 const path = require("path");
 const fs = require("fs");
+const crypto = require("crypto");
 const { PythonShell } = require("python-shell");
 const { spawn } = require("child_process");
+const { PythonPool } = require("./python-pool");
+const { JobQueue } = require("./job-queue");
 
 const app = express();
 const PORT = 5000;
@@ -13,7 +16,7 @@ const PORT = 5000;
 const corsOptions = {
  // origin: "*",
   origin: "https://xrd-4bgx.onrender.com",  
-  methods: ["GET", "POST", "PUT", "DELETE"],
+  methods: ["GET", "POST", "PUT", "PATCH", "DELETE"],
   credentials: true,
   allowedHeaders: ["Origin", "X-Requested-With", "Content-Type", "Accept"],
 };
@@ -24,9 +27,318 @@ app.use(express.urlencoded({ extended: true }));
 // File upload directory
 const uploadDir = path.join(__dirname, "uploads");
 const outputDir = path.join(__dirname, "outputs");
+const cacheDir = process.env.XRD_CACHE_DIR || path.join(__dirname, "cache");
 if (!fs.existsSync(uploadDir)) fs.mkdirSync(uploadDir, { recursive: true });
 if (!fs.existsSync(outputDir)) fs.mkdirSync(outputDir, { recursive: true });
 
+// Pre-warmed Python analysis workers (XRD_POOL_SIZE defaults to the CPU
+// count, at most 4); a job running over XRD_WORKER_TIMEOUT_MS (default 10
+// minutes) kills its worker
+//"./venv/bin/python"   // path for server execution on railway.com
+const workerTimeoutMs = Number(process.env.XRD_WORKER_TIMEOUT_MS) || 10 * 60 * 1000;
+const pythonPool = new PythonPool({
+  python: process.env.PYTHON || "./venv/bin/python",
+  script: "./python_scripts/process_xrd.py",
+  size: process.env.XRD_POOL_SIZE,
+  timeoutMs: workerTimeoutMs,
+  // Analysis results and artifacts are cached by file content + parameters
+  env: { XRD_CACHE_DIR: cacheDir },
+}).start();
+
+// Plots of /process analyses are drawn afterwards on their own workers, one
+// artifact per task, so the numbers never wait for matplotlib and the
+// formats render in parallel (XRD_RENDER_POOL_SIZE, default 2: each worker
+// holds a full matplotlib on top of the analysis workers' memory)
+const renderPool = new PythonPool({
+  python: process.env.PYTHON || "./venv/bin/python",
+  script: "./python_scripts/process_xrd.py",
+  size: Number(process.env.XRD_RENDER_POOL_SIZE) || 2,
+  timeoutMs: workerTimeoutMs,
+  env: { XRD_CACHE_DIR: cacheDir },
+  name: "render worker",
+}).start();
+
+// Analyses (/process, /compare, sessions): one fewer run at a time than
+// there are workers, so a worker stays free for the read lane below.
+// XRD_MAX_QUEUED_JOBS wait (beyond that they answer 429), a job running
+// over XRD_JOB_TIMEOUT_MS fails, and finished jobs are kept for
+// XRD_JOB_TTL_MS to be polled at GET /jobs/:id. Every lane hands its
+// tasks the timeout's AbortSignal, and the pool kills the worker of a job
+// that timed out, so a freed slot always means a free worker.
+const jobTimeoutMs = Number(process.env.XRD_JOB_TIMEOUT_MS) || workerTimeoutMs;
+const jobQueue = new JobQueue({
+  concurrency: Math.max(1, pythonPool.size - 1),
+  maxQueued: Number(process.env.XRD_MAX_QUEUED_JOBS) || 32,
+  ttlMs: Number(process.env.XRD_JOB_TTL_MS) || 60 * 60 * 1000,
+  timeoutMs: jobTimeoutMs,
+});
+
+// Cheap pool calls (ingest at upload, /data windows, closing sessions) have
+// their own lane, so they never wait behind a queue of analyses;
+// XRD_MAX_QUEUED_READS wait and each gets XRD_READ_TIMEOUT_MS (default 2
+// minutes, enough to ingest the largest upload)
+const readQueue = new JobQueue({
+  concurrency: pythonPool.size,
+  maxQueued: Number(process.env.XRD_MAX_QUEUED_READS) || 64,
+  ttlMs: 60 * 1000,
+  timeoutMs: Number(process.env.XRD_READ_TIMEOUT_MS) || 2 * 60 * 1000,
+});
+
+// /stream runs stream_xrd.py outside the pool: XRD_MAX_STREAMS at a time,
+// XRD_MAX_QUEUED_STREAMS waiting
+const streamQueue = new JobQueue({
+  concurrency: Number(process.env.XRD_MAX_STREAMS) || 2,
+  maxQueued: Number(process.env.XRD_MAX_QUEUED_STREAMS) || 4,
+  ttlMs: 60 * 1000,
+  timeoutMs: jobTimeoutMs,
+});
+
+// Renders have a lane of their own in front of the render workers. A
+// /process job reserves room in it for its plots when it is accepted (and
+// answers 429 when there is none), so the plots are never turned away once
+// the numbers are in. XRD_MAX_QUEUED_RENDERS plots wait at most.
+const renderQueue = new JobQueue({
+  concurrency: renderPool.size,
+  maxQueued: Number(process.env.XRD_MAX_QUEUED_RENDERS) || 64,
+  ttlMs: 60 * 1000,
+  timeoutMs: jobTimeoutMs,
+});
+let reservedRenders = 0;
+
+// Run task(signal) in a queue's lane; resolves with its result, or null at
+// once when the lane is full (the caller answers 429, see queueFull)
+const runQueued = (queue, task, meta) => {
+  const job = queue.submit(task, meta);
+  if (!job) return null;
+  return job.done.then((finished) => {
+    if (finished.status === "failed") throw new Error(finished.error);
+    return finished.result;
+  });
+};
+
+// 429 with a rough Retry-After: the queue drains concurrency jobs per mean run time
+const queueFull = (res, queue, message) => {
+  const { queued, concurrency, mean_run_ms: meanRunMs } = queue.summary();
+  res.set("Retry-After", String(Math.max(1, Math.ceil((queued / concurrency) * meanRunMs / 1000))));
+  return res.status(429).json({ error: message });
+};
+
+// Status of a job as the API reports it, with the results once done
+const jobStatus = (job) => {
+  const status = {
+    job: job.id,
+    status: job.status,
+    file: job.fileName,
+    timing: jobQueue.timing(job),
+  };
+  if (job.files) status.files = job.files;
+  if (job.status === "queued") status.position = jobQueue.position(job);
+  if (job.status === "done") Object.assign(status, job.result);
+  if (job.artifacts && Object.keys(job.artifacts).length) status.artifacts = job.artifacts;
+  if (job.status === "failed") status.error = job.error;
+  return status;
+};
+
+// Scan store: each upload is converted once by a worker into a hidden
+// .<file>.npy copy (2θ, intensity and running integral as float64 rows) that
+// the analyses memory-map, .<file>.json metadata (points, 2θ range, step)
+// that GET /upload?details=true serves and the .<file>.pyramid.npy min/max
+// pyramid behind GET /data. Uploads the store doesn't know yet, or that
+// changed since, are converted when first listed or analyzed.
+const ingesting = new Map();
+// file@mtime of uploads that failed to convert, not retried until they change
+const unreadableUploads = new Set();
+const ingestUpload = (fileName) => {
+  if (!ingesting.has(fileName)) {
+    const queued = runQueued(
+      readQueue,
+      (signal) => pythonPool.runTask("ingest", { file_path: path.join(uploadDir, fileName) }, { signal }),
+      { fileName }
+    );
+    // A full lane leaves the upload to be converted when next listed or analyzed
+    const busy = Object.assign(new Error("Too many uploads being converted"), { code: "EBUSY" });
+    const done = (queued || Promise.reject(busy))
+      .then((reply) => {
+        if (!reply.ok) throw new Error(reply.error);
+        return reply.results;
+      })
+      .finally(() => ingesting.delete(fileName));
+    ingesting.set(fileName, done);
+  }
+  return ingesting.get(fileName);
+};
+
+const scanMetadataPath = (fileName) => path.join(uploadDir, `.${fileName}.json`);
+
+// One upload as GET /upload?details=true lists it; scan is null until ingested
+const uploadDetails = async (fileName) => {
+  const stat = await fs.promises.stat(path.join(uploadDir, fileName));
+  const details = { file: fileName, size: stat.size, modified: stat.mtime.toISOString(), scan: null };
+  try {
+    const metaPath = scanMetadataPath(fileName);
+    if ((await fs.promises.stat(metaPath)).mtimeMs >= stat.mtimeMs) {
+      details.scan = JSON.parse(await fs.promises.readFile(metaPath, "utf8"));
+    }
+  } catch (error) {
+    if (error.code !== "ENOENT") console.error(`Bad scan metadata for ${fileName}:`, error.message);
+  }
+  const version = `${fileName}@${stat.mtimeMs}`;
+  if (!details.scan && !unreadableUploads.has(version)) {
+    ingestUpload(fileName).catch((error) => {
+      if (error.code !== "EBUSY") unreadableUploads.add(version);
+    });
+  }
+  return details;
+};
+
+// Draw each artifact of an analysis on the render workers from the plot data
+// it saved (deferred_render), recording { status, file } per artifact in
+// artifacts as they finish; artifacts the cache restored are ready at once.
+// Renders go through renderQueue; one it turns away fails. Resolves when all
+// are settled, and the plot data is deleted then.
+const renderArtifacts = (artifacts, files, deferred, render) => {
+  const pending = Object.entries(files).map(([artifact, file]) => {
+    artifacts[artifact] = { status: deferred ? "rendering" : "ready", file: path.basename(file) };
+    if (!deferred) return null;
+    const rendering = runQueued(
+      renderQueue,
+      (signal) =>
+        renderPool.runTask(
+          "render",
+          {
+            plot_data: deferred.plot_data,
+            artifact,
+            path: file,
+            render_mode: render.mode,
+            dpi: render.dpi,
+            figsize: render.figsize,
+            cache_key: deferred.cache_key,
+          },
+          { signal }
+        ),
+      { fileName: artifacts[artifact].file }
+    );
+    if (!rendering) {
+      artifacts[artifact].status = "failed";
+      artifacts[artifact].error = "Too many plots waiting to render. Try again later.";
+      renderTimes.rejected++;
+      return null;
+    }
+    return rendering
+      .then((reply) => {
+        if (!reply.ok) throw new Error(reply.error);
+        artifacts[artifact].status = "ready";
+        artifacts[artifact].render_ms = reply.results.timing.wall_ms;
+        renderTimes.rendered++;
+        renderTimes.wall_ms += reply.results.timing.wall_ms;
+        renderTimes.max_wall_ms = Math.max(renderTimes.max_wall_ms, reply.results.timing.wall_ms);
+      })
+      .catch((error) => {
+        console.error(`Rendering ${artifacts[artifact].file} failed:`, error.message);
+        artifacts[artifact].status = "failed";
+        artifacts[artifact].error = "Rendering failed. See server logs for details.";
+        renderTimes.failed++;
+      });
+  });
+  return Promise.all(pending).then(() => {
+    if (deferred) fs.unlink(deferred.plot_data, () => {});
+    evictOutputs();
+  });
+};
+
+// Result cache hit/miss counters, aggregated over all workers
+const cacheStats = { hits: 0, misses: 0 };
+
+// outputs/ is bounded like the result cache: past XRD_OUTPUTS_MAX_MB
+// (default 500) the least recently used files are deleted. A file's mtime
+// is its last use: written by an analysis or downloaded from
+// /outputs/:fileName. Hidden files are plot data the render workers still need.
+const OUTPUTS_MAX_BYTES = (Number(process.env.XRD_OUTPUTS_MAX_MB) || 500) * 2 ** 20;
+const outputStats = { evictions: 0 };
+let evictingOutputs = null;
+const evictOutputs = () => {
+  if (!evictingOutputs) {
+    evictingOutputs = (async () => {
+      const files = [];
+      let total = 0;
+      for (const name of await fs.promises.readdir(outputDir)) {
+        if (name.startsWith(".")) continue;
+        const stat = await fs.promises.stat(path.join(outputDir, name)).catch(() => null);
+        if (!stat || !stat.isFile()) continue;
+        files.push({ name, size: stat.size, used: stat.mtimeMs });
+        total += stat.size;
+      }
+      files.sort((a, b) => a.used - b.used);
+      for (const file of files) {
+        if (total <= OUTPUTS_MAX_BYTES) break;
+        await fs.promises.unlink(path.join(outputDir, file.name)).catch(() => {});
+        total -= file.size;
+        outputStats.evictions++;
+      }
+    })()
+      .catch((error) => console.error("Error evicting outputs:", error.message))
+      .finally(() => {
+        evictingOutputs = null;
+      });
+  }
+  return evictingOutputs;
+};
+setInterval(evictOutputs, 60 * 1000).unref();
+
+// Per-stage timing reported by the analyses (results.timing), aggregated
+// since startup: stage -> { calls, wall_ms, cpu_ms, max_wall_ms }. Analyses
+// slower than XRD_SLOW_ANALYSIS_MS are logged as warnings. Memory is the
+// workers' process-lifetime peak RSS (a high-water mark, not per job) and
+// the most any one analysis raised it.
+const stageTimes = new Map();
+const analysisTimes = {
+  analyses: 0,
+  wall_ms: 0,
+  max_wall_ms: 0,
+  process_peak_rss_mb: 0,
+  max_peak_rss_growth_mb: 0,
+};
+// Artifacts drawn by the render workers, off the analysis path
+const renderTimes = { rendered: 0, failed: 0, rejected: 0, wall_ms: 0, max_wall_ms: 0 };
+const SLOW_ANALYSIS_MS = Number(process.env.XRD_SLOW_ANALYSIS_MS) || 2000;
+// cProfile dumps of every /process analysis go here when set (debugging only)
+const profileDir = process.env.XRD_PROFILE_DIR;
+if (profileDir && !fs.existsSync(profileDir)) fs.mkdirSync(profileDir, { recursive: true });
+
+const recordTiming = (label, timing) => {
+  if (!timing) return;
+  for (const [name, stage] of Object.entries(timing.stages)) {
+    const totals = stageTimes.get(name) || { calls: 0, wall_ms: 0, cpu_ms: 0, max_wall_ms: 0 };
+    totals.calls += stage.calls;
+    totals.wall_ms += stage.wall_ms;
+    totals.cpu_ms += stage.cpu_ms;
+    totals.max_wall_ms = Math.max(totals.max_wall_ms, stage.wall_ms);
+    stageTimes.set(name, totals);
+  }
+  analysisTimes.analyses++;
+  analysisTimes.wall_ms += timing.wall_ms;
+  analysisTimes.max_wall_ms = Math.max(analysisTimes.max_wall_ms, timing.wall_ms);
+  if (timing.process_peak_rss_mb) {
+    analysisTimes.process_peak_rss_mb = Math.max(analysisTimes.process_peak_rss_mb, timing.process_peak_rss_mb);
+    analysisTimes.max_peak_rss_growth_mb = Math.max(
+      analysisTimes.max_peak_rss_growth_mb,
+      timing.peak_rss_growth_mb
+    );
+  }
+
+  const slowest = Object.entries(timing.stages)
+    .sort((a, b) => b[1].wall_ms - a[1].wall_ms)
+    .slice(0, 3)
+    .map(([name, stage]) => `${name} ${stage.wall_ms.toFixed(1)}ms`)
+    .join(", ");
+  const rss = timing.process_peak_rss_mb
+    ? `, worker peak RSS ${timing.process_peak_rss_mb.toFixed(0)} MB (+${timing.peak_rss_growth_mb.toFixed(0)} MB)`
+    : "";
+  const line = `Timing ${label}: ${timing.wall_ms.toFixed(1)}ms (${slowest})${rss}`;
+  if (timing.wall_ms > SLOW_ANALYSIS_MS) console.warn(`Slow analysis. ${line}`);
+  else console.log(line);
+};
+
 // Multer setup
 const storage = multer.diskStorage({
   destination: (req, file, cb) => cb(null, uploadDir),
@@ -38,9 +350,229 @@ const storage = multer.diskStorage({
     );
   },
 });
-const upload = multer({ storage, limits: { fileSize: 50 * 1024 * 1024 } });
+// Multi-frame in-situ exports can be large; XRD_MAX_UPLOAD_MB raises the limit
+const maxUploadMb = Number(process.env.XRD_MAX_UPLOAD_MB) || 50;
+const upload = multer({ storage, limits: { fileSize: maxUploadMb * 1024 * 1024 } });
+
+// The frontend posts React refs ({ current: value }); plain values work too
+const param = (body, name) => {
+  const value = body[name];
+  return value !== null && typeof value === "object" && "current" in value
+    ? value.current
+    : value;
+};
+
+// Optional numeric parameter: undefined when absent, NaN when not a number
+const optionalNumber = (body, name) => {
+  const value = param(body, name);
+  return value === undefined || value === null || value === ""
+    ? undefined
+    : Number(value);
+};
+
+const RENDER_FORMATS = ["png", "pdf", "svg"];
+const RENDER_MODES = ["full", "preview", "thumbnail"];
+const BASELINE_METHODS = ["min", "rolling", "poly", "asls"];
+// Peak profiles the analysis can fit (process_xrd --fit)
+const FIT_PROFILES = ["pseudo_voigt", "gaussian", "lorentzian"];
+
+// Points per GET /data response: the default, and the most a client may ask for
+const DEFAULT_DATA_POINTS = 2000;
+const MAX_DATA_POINTS = Number(process.env.XRD_MAX_DATA_POINTS) || 20000;
+
+// Most uploads one POST /compare report may include
+const MAX_COMPARE_SCANS = Number(process.env.XRD_MAX_COMPARE_SCANS) || 50;
+
+// Parse the requested render formats ("png,svg" or ["png", "svg"])
+const parseFormats = (value) => {
+  if (value === undefined || value === null || value === "") return ["png", "pdf"];
+  const formats = (Array.isArray(value) ? value : String(value).split(","))
+    .map((format) => String(format).trim().toLowerCase())
+    .filter(Boolean);
+  return formats.every((format) => RENDER_FORMATS.includes(format))
+    ? [...new Set(formats)]
+    : null;
+};
+
+// Parse render_mode, dpi and width/height (inches): { render } or { error }
+const parseRenderOptions = (body, defaultMode = "full") => {
+  const mode = param(body, "render_mode") || defaultMode;
+  if (!RENDER_MODES.includes(mode))
+    return { error: `render_mode must be one of ${RENDER_MODES.join(", ")}` };
+  const render = { mode };
+  const dpi = optionalNumber(body, "dpi");
+  if (dpi !== undefined) {
+    if (!(dpi > 0 && dpi <= 600)) return { error: "dpi must be a number in (0, 600]" };
+    render.dpi = dpi;
+  }
+  const width = optionalNumber(body, "width");
+  const height = optionalNumber(body, "height");
+  if (width !== undefined || height !== undefined) {
+    if (!(width > 0 && width <= 40 && height > 0 && height <= 40))
+      return { error: "width and height must both be given, in inches (up to 40)" };
+    render.figsize = [width, height];
+  }
+  return { render };
+};
+
+// Parse crystallinity windows ([[min, max], ...] in degrees); null when invalid
+const parseWindows = (value) => {
+  if (value === undefined || value === null || value === "") return [];
+  if (!Array.isArray(value)) return null;
+  const windows = value.map((window) =>
+    Array.isArray(window) && window.length === 2 ? window.map(Number) : null
+  );
+  return windows.every((window) => window && window.every(Number.isFinite) && window[0] <= window[1])
+    ? windows
+    : null;
+};
+
+// Numeric analysis parameters of the session endpoints (request -> worker name).
+// As on /process and the command lines, theta_distance is the minimum peak
+// separation in samples of the scan and theta_distance_deg in degrees of 2θ
+const ANALYSIS_NUMBERS = {
+  min_theta: "min_theta",
+  max_theta: "max_theta",
+  min_peak_intensity: "min_intensity",
+  theta_distance: "theta_distance",
+  theta_distance_deg: "theta_distance_deg",
+  prominence: "prominence",
+  min_width: "min_width",
+  wavelength: "wavelength",
+  scherrer_k: "scherrer_k",
+  instrument_broadening: "instrument_broadening",
+  phase_matches: "phase_matches",
+  match_tolerance: "match_tolerance",
+};
+
+// Collect the analysis parameters present in body: { params } or { error }
+const parseAnalysisParams = (body) => {
+  const params = {};
+  for (const [name, key] of Object.entries(ANALYSIS_NUMBERS)) {
+    const value = optionalNumber(body, name);
+    if (value === undefined) continue;
+    if (!Number.isFinite(value)) return { error: `${name} must be a number` };
+    params[key] = value;
+  }
+  // A sample count wins over degrees, so degrees alone clear one set before
+  if (params.theta_distance_deg !== undefined && params.theta_distance === undefined)
+    params.theta_distance = null;
+  const baselineMethod = param(body, "baseline_method");
+  if (baselineMethod !== undefined && baselineMethod !== null && baselineMethod !== "") {
+    if (!BASELINE_METHODS.includes(baselineMethod))
+      return { error: `baseline_method must be one of ${BASELINE_METHODS.join(", ")}` };
+    params.baseline_method = baselineMethod;
+  }
+  const baselineOptions = param(body, "baseline_options");
+  if (baselineOptions !== undefined && baselineOptions !== null) {
+    if (
+      typeof baselineOptions !== "object" ||
+      !Object.values(baselineOptions).every((value) => Number.isFinite(Number(value)))
+    )
+      return { error: "baseline_options must map option names to numbers" };
+    params.baseline_options = baselineOptions;
+  }
+  if (param(body, "windows") !== undefined) {
+    const windows = parseWindows(param(body, "windows"));
+    if (!windows) return { error: "windows must be a list of [min_theta, max_theta] pairs" };
+    params.windows = windows;
+  }
+  const fitProfile = param(body, "fit_profile");
+  if (fitProfile !== undefined && fitProfile !== "") {
+    if (fitProfile !== null && !FIT_PROFILES.includes(fitProfile))
+      return { error: `fit_profile must be one of ${FIT_PROFILES.join(", ")}` };
+    params.fit_profile = fitProfile;
+  }
+  return { params };
+};
+
+// Interactive analysis sessions: id -> { fileName, params, lastUsed }.
+// The scan and its computed stages stay in memory on one worker, so a
+// parameter change only recomputes the stages it affects.
+const sessions = new Map();
+const SESSION_IDLE_MS = Number(process.env.XRD_SESSION_IDLE_MS) || 30 * 60 * 1000;
+setInterval(() => {
+  const now = Date.now();
+  for (const [id, session] of sessions) {
+    if (now - session.lastUsed < SESSION_IDLE_MS) continue;
+    sessions.delete(id);
+    closeSession(id);
+  }
+}, 60 * 1000).unref();
+
+// Free a session's memory on its worker, in the read lane. When the lane is
+// full the worker's own limit (XRD_MAX_SESSIONS) evicts it eventually.
+const closeSession = (id) => {
+  const closed = runQueued(readQueue, (signal) => pythonPool.closeSession(id, { signal }), { session: id });
+  if (!closed) return console.error(`Read lane full; session ${id} is left to the worker to evict.`);
+  closed.catch((error) => console.error("Error closing session:", error));
+};
+
+// Run a session with params (its parameters once this run succeeds);
+// renders only the formats in body.render ("png", "png,svg", ...), as
+// previews unless render_mode says otherwise, and answers with the peak
+// list JSON. Parameters the analysis rejects answer 400 and leave the
+// session as it was; a new session that fails is not kept.
+const analyzeSession = (res, id, session, params, body, status = 200) => {
+  const opening = !sessions.has(id);
+  const requested = param(body, "render");
+  const formats =
+    requested === undefined || requested === null || requested === "" ? [] : parseFormats(requested);
+  if (!formats) {
+    return res
+      .status(400)
+      .json({ error: `render must be a subset of ${RENDER_FORMATS.join(", ")}` });
+  }
+  const { render, error } = parseRenderOptions(body, "preview");
+  if (error) return res.status(400).json({ error });
+  const outputs = {};
+  for (const format of formats) {
+    outputs[format] = path.join(outputDir, `${session.fileName}-${id}.${format}`);
+  }
+  session.lastUsed = Date.now();
+
+  const analysis = runQueued(
+    jobQueue,
+    (signal) =>
+      pythonPool.runSession(
+        id,
+        { file_path: path.join(uploadDir, session.fileName), outputs, render, ...params },
+        { signal }
+      ),
+    { fileName: session.fileName, session: id }
+  );
+  if (!analysis) return queueFull(res, jobQueue, "Too many analyses queued. Try again later.");
+  analysis
+    .then((reply) => {
+      if (reply.log) console.log(`Python script stdout: ${reply.log}`);
+      if (!reply.ok) {
+        if (opening) closeSession(id);
+        // Parameters the analysis rejects are the client's to fix
+        if (reply.error.startsWith("ValueError: "))
+          return res.status(400).json({ error: reply.error.replace(/^ValueError: /, "") });
+        console.error(`Session analysis failed: ${reply.error}`);
+        return res.status(500).json({
+          error: "Failed to analyze the file. See server logs for details.",
+        });
+      }
+      session.params = params;
+      if (opening) sessions.set(id, session);
+      recordTiming(`session ${id}`, reply.results.timing);
+      if (formats.length) evictOutputs();
+      const files = {};
+      for (const [format, file] of Object.entries(outputs)) files[format] = path.basename(file);
+      res.status(status).json({ session: id, results: reply.results, outputs: files });
+    })
+    .catch((error) => {
+      if (opening) closeSession(id);
+      console.error("Error executing the Python script:", error);
+      res.status(500).json({ error: "Error executing the Python script." });
+    });
+};
 
 // Routes
+// ?details=true lists each upload with the size and 2θ range of its scan,
+// read from the metadata written at ingest instead of parsing the CSV
 app.get("/upload", (req, res) => {
   fs.readdir(uploadDir, (err, files) => {
     if (err) {
@@ -48,16 +580,35 @@ app.get("/upload", (req, res) => {
       return res.status(500).json({ message: "Unable to list files." });
     }
     //console.log("Files found:", files);
-    res.json(files);
+    // Hidden files are the scan store (.<file>.npy / .<file>.json), not uploads
+    const uploads = files.filter((file) => !file.startsWith("."));
+    if (param(req.query, "details") !== "true") return res.json(uploads);
+    Promise.all(uploads.map(uploadDetails))
+      .then((details) => res.json(details))
+      .catch((error) => {
+        console.error("Error reading scan metadata:", error);
+        res.status(500).json({ message: "Unable to list files." });
+      });
   });
 });
 
-// Upload a file
+// Upload a file, then convert it into the scan store (see ingestUpload)
 app.post("/upload", upload.single("file"), (req, res) => {
   if (!req.file) return res.status(400).json({ message: "No file uploaded" });
-  res
-    .status(200)
-    .json({ message: "File uploaded successfully!", file: req.file.filename });
+  ingestUpload(req.file.filename)
+    .then((scan) =>
+      res.status(200).json({ message: "File uploaded successfully!", file: req.file.filename, scan })
+    )
+    .catch((error) => {
+      // Kept as uploaded: the analysis reports what is wrong with it
+      console.error(`Could not ingest ${req.file.filename}:`, error.message);
+      res.status(200).json({
+        message: "File uploaded successfully!",
+        file: req.file.filename,
+        scan: null,
+        scan_error: error.message,
+      });
+    });
 });
 // fetch uploaded file
 app.get("/upload/:fileName", (req, res) => {
@@ -74,23 +625,64 @@ app.get("/upload/:fileName", (req, res) => {
   //console.log("Requested file:", fileName);
   //console.log("File path:", filePath);
 
-  // Read the file
-  fs.readFile(filePath, "utf8", (err, data) => {
-    if (err) {
-      if (err.code === "ENOENT") {
-        console.error("File not found:", fileName);
-        return res.status(404).json({ error: "File not found" });
-      }
-
-      console.error("Error reading file:", err.message);
-      return res.status(500).json({ error: "Unable to read the file" });
+  // Stream the file rather than reading it into memory
+  const stream = fs.createReadStream(filePath);
+  stream.on("open", () => stream.pipe(res.type("text/plain")));
+  stream.on("error", (err) => {
+    if (res.headersSent) return res.destroy(err);
+    if (err.code === "ENOENT") {
+      console.error("File not found:", fileName);
+      return res.status(404).json({ error: "File not found" });
     }
 
-    // Send the file content
-    res.type("text/plain").send(data);
+    console.error("Error reading file:", err.message);
+    return res.status(500).json({ error: "Unable to read the file" });
   });
 });
 
+// Plot data of an upload: the points of a 2θ window (min_theta/max_theta,
+// default the whole scan), at most max_points of them. Larger windows are
+// summarized by the min/max pyramid the workers keep per scan, so zooming
+// and panning cost the same on any scan size.
+app.get("/data/:fileName", (req, res) => {
+  const { fileName } = req.params;
+  if (fileName.includes("..") || fileName.includes("/")) {
+    console.error("Invalid file name:", fileName);
+    return res.status(400).json({ error: "Invalid file name" });
+  }
+  const filePath = path.join(uploadDir, fileName);
+  if (!fs.existsSync(filePath)) return res.status(404).json({ error: "File not found" });
+
+  const args = { file_path: filePath, max_points: DEFAULT_DATA_POINTS };
+  for (const name of ["min_theta", "max_theta", "max_points"]) {
+    const value = optionalNumber(req.query, name);
+    if (value === undefined) continue;
+    if (!Number.isFinite(value)) return res.status(400).json({ error: `${name} must be a number` });
+    args[name] = value;
+  }
+  if (!(args.max_points >= 2 && args.max_points <= MAX_DATA_POINTS))
+    return res.status(400).json({ error: `max_points must be between 2 and ${MAX_DATA_POINTS}` });
+  args.max_points = Math.floor(args.max_points);
+
+  const query = runQueued(readQueue, (signal) => pythonPool.runTask("data", args, { signal }), { fileName });
+  if (!query) return queueFull(res, readQueue, "Too many requests queued. Try again later.");
+  query
+    .then((reply) => {
+      if (!reply.ok) {
+        // Scans the pyramid can't serve (e.g. 2θ not increasing) are the client's to fix
+        const invalid = reply.error.startsWith("ValueError");
+        if (!invalid) console.error(`Data query failed: ${reply.error}`);
+        return res.status(invalid ? 422 : 500).json({ error: reply.error });
+      }
+      // Unchanged windows revalidate against the ETag instead of being resent
+      res.set("Cache-Control", "private, no-cache").json({ file: fileName, ...reply.results });
+    })
+    .catch((error) => {
+      console.error("Error executing the Python script:", error);
+      res.status(500).json({ error: "Error executing the Python script." });
+    });
+});
+
 // Process a file using Python
 app.post("/process/:fileName", (req, res) => {
   const { fileName } = req.params;
@@ -100,9 +692,77 @@ app.post("/process/:fileName", (req, res) => {
   const maxTheta = Number(req.body.max_theta.current);
   console.log("max_theta: ", req.body.max_theta.current);
   const minPeakIntensity = Number(req.body.min_peak_intensity.current);
-  const thetaDistance = Number(req.body.theta_distance.current);
+  // Minimum peak separation: theta_distance (the original field) in samples
+  // of the scan, or theta_distance_deg in degrees of 2θ instead
+  const thetaDistanceDeg = optionalNumber(req.body, "theta_distance_deg");
+  const thetaDistanceSamples =
+    thetaDistanceDeg === undefined ? Number(param(req.body, "theta_distance")) : undefined;
+  const formats = parseFormats(param(req.body, "formats"));
+  // Extra 2θ ranges to report the crystallinity of
+  const windows = parseWindows(param(req.body, "windows"));
+  // Plot settings; thumbnail also renders a small PNG for listing pages
+  const { render, error: renderError } = parseRenderOptions(req.body);
+  const thumbnail = Boolean(param(req.body, "thumbnail"));
+  // Optional peak detection (counts, degrees of 2θ), d-spacing / Scherrer
+  // settings (Å, shape factor, degrees) and phase search-match against the
+  // XRD_REFERENCE_DB library (number of phases, 2θ tolerance in degrees)
+  const settings = {
+    prominence: optionalNumber(req.body, "prominence"),
+    min_width: optionalNumber(req.body, "min_width"),
+    wavelength: optionalNumber(req.body, "wavelength"),
+    scherrer_k: optionalNumber(req.body, "scherrer_k"),
+    instrument_broadening: optionalNumber(req.body, "instrument_broadening"),
+    phase_matches: optionalNumber(req.body, "phase_matches"),
+    match_tolerance: optionalNumber(req.body, "match_tolerance"),
+  };
+  // Amorphous background estimate, with optional numeric method options
+  const baselineMethod = param(req.body, "baseline_method") || "min";
+  const baselineOptions = param(req.body, "baseline_options") || {};
+  // Optional peak profile fit (pseudo_voigt, gaussian or lorentzian)
+  const fitProfile = param(req.body, "fit_profile") || null;
   const filePath = path.join(uploadDir, fileName);
 
+  if (!BASELINE_METHODS.includes(baselineMethod)) {
+    return res
+      .status(400)
+      .json({ error: `baseline_method must be one of ${BASELINE_METHODS.join(", ")}` });
+  }
+  if (
+    typeof baselineOptions !== "object" ||
+    !Object.values(baselineOptions).every((value) => Number.isFinite(Number(value)))
+  ) {
+    return res
+      .status(400)
+      .json({ error: "baseline_options must map option names to numbers" });
+  }
+
+  if (!formats) {
+    return res
+      .status(400)
+      .json({ error: `formats must be a subset of ${RENDER_FORMATS.join(", ")}` });
+  }
+  if (fitProfile && !FIT_PROFILES.includes(fitProfile)) {
+    return res
+      .status(400)
+      .json({ error: `fit_profile must be one of ${FIT_PROFILES.join(", ")}` });
+  }
+  if (!windows) {
+    return res
+      .status(400)
+      .json({ error: "windows must be a list of [min_theta, max_theta] pairs" });
+  }
+  if (renderError) return res.status(400).json({ error: renderError });
+  if (thetaDistanceDeg === undefined ? !(thetaDistanceSamples >= 0) : !(thetaDistanceDeg >= 0)) {
+    return res
+      .status(400)
+      .json({ error: "theta_distance (samples) or theta_distance_deg (degrees) must be a number >= 0" });
+  }
+  for (const [name, value] of Object.entries(settings)) {
+    if (value === undefined) delete settings[name];
+    else if (!Number.isFinite(value))
+      return res.status(400).json({ error: `${name} must be a number` });
+  }
+
   // Check if the file exists
   if (!fs.existsSync(filePath)) {
     return res.status(404).json({ error: "File not found" });
@@ -114,61 +774,366 @@ app.post("/process/:fileName", (req, res) => {
     fs.mkdirSync(outputDir, { recursive: true });
   }
 
-  // Define paths for output files
-  const outputImage = path.join(outputDir, `${fileName}-output.png`);
-  const outputPdf = path.join(outputDir, `${fileName}-output.pdf`);
-
-  // Use PythonShell to run the script  important
-  //"./venv/bin/python"   // path for server execution on railway.com
-  const pythonProcess = spawn("./venv/bin/python", [
-    "./python_scripts/process_xrd.py",
-    filePath,
-    outputImage,
-    outputPdf,
-    minTheta,
-    maxTheta,
-    minPeakIntensity,
-    thetaDistance,
-  ]);
-
-  pythonProcess.stdout.on("data", (data) => {
-    console.log(`Python script stdout: ${data}`);
-  });
+  // Define paths for output files. They are named after the job, so two
+  // analyses of one upload never overwrite each other's plots
+  const jobId = crypto.randomUUID();
+  const outputImage = path.join(outputDir, `${fileName}-${jobId}-output.png`);
+  const outputPdf = path.join(outputDir, `${fileName}-${jobId}-output.pdf`);
+  const outputSvg = path.join(outputDir, `${fileName}-${jobId}-output.svg`);
+  const outputJson = path.join(outputDir, `${fileName}-${jobId}-output.json`);
+  const outputThumbnail = path.join(outputDir, `${fileName}-${jobId}-thumbnail.png`);
+  const outputFiles = { png: outputImage, pdf: outputPdf, svg: outputSvg };
+  const outputKeys = { png: "image", pdf: "pdf", svg: "svg" };
+  // What the render workers draw from, deleted once they are done
+  const outputPlotData = path.join(outputDir, `.${fileName}-${jobId}.npz`);
+  // Readiness of each artifact, reported by GET /jobs/:id as they render
+  const artifacts = {};
+  let rendered = Promise.resolve();
 
-  pythonProcess.stderr.on("data", (data) => {
-    console.error(`Python script stderr: ${data}`);
+  // The analysis runs as a queued job on one of the pooled Python workers
+  const analyze = (signal) =>
+    pythonPool
+      .run(
+        {
+          file_path: filePath,
+          output_image: outputImage,
+          output_pdf: outputPdf,
+          min_theta: minTheta,
+          max_theta: maxTheta,
+          min_intensity: minPeakIntensity,
+          theta_distance: thetaDistanceDeg === undefined ? thetaDistanceSamples : null,
+          theta_distance_deg: thetaDistanceDeg,
+          formats,
+          output_svg: outputSvg,
+          output_json: outputJson,
+          ...settings,
+          baseline_method: baselineMethod,
+          baseline_options: baselineOptions,
+          windows,
+          fit_profile: fitProfile,
+          render_mode: render.mode,
+          dpi: render.dpi,
+          figsize: render.figsize,
+          output_thumbnail: thumbnail ? outputThumbnail : undefined,
+          profile: profileDir ? path.join(profileDir, `${fileName}-${Date.now()}.prof`) : undefined,
+          output_plot_data: outputPlotData,
+        },
+        { signal }
+      )
+      .catch((error) => {
+        console.error("Error executing the Python script:", error);
+        throw new Error("Error executing the Python script.");
+      })
+      .then((reply) => {
+        if (reply.log) console.log(`Python script stdout: ${reply.log}`);
+        if (!reply.ok) {
+          console.error(`Python script failed: ${reply.error}`);
+          throw new Error("Failed to process the file. See server logs for details.");
+        }
+        console.log("Python script completed successfully.");
+        const { deferred_render: deferred, ...results } = reply.results;
+        recordTiming(fileName, results.timing);
+        const cache = results.cache;
+        if (cache === "hit") cacheStats.hits++;
+        else if (cache === "miss") cacheStats.misses++;
+        const outputs = {};
+        const files = {};
+        for (const format of formats) {
+          outputs[outputKeys[format]] = path.basename(outputFiles[format]);
+          files[format] = outputFiles[format];
+        }
+        outputs.json = path.basename(outputJson);
+        if (thumbnail) {
+          outputs.thumbnail = path.basename(outputThumbnail);
+          files.thumbnail = outputThumbnail;
+        }
+        rendered = renderArtifacts(artifacts, files, deferred, render);
+        return {
+          message: "File processed successfully!",
+          outputs,
+          cache,
+          results,
+        };
+      });
+
+  // Room for this job's plots in the render lane, held until the job ends
+  const renders = formats.length + (thumbnail ? 1 : 0);
+  if (renderQueue.summary().queued + reservedRenders + renders > renderQueue.maxQueued)
+    return queueFull(res, renderQueue, "Too many plots waiting to render. Try again later.");
+  const job = jobQueue.submit(analyze, { id: jobId, fileName, artifacts });
+  if (!job) return queueFull(res, jobQueue, "Too many analyses queued. Try again later.");
+  reservedRenders += renders;
+  job.done.then(() => {
+    reservedRenders -= renders;
   });
 
-  pythonProcess.on("close", (code) => {
-    if (code === 0) {
-      console.log("Python script completed successfully.");
-      res.status(200).json({
-        message: "File processed successfully!",
-        outputs: {
-          image: path.basename(outputImage),
-          pdf: path.basename(outputPdf),
+  // ?wait=true holds the request until the job is done and its plots are
+  // drawn, as before the queue; ?wait=results only until the numbers are in
+  const wait = param(req.query, "wait") || param(req.body, "wait");
+  if (wait === "true" || wait === true || wait === "results") {
+    return job.done
+      .then((finished) => (wait === "results" ? finished : rendered.then(() => finished)))
+      .then((finished) =>
+        res.status(finished.status === "done" ? 200 : 500).json(jobStatus(finished))
+      );
+  }
+  res.status(202).location(`/jobs/${job.id}`).json(jobStatus(job));
+});
+
+// Compare a series of uploads (e.g. calcination temperatures) in one report:
+// the scans are aligned on a common 2θ grid and analyzed together, drawn
+// offset on one plot, with crystallinity and peak shifts per sample. Queued
+// like /process; body: files (in series order), optional labels, reference
+// (index of the sample shifts are measured from), tolerance (degrees),
+// step, offset, formats and the session analysis parameters.
+app.post("/compare", (req, res) => {
+  const files = param(req.body, "files");
+  if (!Array.isArray(files) || files.length < 1 || files.length > MAX_COMPARE_SCANS)
+    return res.status(400).json({ error: `files must list 1 to ${MAX_COMPARE_SCANS} uploads` });
+  for (const fileName of files) {
+    if (typeof fileName !== "string" || fileName.includes("..") || fileName.includes("/"))
+      return res.status(400).json({ error: "Invalid file name" });
+    if (!fs.existsSync(path.join(uploadDir, fileName)))
+      return res.status(404).json({ error: `File not found: ${fileName}` });
+  }
+  const labels = param(req.body, "labels");
+  if (labels !== undefined && (!Array.isArray(labels) || labels.length !== files.length))
+    return res.status(400).json({ error: "labels must give one label per file" });
+  const formats = parseFormats(param(req.body, "formats"));
+  if (!formats)
+    return res.status(400).json({ error: `formats must be a subset of ${RENDER_FORMATS.join(", ")}` });
+  const { params, error } = parseAnalysisParams(req.body);
+  if (error) return res.status(400).json({ error });
+  const settings = {};
+  for (const name of ["reference", "tolerance", "step", "offset", "dpi"]) {
+    const value = optionalNumber(req.body, name);
+    if (value === undefined) continue;
+    if (!Number.isFinite(value)) return res.status(400).json({ error: `${name} must be a number` });
+    settings[name] = value;
+  }
+  if (
+    settings.reference !== undefined &&
+    !(Number.isInteger(settings.reference) && settings.reference >= 0 && settings.reference < files.length)
+  )
+    return res.status(400).json({ error: `reference must be the index of one of the ${files.length} files` });
+
+  const report = `comparison-${crypto.randomUUID()}`;
+  const outputs = {};
+  for (const format of formats) outputs[format] = path.join(outputDir, `${report}.${format}`);
+  const outputJson = path.join(outputDir, `${report}.json`);
+
+  const compare = (signal) =>
+    pythonPool
+      .runTask(
+        "compare",
+        {
+          file_paths: files.map((fileName) => path.join(uploadDir, fileName)),
+          labels,
+          outputs,
+          output_json: outputJson,
+          ...settings,
+          ...params,
         },
+        { signal }
+      )
+      .then((reply) => {
+        if (reply.log) console.log(`Python script stdout: ${reply.log}`);
+        if (!reply.ok) {
+          console.error(`Comparison failed: ${reply.error}`);
+          throw new Error(
+            reply.error.startsWith("ValueError")
+              ? reply.error.replace(/^ValueError: /, "")
+              : "Failed to compare the files. See server logs for details."
+          );
+        }
+        const { timing, ...results } = reply.results;
+        recordTiming(`comparison of ${files.length} scans`, timing);
+        evictOutputs();
+        const reportFiles = { json: path.basename(outputJson) };
+        for (const [format, file] of Object.entries(outputs)) reportFiles[format] = path.basename(file);
+        return { message: "Files compared successfully!", outputs: reportFiles, results, timing };
       });
-    } else {
-      console.error(`Python script exited with code ${code}`);
-      res.status(500).json({
-        error: "Failed to process the file. See server logs for details.",
+
+  const job = jobQueue.submit(compare, { files });
+  if (!job) return queueFull(res, jobQueue, "Too many analyses queued. Try again later.");
+  const wait = param(req.query, "wait") || param(req.body, "wait");
+  if (wait === "true" || wait === true) {
+    return job.done.then((finished) =>
+      res.status(finished.status === "done" ? 200 : 500).json(jobStatus(finished))
+    );
+  }
+  res.status(202).location(`/jobs/${job.id}`).json(jobStatus(job));
+});
+
+// Queue depth, limits and mean timings of the analysis jobs, plus the read
+// and /stream lanes
+app.get("/jobs", (req, res) => {
+  res.json({
+    ...jobQueue.summary(),
+    reads: readQueue.summary(),
+    streams: streamQueue.summary(),
+    renders: { ...renderQueue.summary(), reserved: reservedRenders },
+  });
+});
+
+// Status of a /process job; the results are included once it is done
+app.get("/jobs/:job", (req, res) => {
+  const job = jobQueue.get(req.params.job);
+  if (!job) return res.status(404).json({ error: "Job not found" });
+  res.json(jobStatus(job));
+});
+
+// Open an analysis session on an uploaded file
+app.post("/sessions/:fileName", (req, res) => {
+  const { fileName } = req.params;
+  if (fileName.includes("..") || fileName.includes("/")) {
+    return res.status(400).json({ error: "Invalid file name" });
+  }
+  if (!fs.existsSync(path.join(uploadDir, fileName))) {
+    return res.status(404).json({ error: "File not found" });
+  }
+  const { params, error } = parseAnalysisParams(req.body);
+  if (error) return res.status(400).json({ error });
+
+  const id = crypto.randomUUID();
+  analyzeSession(res, id, { fileName, params: {}, lastUsed: Date.now() }, params, req.body, 201);
+});
+
+// Change some parameters of a session; only the affected stages are recomputed
+app.patch("/sessions/:session", (req, res) => {
+  const session = sessions.get(req.params.session);
+  if (!session) return res.status(404).json({ error: "Session not found" });
+  const { params, error } = parseAnalysisParams(req.body);
+  if (error) return res.status(400).json({ error });
+
+  analyzeSession(res, req.params.session, session, { ...session.params, ...params }, req.body);
+});
+
+// Close a session and free its memory on the worker
+app.delete("/sessions/:session", (req, res) => {
+  if (!sessions.delete(req.params.session)) {
+    return res.status(404).json({ error: "Session not found" });
+  }
+  closeSession(req.params.session);
+  res.status(200).json({ message: "Session closed." });
+});
+
+// Analyze a multi-frame scan frame by frame, streaming one JSON line per
+// frame (application/x-ndjson) as each is done. The scan is read in chunks
+// by python_scripts/stream_xrd.py, so it never has to fit in memory.
+app.post("/stream/:fileName", (req, res) => {
+  const { fileName } = req.params;
+  if (fileName.includes("..") || fileName.includes("/")) {
+    return res.status(400).json({ error: "Invalid file name" });
+  }
+  const filePath = path.join(uploadDir, fileName);
+  if (!fs.existsSync(filePath)) {
+    return res.status(404).json({ error: "File not found" });
+  }
+  const { params, error } = parseAnalysisParams(req.body);
+  if (error) return res.status(400).json({ error });
+
+  const args = ["./python_scripts/stream_xrd.py", filePath];
+  for (const [name, value] of Object.entries(params)) {
+    if (value === null) continue;
+    if (name === "baseline_method") args.push("--baseline", value);
+    else if (name === "baseline_options")
+      for (const [option, number] of Object.entries(value)) args.push("--baseline-option", `${option}=${number}`);
+    else if (name === "windows")
+      for (const [min, max] of value) args.push("--window", `${min}:${max}`);
+    else if (name === "fit_profile") {
+      if (value) args.push("--fit", value);
+    } else args.push(`--${name.replace(/_/g, "-")}`, String(value));
+  }
+  const chunkRows = optionalNumber(req.body, "chunk_rows");
+  if (Number.isInteger(chunkRows) && chunkRows > 0) args.push("--chunk-rows", String(chunkRows));
+
+  // The status is sent with the first frame, so a scan that fails before
+  // any frame gets a 500; a failure after that ends the stream with an
+  // {"error": ...} frame
+  let child = null;
+  let clientGone = false;
+  const stream = (signal) =>
+    new Promise((resolve, reject) => {
+      if (clientGone) return resolve();
+      child = spawn(process.env.PYTHON || "./venv/bin/python", args);
+      // A stream that overruns the lane's timeout stops with it
+      signal.addEventListener("abort", () => child.kill(), { once: true });
+      child.stdout.on("data", (chunk) => {
+        if (!res.headersSent) res.status(200).type("application/x-ndjson");
+        if (!res.write(chunk)) {
+          child.stdout.pause();
+          res.once("drain", () => child.stdout.resume());
+        }
       });
-    }
+      child.stderr.on("data", (data) => console.log(`stream_xrd: ${data}`));
+      child.on("error", reject);
+      child.on("close", (code, signal) => {
+        if (code === 0 || clientGone) resolve();
+        else reject(new Error(`stream_xrd exited (code ${code}, signal ${signal})`));
+      });
+    });
+  // Stop the analysis when the client goes away
+  res.on("close", () => {
+    clientGone = true;
+    if (child) child.kill();
+  });
+
+  const job = streamQueue.submit(stream, { fileName });
+  if (!job) return queueFull(res, streamQueue, "Too many streams running. Try again later.");
+  job.done.then((finished) => {
+    if (finished.status === "done") return res.end();
+    console.error(`Streaming ${fileName} failed: ${finished.error}`);
+    if (child) child.kill();
+    const error = "Failed to analyze the file. See server logs for details.";
+    if (!res.headersSent) return res.status(500).json({ error });
+    res.end(JSON.stringify({ error }) + "\n");
   });
+});
 
-  pythonProcess.on("error", (error) => {
-    console.error("Error starting Python process:", error);
-    res.status(500).json({ error: "Error executing the Python script." });
+// Result cache counters
+app.get("/cache/stats", (req, res) => {
+  const lookups = cacheStats.hits + cacheStats.misses;
+  res.json({
+    ...cacheStats,
+    hitRate: lookups ? cacheStats.hits / lookups : 0,
+    outputEvictions: outputStats.evictions,
   });
 });
 
+// Where the analyses spend their time: per-stage means and maxima, slowest first
+app.get("/timing/stats", (req, res) => {
+  const { analyses, wall_ms: wallMs, ...maxima } = analysisTimes;
+  const stages = {};
+  for (const [name, totals] of [...stageTimes].sort((a, b) => b[1].wall_ms - a[1].wall_ms)) {
+    stages[name] = {
+      calls: totals.calls,
+      mean_wall_ms: totals.wall_ms / totals.calls,
+      mean_cpu_ms: totals.cpu_ms / totals.calls,
+      max_wall_ms: totals.max_wall_ms,
+      share: wallMs ? totals.wall_ms / wallMs : 0,
+    };
+  }
+  const { rendered, failed, rejected, wall_ms: renderMs, max_wall_ms: maxRenderMs } = renderTimes;
+  const renders = {
+    rendered,
+    failed,
+    rejected,
+    mean_wall_ms: rendered ? renderMs / rendered : 0,
+    max_wall_ms: maxRenderMs,
+    queued: renderQueue.summary().queued,
+    reserved: reservedRenders,
+  };
+  res.json({ analyses, mean_wall_ms: analyses ? wallMs / analyses : 0, ...maxima, stages, renders });
+});
+
 // List all output files
 app.get("/outputs", (req, res) => {
   fs.readdir(outputDir, (err, files) => {
     if (err)
       return res.status(500).json({ error: "Failed to list output files." });
-    res.json(files);
+    // Hidden files are plot data waiting for the render workers
+    res.json(files.filter((file) => !file.startsWith(".")));
   });
 });
 
@@ -180,6 +1145,9 @@ app.get("/outputs/:fileName", (req, res) => {
   if (!fs.existsSync(filePath))
     return res.status(404).json({ error: "File not found" });
 
+  // Mark it used, so outputs/ eviction keeps it a while longer
+  const now = new Date();
+  fs.utimes(filePath, now, now, () => {});
   res.download(filePath, fileName);
 });
 
@@ -194,6 +1162,10 @@ app.delete("/upload/:fileName", (req, res) => {
   fs.unlink(filePath, (err) => {
     if (err)
       return res.status(500).json({ error: "Failed to delete the file." });
+    // Drop the scan store copy and metadata kept beside the upload
+    fs.unlink(path.join(uploadDir, `.${fileName}.npy`), () => {});
+    fs.unlink(scanMetadataPath(fileName), () => {});
+    fs.unlink(path.join(uploadDir, `.${fileName}.pyramid.npy`), () => {});
     res.status(200).json({ message: "File deleted successfully!" });
   });
 });
@@ -0,0 +1,135 @@
+const crypto = require("crypto");
+
+// Bounded job queue in front of the Python workers.
+// submit() returns a job record at once; at most `concurrency` jobs run at a
+// time, at most `maxQueued` wait, and submit() returns null beyond that so the
+// caller can answer 429. Finished jobs are kept for `ttlMs` to be polled.
+// A job running longer than `timeoutMs` (0: no limit) fails and frees its
+// slot. task(signal) gets an AbortSignal that is aborted then, so it can
+// stop the work it started; a task that settles after that is ignored.
+class JobQueue {
+  constructor({ concurrency, maxQueued, ttlMs, timeoutMs } = {}) {
+    this.concurrency = Math.max(1, Number(concurrency) || 1);
+    this.maxQueued = Math.max(0, Number(maxQueued) || 0);
+    this.ttlMs = Number(ttlMs) || 60 * 60 * 1000;
+    this.timeoutMs = Math.max(0, Number(timeoutMs) || 0);
+    this.jobs = new Map();
+    this.pending = [];
+    this.running = 0;
+    this.stats = { submitted: 0, rejected: 0, done: 0, failed: 0, timed_out: 0, waitMs: 0, runMs: 0 };
+    this.sweeper = setInterval(() => this.sweep(), Math.min(this.ttlMs, 60 * 1000));
+    this.sweeper.unref();
+  }
+
+  // Queue task(signal) (returning a promise of the job result); null when full.
+  // meta is copied onto the job record and may choose its id.
+  submit(task, meta = {}) {
+    if (this.pending.length >= this.maxQueued) {
+      this.stats.rejected++;
+      return null;
+    }
+    const job = {
+      id: crypto.randomUUID(),
+      status: "queued",
+      ...meta,
+      submittedAt: Date.now(),
+      startedAt: null,
+      finishedAt: null,
+      result: null,
+      error: null,
+      done: null,
+    };
+    job.done = new Promise((resolve) => {
+      job.settle = resolve;
+    });
+    this.jobs.set(job.id, job);
+    this.pending.push({ job, task });
+    this.stats.submitted++;
+    this.dispatch();
+    return job;
+  }
+
+  get(id) {
+    return this.jobs.get(id);
+  }
+
+  // Jobs ahead of this one in the queue (0 once it is running)
+  position(job) {
+    return job.status === "queued" ? this.pending.findIndex((entry) => entry.job === job) : 0;
+  }
+
+  dispatch() {
+    while (this.running < this.concurrency && this.pending.length) {
+      const { job, task } = this.pending.shift();
+      this.running++;
+      job.status = "running";
+      job.startedAt = Date.now();
+      const controller = new AbortController();
+      if (this.timeoutMs) {
+        job.timer = setTimeout(() => {
+          this.stats.timed_out++;
+          const error = `Timed out after ${this.timeoutMs} ms`;
+          this.finish(job, "failed", null, error);
+          controller.abort(new Error(error));
+        }, this.timeoutMs);
+      }
+      Promise.resolve()
+        .then(() => task(controller.signal))
+        .then(
+          (result) => this.finish(job, "done", result, null),
+          (error) => this.finish(job, "failed", null, error.message || String(error))
+        );
+    }
+  }
+
+  finish(job, status, result, error) {
+    if (job.finishedAt) return;
+    clearTimeout(job.timer);
+    this.running--;
+    job.status = status;
+    job.result = result;
+    job.error = error;
+    job.finishedAt = Date.now();
+    this.stats[status]++;
+    this.stats.waitMs += job.startedAt - job.submittedAt;
+    this.stats.runMs += job.finishedAt - job.startedAt;
+    job.settle(job);
+    this.dispatch();
+  }
+
+  // Timing of one job in milliseconds (so far, while it is unfinished)
+  timing(job) {
+    const now = Date.now();
+    return {
+      queued_ms: (job.startedAt || now) - job.submittedAt,
+      run_ms: job.startedAt ? (job.finishedAt || now) - job.startedAt : 0,
+      total_ms: (job.finishedAt || now) - job.submittedAt,
+    };
+  }
+
+  // Queue depth, limits and mean timings of the finished jobs
+  summary() {
+    const { waitMs, runMs, ...counts } = this.stats;
+    const finished = counts.done + counts.failed;
+    return {
+      queued: this.pending.length,
+      running: this.running,
+      concurrency: this.concurrency,
+      max_queued: this.maxQueued,
+      timeout_ms: this.timeoutMs,
+      ...counts,
+      mean_queued_ms: finished ? waitMs / finished : 0,
+      mean_run_ms: finished ? runMs / finished : 0,
+    };
+  }
+
+  // Forget finished jobs older than the TTL
+  sweep() {
+    const cutoff = Date.now() - this.ttlMs;
+    for (const [id, job] of this.jobs) {
+      if (job.finishedAt && job.finishedAt < cutoff) this.jobs.delete(id);
+    }
+  }
+}
+
+module.exports = { JobQueue };
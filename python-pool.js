@@ -0,0 +1,222 @@
+const { spawn } = require("child_process");
+const os = require("os");
+const readline = require("readline");
+
+// Pool of long-lived Python workers (process_xrd.py --worker).
+// Each worker imports pandas/numpy/scipy/matplotlib once at startup and then
+// serves jobs as JSON lines over stdin/stdout, one job at a time.
+// Session jobs (runSession) always go to the worker holding the session.
+// A worker that exits, fails to start, writes invalid output or overruns the
+// job timeout fails its job and is replaced. Every run method takes an
+// optional { signal } (AbortSignal): aborting it drops the job from the
+// queue, or kills and replaces the worker running it.
+class PythonPool {
+  constructor({ python, script, size, env, name, timeoutMs, maxFailures } = {}) {
+    this.python = python || "./venv/bin/python";
+    this.script = script || "./python_scripts/process_xrd.py";
+    // Every worker holds its own numpy/scipy/matplotlib (~100-150 MB), so
+    // the default stays small even on many-core hosts
+    this.size = Math.max(1, Number(size) || Math.min(4, os.cpus().length));
+    this.env = { ...process.env, MPLBACKEND: "Agg", ...env };
+    // How the logs call the workers, e.g. "render worker"
+    this.name = name || "worker";
+    // A job running longer than this kills its worker (0: no limit)
+    this.timeoutMs = Math.max(0, Number(timeoutMs) || 0);
+    // Workers dying this many times in a row before becoming ready (missing
+    // interpreter, broken environment) fail the pool instead of restarting
+    this.maxFailures = Math.max(1, Number(maxFailures) || 5);
+    this.failures = 0;
+    this.failed = null;
+    this.workers = [];
+    this.queue = [];
+    this.sessionWorkers = new Map();
+    this.nextId = 1;
+    this.closed = false;
+  }
+
+  start() {
+    for (let i = 0; i < this.size; i++) this.workers.push(this.spawnWorker(i));
+    return this;
+  }
+
+  spawnWorker(index) {
+    const proc = spawn(this.python, [this.script, "--worker"], {
+      env: this.env,
+      stdio: ["pipe", "pipe", "pipe"],
+    });
+    const worker = { index, proc, ready: false, started: false, retired: false, job: null, timer: null };
+
+    readline.createInterface({ input: proc.stdout }).on("line", (line) => {
+      if (worker.retired) return;
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (err) {
+        console.error(`Python ${this.name} ${index} sent invalid output: ${line}`);
+        // The reply to the running job is lost; start over with a fresh worker
+        this.recycle(worker, new Error(`Python ${this.name} sent invalid output`));
+        return;
+      }
+      if (message.ready) {
+        worker.ready = worker.started = true;
+        this.failures = 0;
+        console.log(`Python ${this.name} ${index} ready (pid ${proc.pid}).`);
+      } else if (worker.job && message.id === worker.job.id) {
+        const { resolve } = worker.job;
+        clearTimeout(worker.timer);
+        worker.job = null;
+        resolve(message);
+      }
+      this.dispatch();
+    });
+
+    proc.stdin.on("error", (error) => {
+      console.error(`Python ${this.name} ${index} stdin error:`, error.message);
+    });
+
+    proc.stderr.on("data", (data) => {
+      console.error(`Python ${this.name} ${index} stderr: ${data}`);
+    });
+
+    // A worker that cannot be started emits 'error', maybe without 'exit'
+    proc.on("error", (error) => {
+      console.error(`Error starting Python ${this.name} ${index}:`, error);
+      this.retire(worker, new Error(`Python ${this.name} failed: ${error.message}`));
+    });
+
+    proc.on("exit", (code, signal) => {
+      this.retire(worker, new Error(`Python ${this.name} exited (code ${code}, signal ${signal})`));
+    });
+
+    return worker;
+  }
+
+  // Kill a worker that can no longer be trusted (invalid output, timeout)
+  recycle(worker, error) {
+    this.retire(worker, error);
+    worker.proc.kill("SIGKILL");
+  }
+
+  // Fail the worker's job and start a replacement, once per worker
+  retire(worker, error) {
+    if (worker.retired) return;
+    worker.retired = true;
+    worker.ready = false;
+    clearTimeout(worker.timer);
+    if (worker.job) {
+      worker.job.reject(error);
+      worker.job = null;
+    }
+    if (this.closed || this.failed) return;
+    if (!worker.started && ++this.failures >= this.maxFailures) {
+      this.fail(new Error(`Python ${this.name}s keep failing to start: ${error.message}`));
+      return;
+    }
+    console.error(`Python ${this.name} ${worker.index} exited, restarting.`);
+    setTimeout(() => {
+      if (this.closed || this.failed) return;
+      this.workers[worker.index] = this.spawnWorker(worker.index);
+    }, 1000);
+  }
+
+  // Give up: reject the queued jobs and every job submitted from now on
+  fail(error) {
+    console.error(error.message);
+    this.failed = error;
+    for (const worker of this.workers) if (!worker.retired) worker.proc.kill();
+    for (const job of this.queue.splice(0)) job.reject(error);
+  }
+
+  // Queue a job; resolves with the worker reply ({ id, ok, log, error }).
+  run(args, options) {
+    return this.enqueue({ args }, options);
+  }
+
+  // Queue one of the worker's other tasks (WORKER_TASKS in process_xrd.py),
+  // e.g. runTask("ingest", { file_path }); resolves with the worker reply.
+  runTask(task, args, options) {
+    return this.enqueue({ task, args }, options);
+  }
+
+  // Queue a job for an analysis session. A new session is pinned to the
+  // worker with the fewest sessions; a worker that restarts has lost its
+  // sessions, so callers send the file and all parameters with every job.
+  runSession(session, args, options) {
+    if (!this.sessionWorkers.has(session)) {
+      const counts = this.workers.map(() => 0);
+      for (const index of this.sessionWorkers.values()) counts[index]++;
+      this.sessionWorkers.set(session, counts.indexOf(Math.min(...counts)));
+    }
+    return this.enqueue({ session, args, worker: this.sessionWorkers.get(session) }, options);
+  }
+
+  // Close a session on its worker; resolves with false if it was unknown.
+  closeSession(session, options) {
+    if (!this.sessionWorkers.has(session)) return Promise.resolve(false);
+    const worker = this.sessionWorkers.get(session);
+    this.sessionWorkers.delete(session);
+    return this.enqueue({ session, args: { close: true }, worker }, options).then(() => true);
+  }
+
+  enqueue(job, { signal } = {}) {
+    if (this.closed) return Promise.reject(new Error("Python pool is closed"));
+    if (this.failed) return Promise.reject(this.failed);
+    if (signal && signal.aborted) return Promise.reject(signal.reason);
+    return new Promise((resolve, reject) => {
+      const entry = { id: this.nextId++, ...job, resolve, reject };
+      this.queue.push(entry);
+      if (signal) signal.addEventListener("abort", () => this.cancel(entry, signal.reason), { once: true });
+      this.dispatch();
+    });
+  }
+
+  // Stop a job: still queued, it is dropped; running, its worker is killed
+  // and replaced, so the caller's slot never outlives the work
+  cancel(entry, reason) {
+    const error = reason instanceof Error ? reason : new Error("Job cancelled");
+    const position = this.queue.indexOf(entry);
+    if (position >= 0) {
+      this.queue.splice(position, 1);
+      entry.reject(error);
+      return;
+    }
+    const worker = this.workers.find((candidate) => candidate.job === entry);
+    if (!worker) return;
+    console.error(`Python ${this.name} ${worker.index} cancelled: ${error.message}, killing it.`);
+    this.recycle(worker, error);
+  }
+
+  dispatch() {
+    for (const worker of this.workers) {
+      if (!this.queue.length) return;
+      if (!worker.ready || worker.job) continue;
+      // First queued job this worker may take (session jobs are pinned)
+      const position = this.queue.findIndex(
+        (job) => job.worker === undefined || job.worker === worker.index
+      );
+      if (position < 0) continue;
+      const [job] = this.queue.splice(position, 1);
+      worker.job = job;
+      if (this.timeoutMs) {
+        worker.timer = setTimeout(() => {
+          console.error(`Python ${this.name} ${worker.index} timed out, killing it.`);
+          this.recycle(worker, new Error(`Python ${this.name} timed out after ${this.timeoutMs} ms`));
+        }, this.timeoutMs);
+      }
+      const message = { id: job.id, args: job.args };
+      if (job.session !== undefined) message.session = job.session;
+      if (job.task !== undefined) message.task = job.task;
+      worker.proc.stdin.write(JSON.stringify(message) + "\n");
+    }
+  }
+
+  close() {
+    this.closed = true;
+    for (const worker of this.workers) worker.proc.stdin.end();
+    for (const job of this.queue.splice(0)) {
+      job.reject(new Error("Python pool is closed"));
+    }
+  }
+}
+
+module.exports = { PythonPool };
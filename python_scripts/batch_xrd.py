@@ -0,0 +1,161 @@
+import os
+import sys
+import io
+import csv
+import glob
+import json
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from process_xrd import process_xrd, open_cache, parse_options, parse_window, CU_K_ALPHA, PROFILES
+from xrd import BASELINE_METHODS
+
+SUMMARY_COLUMNS = ["file", "status", "n_peaks", "peak_position", "peak_intensity", "fwhm",
+                   "d_spacing", "crystallite_size_nm", "percent_crystallinity", "total_area",
+                   "crystalline_area", "amorphous_area", "baseline_method", "baseline", "peak_positions",
+                   "peak_fwhms", "peak_d_spacings", "peak_crystallite_sizes_nm", "error"]
+
+# One result cache per pool process, opened by init_worker()
+_cache = None
+
+def init_worker(cache_dir, cache_max_mb):
+    global _cache
+    if cache_dir:
+        _cache = open_cache(cache_dir, cache_max_mb)
+
+def analyze_file(file_path, params, output_dir=None, formats=("png", "pdf")):
+    """Runs process_xrd on one scan in a pool process; returns a JSON-ready record."""
+    name = os.path.basename(file_path)
+    record = {"file": file_path}
+    outputs = {}
+    if output_dir:
+        outputs = {"output_image": os.path.join(output_dir, f"{name}-output.png"),
+                   "output_pdf": os.path.join(output_dir, f"{name}-output.pdf")}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            results = process_xrd(file_path, outputs.get("output_image"), outputs.get("output_pdf"), **params,
+                                  plot=bool(output_dir), formats=formats, cache=_cache)
+    except Exception as exc:
+        return dict(record, status="error", error=f"{type(exc).__name__}: {exc}")
+    if results is None:
+        return dict(record, status="error", error=log.getvalue().strip())
+    return dict(record, status="ok", results=results)
+
+def summary_row(record):
+    row = {"file": record["file"], "status": record["status"], "error": record.get("error", "")}
+    results = record.get("results")
+    if results:
+        row.update({column: results.get(column, "") for column in SUMMARY_COLUMNS if column in results})
+        row["peak_positions"] = ";".join(f"{peak['position']:.4f}" for peak in results["peaks"])
+        row["peak_fwhms"] = ";".join(f"{peak['fwhm']:.4f}" for peak in results["peaks"])
+        row["peak_d_spacings"] = ";".join(f"{peak['d_spacing']:.4f}" for peak in results["peaks"])
+        row["peak_crystallite_sizes_nm"] = ";".join("" if peak["crystallite_size_nm"] is None
+                                                    else f"{peak['crystallite_size_nm']:.2f}"
+                                                    for peak in results["peaks"])
+    return row
+
+def expand_inputs(patterns):
+    """Expands paths and glob patterns into a sorted, de-duplicated list of files."""
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        files.update(path for path in matches if os.path.isfile(path))
+    return sorted(files)
+
+def run_batch(files, params, workers=None, output_dir=None, formats=("png", "pdf"), cache_dir=None,
+              cache_max_mb=500, on_result=None):
+    """Analyzes files in a process pool; calls on_result(record) as each finishes and returns all records."""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    records = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cache_dir, cache_max_mb)) as executor:
+        futures = [executor.submit(analyze_file, path, params, output_dir, formats) for path in files]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            if on_result:
+                on_result(record)
+    return records
+
+def write_summary(records, path):
+    """Writes one row per scan (in file order) to a CSV summary table."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        for record in sorted(records, key=lambda record: record["file"]):
+            writer.writerow(summary_row(record))
+
+def add_analysis_arguments(parser):
+    """Adds the analysis parameter flags shared by the batch and streaming tools."""
+    parser.add_argument("--min-theta", type=float, default=20)
+    parser.add_argument("--max-theta", type=float, default=70)
+    parser.add_argument("--min-intensity", type=float, default=200)
+    parser.add_argument("--theta-distance-deg", type=float, default=0.2,
+                        help="minimum peak separation in degrees of 2θ (default: 0.2)")
+    parser.add_argument("--theta-distance", type=float,
+                        help="minimum peak separation in samples of the scan, instead of --theta-distance-deg")
+    parser.add_argument("--prominence", type=float, default=95.0, help="minimum peak prominence in counts")
+    parser.add_argument("--min-width", type=float, default=0.0, help="minimum peak width in degrees of 2θ")
+    parser.add_argument("--wavelength", type=float, default=CU_K_ALPHA, help="X-ray wavelength in Å")
+    parser.add_argument("--scherrer-k", type=float, default=0.9)
+    parser.add_argument("--instrument-broadening", type=float, default=0.0, help="instrumental FWHM in degrees")
+    parser.add_argument("--baseline", default="min", choices=sorted(BASELINE_METHODS))
+    parser.add_argument("--baseline-option", action="append", default=[], metavar="NAME=VALUE")
+    parser.add_argument("--window", action="append", default=[], type=parse_window, metavar="MIN:MAX",
+                        help="also report the crystallinity over this 2θ range (repeatable)")
+    parser.add_argument("--fit", choices=list(PROFILES), help="fit this profile to the detected peaks")
+    parser.add_argument("--phase-matches", type=int, default=0, help="report this many best-matching phases")
+    parser.add_argument("--match-tolerance", type=float, default=0.2, help="phase line match tolerance in degrees")
+    parser.add_argument("--references", help="phase reference library (default: $XRD_REFERENCE_DB)")
+
+def analysis_params(args):
+    """The process_xrd keyword arguments given by add_analysis_arguments flags."""
+    return {"min_theta": args.min_theta, "max_theta": args.max_theta,
+            "min_intensity": args.min_intensity, "theta_distance_deg": args.theta_distance_deg,
+            "theta_distance": args.theta_distance,
+            "prominence": args.prominence, "min_width": args.min_width,
+            "wavelength": args.wavelength, "scherrer_k": args.scherrer_k,
+            "instrument_broadening": args.instrument_broadening,
+            "baseline_method": args.baseline, "baseline_options": parse_options(args.baseline_option),
+            "windows": args.window, "fit_profile": args.fit, "phase_matches": args.phase_matches,
+            "match_tolerance": args.match_tolerance, "references": args.references}
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Analyze many XRD scans with one parameter set, in parallel")
+    parser.add_argument("inputs", nargs="+", help="CSV files or glob patterns (e.g. 'uploads/*.csv')")
+    add_analysis_arguments(parser)
+    parser.add_argument("--workers", type=int, help="pool size (default: CPU count)")
+    parser.add_argument("--summary", default="batch-summary.csv", help="combined summary table (CSV)")
+    parser.add_argument("--output-dir", help="also render each scan's plots into this directory")
+    parser.add_argument("--formats", default="png,pdf", help="formats to render with --output-dir")
+    parser.add_argument("--cache-dir", help="reuse results cached in this directory")
+    parser.add_argument("--cache-max-mb", type=float, default=500)
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("No input files found.", file=sys.stderr)
+        return 1
+
+    params = analysis_params(args)
+
+    def stream(record):
+        # One JSON line per scan as soon as it finishes
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    records = run_batch(files, params, workers=args.workers, output_dir=args.output_dir,
+                        formats=[fmt.strip() for fmt in args.formats.split(",") if fmt.strip()],
+                        cache_dir=args.cache_dir, cache_max_mb=args.cache_max_mb, on_result=stream)
+    write_summary(records, args.summary)
+
+    failed = sum(record["status"] != "ok" for record in records)
+    print(f"Processed {len(records)} scans ({failed} failed); summary written to {args.summary}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
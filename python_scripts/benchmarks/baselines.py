@@ -0,0 +1,47 @@
+"""Per-method timing of the baseline estimators on large synthetic patterns.
+
+    python python_scripts/benchmarks/baselines.py [--points 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from xrd import BASELINE_METHODS, estimate_baseline  # noqa: E402
+
+def synthetic_pattern(n_points, seed=0):
+    """Sloped amorphous hump plus sharp peaks and counting noise."""
+    rng = np.random.default_rng(seed)
+    two_theta = np.linspace(5, 90, n_points)
+    background = 400 * np.exp(-two_theta / 30) + 150 * np.exp(-((two_theta - 25) / 8) ** 2)
+    peaks = sum(height * np.exp(-((two_theta - center) / 0.1) ** 2)
+                for center, height in [(25.6, 1400), (27.0, 500), (33.7, 500), (45.8, 450), (49.7, 450)])
+    return two_theta, rng.poisson(background + peaks).astype(np.float64), background
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    two_theta, intensity, true_background = synthetic_pattern(args.points)
+    estimate_baseline(two_theta, intensity, "rolling")  # load scipy outside the timings
+
+    print(f"{args.points} points, best of {args.repeat}")
+    print(f"{'method':>8} {'time':>10} {'rms error vs true background':>30}")
+    for method in BASELINE_METHODS:
+        times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            baseline = estimate_baseline(two_theta, intensity, method)
+            times.append(time.perf_counter() - started)
+        error = np.sqrt(np.mean((baseline - true_background) ** 2))
+        print(f"{method:>8} {min(times) * 1000:>8.2f}ms {error:>30.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Scan loading benchmark: pandas vs scan_io text parsing vs the cached binary copy.
+
+Writes synthetic two-column scans (UTF-8 BOM, padded header) of each size
+to a temporary directory and times every loading path.
+
+    python python_scripts/benchmarks/csv_loading.py [--sizes 10000,100000,1000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from xrd.scan_io import load_scan, parse_scan_csv  # noqa: E402
+
+def write_scan(path, n_points):
+    rng = np.random.default_rng(0)
+    two_theta = np.linspace(5, 90, n_points)
+    intensity = 200 + rng.poisson(50, n_points) + 1500 * np.exp(-((two_theta - 25.6) / 0.08) ** 2)
+    with open(path, "w", encoding="utf-8-sig") as f:
+        f.write(" 2theta , Intensity \n")
+        np.savetxt(f, np.column_stack([two_theta, intensity]), delimiter=",", fmt=["%.8f", "%d"])
+
+def load_pandas(path):
+    # The loading code process_xrd used before scan_io
+    import pandas as pd
+
+    data = pd.read_csv(path, header=0)
+    data.columns = data.columns.str.strip().str.lower()
+    return data["2theta"].to_numpy(), data["intensity"].to_numpy()
+
+def best_of(repeat, func, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import pandas  # noqa: F401  (keep the pandas import cost out of the timings)
+
+    print(f"{'points':>9} {'pandas':>10} {'scan_io':>10} {'npy':>10} {'npy mmap':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_points in [int(size) for size in args.sizes.split(",")]:
+            path = os.path.join(tmp, f"scan-{n_points}.csv")
+            write_scan(path, n_points)
+            load_scan(path)  # writes the binary copy
+
+            pandas_ms = best_of(args.repeat, load_pandas, path)
+            text_ms = best_of(args.repeat, parse_scan_csv, path)
+            npy_ms = best_of(args.repeat, load_scan, path)
+            mmap_ms = best_of(args.repeat, load_scan, path, mmap=True)
+            print(f"{n_points:>9} {pandas_ms:>8.2f}ms {text_ms:>8.2f}ms {npy_ms:>8.2f}ms {mmap_ms:>8.2f}ms")
+
+if __name__ == "__main__":
+    main()
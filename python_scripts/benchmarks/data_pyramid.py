@@ -0,0 +1,64 @@
+"""Plot data benchmark: min/max pyramid queries vs slicing and decimating the window per request.
+
+Builds synthetic scans of each size and serves the same views from both:
+the whole scan, a 10° window and a 0.5° zoom, at --max-points points each.
+The per-request path slices the window and runs LTTB over it, as the
+preview renderer does; the pyramid answers from its precomputed levels.
+
+    python python_scripts/benchmarks/data_pyramid.py [--sizes 10000,1000000,10000000] [--max-points 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from xrd.decimate import lttb_indices  # noqa: E402
+from xrd.pyramid import MinMaxPyramid  # noqa: E402
+
+VIEWS = {"whole scan": (None, None), "10° window": (20.0, 30.0), "0.5° zoom": (25.3, 25.8)}
+
+def decimate_window(two_theta, intensity, min_theta, max_theta, max_points):
+    start = 0 if min_theta is None else np.searchsorted(two_theta, min_theta, "left")
+    stop = len(two_theta) if max_theta is None else np.searchsorted(two_theta, max_theta, "right")
+    x, y = two_theta[start:stop], intensity[start:stop]
+    kept = lttb_indices(x, y, max_points)
+    return x[kept], y[kept]
+
+def median_ms(repeat, func, *args):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+    return np.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,1000000,10000000")
+    parser.add_argument("--max-points", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n_points in map(int, args.sizes.split(",")):
+        two_theta = np.linspace(5, 90, n_points)
+        intensity = 200 + rng.poisson(50, n_points) + 1500 * np.exp(-((two_theta - 25.6) / 0.08) ** 2)
+
+        started = time.perf_counter()
+        pyramid = MinMaxPyramid(two_theta, intensity)
+        build_ms = (time.perf_counter() - started) * 1000
+        print(f"{n_points} points: pyramid built in {build_ms:.0f} ms ({pyramid.levels.nbytes / 2**20:.1f} MB)")
+        for name, (min_theta, max_theta) in VIEWS.items():
+            pyramid_ms = median_ms(args.repeat, pyramid.query, min_theta, max_theta, args.max_points)
+            lttb_ms = median_ms(args.repeat, decimate_window, two_theta, intensity, min_theta, max_theta,
+                                args.max_points)
+            points = len(pyramid.query(min_theta, max_theta, args.max_points)[0])
+            print(f"  {name:<11} pyramid {pyramid_ms:8.3f} ms ({points} points)   per-request LTTB {lttb_ms:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
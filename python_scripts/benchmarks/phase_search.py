@@ -0,0 +1,102 @@
+"""Phase search-match benchmark: the indexed ReferenceLibrary vs scoring every card.
+
+Builds a synthetic library of random cards, observes a two-phase mixture
+drawn from it (shifted positions, noisy intensities, a few stray peaks) and
+times ReferenceLibrary.match against a linear scan that scores every card
+the same way. Both must rank the same phases first.
+
+    python python_scripts/benchmarks/phase_search.py [--cards 50000] [--queries 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from xrd import ReferenceLibrary, d_spacing  # noqa: E402
+
+def random_cards(n_cards, seed=0):
+    """Cards of 10-60 lines with d in 0.8-8 Å, denser at small d as real patterns are."""
+    rng = np.random.default_rng(seed)
+    for index in range(n_cards):
+        n_lines = rng.integers(10, 60)
+        yield f"phase-{index}", "", 0.8 / rng.uniform(0.1, 1.0, n_lines), rng.uniform(1, 100, n_lines) ** 2
+
+def observe(library, cards, rng, min_theta=20, max_theta=70, tolerance=0.2):
+    """Peak table (2θ, d, intensity) of a mixture of cards, with position errors and stray peaks."""
+    positions, intensities = [], []
+    for card, weight in zip(cards, (1.0, 0.5)):
+        lines = library.card == card
+        two_theta = np.degrees(2 * np.arcsin(1.5406 / (2 * library.d[lines])))
+        keep = (two_theta >= min_theta) & (two_theta <= max_theta) & (library.intensity[lines] > 5)
+        positions.append(two_theta[keep] + rng.normal(0, tolerance / 4, keep.sum()))
+        intensities.append(weight * library.intensity[lines][keep] * rng.uniform(0.7, 1.3, keep.sum()))
+    positions.append(rng.uniform(min_theta, max_theta, 3))
+    intensities.append(rng.uniform(5, 30, 3))
+    positions, intensities = np.concatenate(positions), np.concatenate(intensities)
+    return positions, d_spacing(positions), intensities
+
+def linear_scan(library, d, intensity, d_lo, d_hi, d_min, d_max, top):
+    """Scores every card in turn with the formula of ReferenceLibrary.match."""
+    scores = np.zeros(len(library))
+    starts = np.searchsorted(library.card, np.arange(len(library) + 1))
+    for card in range(len(library)):
+        lines = slice(starts[card], starts[card + 1])
+        line_d, line_intensity = library.d[lines], library.intensity[lines]
+        inside = (line_d >= d_min) & (line_d <= d_max)
+        line_d, line_intensity = line_d[inside], line_intensity[inside]
+        if not len(line_d):
+            continue
+        nearest = np.argmin(np.abs(line_d[:, None] - d[None, :]), axis=1)
+        matched = (line_d >= d_lo[nearest]) & (line_d <= d_hi[nearest])
+        if not matched.any():
+            continue
+        offset = np.abs(line_d - d[nearest]) / ((d_hi - d_lo)[nearest] / 2)
+        reference = line_intensity[matched].sum() / line_intensity.sum()
+        explained = intensity[np.unique(nearest[matched])].sum() / intensity.sum()
+        scores[card] = reference * explained * (1 - offset[matched].mean() / 2)
+    return np.argsort(-scores, kind="stable")[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    library = ReferenceLibrary.from_cards(random_cards(args.cards))
+    build_time = time.perf_counter() - started
+    print(f"{len(library)} cards, {len(library.d)} lines, indexed in {build_time:.2f}s")
+
+    rng = np.random.default_rng(1)
+    indexed_times, scan_times, major, both, agree = [], [], 0, 0, 0
+    for _ in range(args.queries):
+        cards = rng.choice(len(library), 2, replace=False)
+        positions, d, intensity = observe(library, cards, rng)
+        window = (d_spacing(positions + 0.2), d_spacing(positions - 0.2), d_spacing(70.0), d_spacing(20.0))
+
+        started = time.perf_counter()
+        matches = library.match(d, intensity, *window, top=args.top)
+        indexed_times.append(time.perf_counter() - started)
+        major += len(matches["card"]) > 0 and matches["card"][0] == cards[0]
+        both += cards[0] in matches["card"] and cards[1] in matches["card"]
+
+        if len(scan_times) < 5:
+            started = time.perf_counter()
+            best = linear_scan(library, d, intensity, *window, args.top)
+            scan_times.append(time.perf_counter() - started)
+            agree += list(best[:2]) == list(matches["card"][:2])
+
+    indexed, scan = np.median(indexed_times) * 1000, np.median(scan_times) * 1000
+    print(f"indexed match: {indexed:.2f} ms per query (median of {len(indexed_times)})")
+    print(f"linear scan:   {scan:.1f} ms per query (median of {len(scan_times)}), {scan / indexed:.0f}x slower")
+    print(f"major phase first: {major}/{args.queries}, both phases in the top {args.top}: {both}/{args.queries}, "
+          f"same two best as the linear scan: {agree}/{len(scan_times)}")
+
+if __name__ == "__main__":
+    main()
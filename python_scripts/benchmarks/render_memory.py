@@ -0,0 +1,56 @@
+"""Memory-stability check for the rendering stage.
+
+Renders the same analysis --renders times in one process (like a pooled
+worker does) and fails if resident memory keeps growing after the warm-up
+renders.
+
+    python python_scripts/benchmarks/render_memory.py [scan.csv] [--renders 1000] [--formats png,pdf]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+DEFAULT_SCAN = os.path.join(REPO_DIR, "uploads", "file-1733586079108-692833970.csv")
+sys.path.insert(0, SCRIPTS_DIR)
+
+from process_xrd import process_xrd  # noqa: E402
+from xrd.timing import rss_mb  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scan", nargs="?", default=DEFAULT_SCAN)
+    parser.add_argument("--renders", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50, help="renders before the reference RSS is taken")
+    parser.add_argument("--formats", default="png,pdf")
+    parser.add_argument("--max-growth-mb", type=float, default=20.0)
+    args = parser.parse_args()
+    formats = args.formats.split(",")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        image, pdf = os.path.join(out_dir, "out.png"), os.path.join(out_dir, "out.pdf")
+        reference = None
+        started = time.perf_counter()
+        for i in range(args.renders):
+            with contextlib.redirect_stdout(io.StringIO()):
+                process_xrd(args.scan, image, pdf, 20, 70, 200, None, theta_distance_deg=0.2, formats=formats)
+            if i + 1 == args.warmup:
+                reference = rss_mb()
+            if (i + 1) % 100 == 0:
+                print(f"{i + 1:5d} renders  rss {rss_mb():7.1f} MB")
+        elapsed = time.perf_counter() - started
+
+    growth = rss_mb() - (reference if reference is not None else 0.0)
+    print(f"{args.renders} renders in {elapsed:.1f} s ({elapsed / args.renders * 1000:.1f} ms each), "
+          f"RSS growth after warm-up: {growth:.1f} MB")
+    if reference is not None and growth > args.max_growth_mb:
+        print(f"FAIL: RSS grew by more than {args.max_growth_mb} MB")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Stacked-pattern benchmark: StackedAnalysis vs one analysis per pattern.
+
+Times a stack of synthetic patterns on one 2θ grid three ways: process_xrd
+on each pattern's CSV (binary copies already cached, no plots), XRDAnalysis
+on each in-memory row, and one StackedAnalysis over the whole array.
+
+    python python_scripts/benchmarks/stacked.py [--patterns 200] [--points 5000] [--baseline rolling]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from baselines import synthetic_pattern  # noqa: E402
+from process_xrd import process_xrd  # noqa: E402
+from xrd import BASELINE_METHODS, StackedAnalysis, XRDAnalysis  # noqa: E402
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patterns", type=int, default=200)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--baseline", default="min", choices=sorted(BASELINE_METHODS))
+    args = parser.parse_args()
+
+    two_theta = synthetic_pattern(args.points)[0]
+    stack = np.array([synthetic_pattern(args.points, seed=seed)[1] for seed in range(args.patterns)])
+    params = {"min_theta": 20, "max_theta": 70, "min_intensity": 200, "theta_distance": None,
+              "theta_distance_deg": 0.2, "baseline_method": args.baseline}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for index, intensity in enumerate(stack):
+            path = os.path.join(tmp, f"pattern-{index}.csv")
+            np.savetxt(path, np.column_stack([two_theta, intensity]), delimiter=",", fmt="%.6f",
+                       header="2theta,Intensity", comments="")
+            paths.append(path)
+
+        def per_file():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return [process_xrd(path, None, None, plot=False, **params) for path in paths]
+
+        per_file()  # parse the CSVs once, so only the analysis and binary loads are timed
+        file_time, _ = timed(per_file)
+
+    row_time, rows = timed(lambda: [XRDAnalysis(two_theta, intensity, **params).results() for intensity in stack])
+    stack_time, stacked = timed(lambda: StackedAnalysis(two_theta, stack, **params).results())
+    assert [row["n_peaks"] for row in rows] == [row["n_peaks"] for row in stacked]
+
+    print(f"{args.patterns} patterns x {args.points} points, baseline {args.baseline}")
+    print(f"{'path':>26} {'total':>10} {'per pattern':>12} {'speed-up':>9}")
+    for name, elapsed in [("process_xrd per pattern", file_time), ("XRDAnalysis per pattern", row_time),
+                          ("StackedAnalysis", stack_time)]:
+        print(f"{name:>26} {elapsed * 1000:>8.1f}ms {elapsed / args.patterns * 1000:>10.3f}ms "
+              f"{file_time / elapsed:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Cold-start benchmark for process_xrd.
+
+Runs `python -X importtime` on the module import and on a --no-plot CLI run,
+reports the cumulative import time and the slowest top-level imports, and
+exits non-zero when the import time goes over --budget-ms so start-up
+regressions get caught.
+
+    python python_scripts/benchmarks/startup.py [scan.csv] [--budget-ms 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+DEFAULT_SCAN = os.path.join(REPO_DIR, "uploads", "file-1733586079108-692833970.csv")
+
+def import_times(command):
+    """Runs command under -X importtime and returns {module: (self_us, cumulative_us, depth)}."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *command], cwd=SCRIPTS_DIR,
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+def report(title, times, top):
+    total = sum(cumulative for _, cumulative, depth in times.values() if depth == 0)
+    print(f"{title}: {total / 1000:.1f} ms of imports")
+    roots = sorted(((cumulative, name) for name, (_, cumulative, depth) in times.items() if depth == 0), reverse=True)
+    for cumulative, name in roots[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    return total / 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scan", nargs="?", default=DEFAULT_SCAN)
+    parser.add_argument("--top", type=int, default=8, help="number of top-level imports to list")
+    parser.add_argument("--budget-ms", type=float, help="fail if importing process_xrd takes longer")
+    args = parser.parse_args()
+
+    module_ms = report("import process_xrd", import_times(["-c", "import process_xrd"]), args.top)
+
+    cli = ["process_xrd.py", args.scan, os.devnull, os.devnull, "20", "70", "200", "10", "--no-plot"]
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *cli], cwd=SCRIPTS_DIR, capture_output=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    report("process_xrd.py --no-plot", import_times(cli), args.top)
+    print(f"process_xrd.py --no-plot wall time: {wall_ms:.1f} ms")
+
+    if args.budget_ms is not None and module_ms > args.budget_ms:
+        print(f"FAIL: import took {module_ms:.1f} ms, budget is {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import csv
+import glob
+import argparse
+
+from batch_xrd import add_analysis_arguments, analysis_params
+from process_xrd import compare_report, print_timing, write_json
+from xrd import RENDER_FORMATS
+from xrd.compare import SUMMARY_COLUMNS
+
+def expand_series(patterns):
+    """Files in the order given; a glob pattern adds its matches sorted by name."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(path for path in matches if os.path.isfile(path) and path not in files)
+    return files
+
+def write_summary(report, path):
+    """One row per sample: crystallinity and the highest peak with its shift."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(report["samples"])
+
+def write_shifts(report, path):
+    """One row per peak of the reference sample, with its shift in every sample (blank when unmatched)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["position"] + [sample["sample"] for sample in report["samples"]])
+        for peak in report["peak_shifts"]:
+            writer.writerow([f"{peak['position']:.4f}"] +
+                            ["" if shift is None else f"{shift:.4f}" for shift in peak["shifts"]])
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Compare a series of XRD scans: one overlay plot plus "
+                                                 "crystallinity and peak shift tables")
+    parser.add_argument("inputs", nargs="+", help="CSV files in series order, or glob patterns")
+    add_analysis_arguments(parser)
+    parser.add_argument("--labels", help="comma-separated sample labels (default: file names)")
+    parser.add_argument("--reference", type=int, default=0, help="index of the sample the shifts are measured from")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="largest shift in degrees of 2θ that still matches a peak")
+    parser.add_argument("--step", type=float, help="2θ step of the common grid (default: finest scan step)")
+    parser.add_argument("--offset", type=float, help="vertical offset between patterns (default: automatic)")
+    parser.add_argument("-o", "--output", default="comparison",
+                        help="report prefix: writes PREFIX.<format>, PREFIX-summary.csv, PREFIX-shifts.csv, "
+                             "PREFIX.json")
+    parser.add_argument("--formats", default="png,pdf", help="plot formats (png, pdf, svg)")
+    parser.add_argument("--dpi", type=float)
+    parser.add_argument("--timing", action="store_true", help="print the time spent in each stage to stderr")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    files = expand_series(args.inputs)
+    if not files:
+        print("No input files found.", file=sys.stderr)
+        return 1
+    labels = [label.strip() for label in args.labels.split(",")] if args.labels else None
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in RENDER_FORMATS]
+    if unknown:
+        print(f"Error: unsupported format(s): {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    try:
+        report = compare_report(files, labels, outputs={fmt: f"{args.output}.{fmt}" for fmt in formats},
+                                reference=args.reference, tolerance=args.tolerance, step=args.step,
+                                offset=args.offset, dpi=args.dpi, **analysis_params(args))
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    timing = report.pop("timing")
+    write_json(report, f"{args.output}.json")
+    write_summary(report, f"{args.output}-summary.csv")
+    write_shifts(report, f"{args.output}-shifts.csv")
+    for sample in report["samples"]:
+        shift = "" if sample["peak_shift"] is None else f", shift {sample['peak_shift']:+.3f}°"
+        position = "no peaks" if sample["peak_position"] is None else f"highest peak {sample['peak_position']:.2f}°"
+        percent = sample["percent_crystallinity"]
+        crystallinity = "no area" if percent is None else f"{percent:.2f}% crystalline"
+        print(f"{sample['sample']}: {crystallinity}, {position}{shift}")
+    print(f"Compared {len(files)} scans; report written to {args.output}.*", file=sys.stderr)
+    if args.timing:
+        print_timing(timing, file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,44 @@
+import sys
+import time
+import argparse
+
+from xrd import ReferenceLibrary, load_references, read_cards
+
+def build(source, output):
+    """Indexes the cards at source (a directory of card CSVs or one CSV of all cards) into a .npz library."""
+    started = time.perf_counter()
+    library = ReferenceLibrary.from_cards(read_cards(source))
+    library.save(output)
+    print(f"Indexed {len(library)} cards ({len(library.d)} lines) into {output} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+def info(path):
+    library = load_references(path)
+    print(f"{len(library)} cards, {len(library.d)} lines, d {library.d.min():.3f}-{library.d.max():.3f} Å, "
+          f"version {library.version}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build and inspect the phase reference library for search-match")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="index reference cards into a .npz library")
+    build_parser.add_argument("source", help="directory of card CSVs (d, intensity) or one CSV with a phase column")
+    build_parser.add_argument("-o", "--output", required=True, help="library file to write (.npz)")
+    info_parser = commands.add_parser("info", help="summarize a library")
+    info_parser.add_argument("library", help="a .npz library, a card directory or a CSV of cards")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    try:
+        if args.command == "build":
+            build(args.source, args.output)
+        else:
+            info(args.library)
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
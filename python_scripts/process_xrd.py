@@ -1,142 +1,507 @@
+import os
 import sys
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks
-from scipy.interpolate import interp1d
-from numpy import trapezoid  # Update import from trapz to trapezoid
-
-def process_xrd(file_path, output_image, output_pdf, min_theta, max_theta,min_intensity,theta_distance,max_intensity=20000,max_peaks=9):
-
-    min_theta = float(min_theta)
-    max_theta = float(max_theta)
-    min_intensity = float(min_intensity)
-    theta_distance= float(theta_distance)
-    
-    # Set output encoding to UTF-8
-    sys.stdout.reconfigure(encoding='utf-8')
-    
-    # Load the XRD data
-    data = pd.read_csv(file_path, header=0)
-    
-    # Strip spaces and standardize column names
-    data.columns = data.columns.str.strip().str.lower()
-
-    # Check if required columns are present
-    if '2theta' not in data.columns or 'intensity' not in data.columns:
-        print("Error: Missing required columns ('2theta', 'Intensity') in the CSV file.")
-        print("Available columns:", data.columns.tolist())
-        return
+import io
+import json
+import hashlib
+import functools
+import contextlib
 
-    # Extract 2-theta and intensity
-    two_theta = data['2theta']
-    intensity = data['intensity']
+# Always render off-screen: the server has no display, and picking the backend
+# here (before matplotlib is imported anywhere) keeps pyplot from probing GUIs.
+os.environ.setdefault("MPLBACKEND", "Agg")
 
-    # Baseline correction (amorphous background estimation)
-    baseline = np.min(intensity)
+from xrd import (BASELINE_METHODS, CU_K_ALPHA, PROFILES, RENDER_MODES, AnalysisSessions, ScanComparison, StageTimer,
+                 XRDAnalysis, ingest_scan, load_plot_data, load_references, normalize_params, open_pyramid,
+                 output_paths, render_options, render_xrd, save_plot_data, scan_data)
+from xrd.scan_io import atomic_write
 
-    # Subtract baseline from the intensity
-    corrected_intensity = intensity - baseline
+# scipy.signal and matplotlib cost more to import than the analysis itself,
+# so the xrd package imports them inside the functions that use them.
 
-    # Integrate total area (crystalline + amorphous)
-    total_area = trapezoid(intensity, two_theta)
+def process_xrd(file_path, output_image, output_pdf, min_theta, max_theta,min_intensity,theta_distance,max_intensity=20000,max_peaks=9,plot=True,
+                formats=("png", "pdf"), output_svg=None, cache=None, output_json=None,
+                wavelength=CU_K_ALPHA, scherrer_k=0.9, instrument_broadening=0.0,
+                baseline_method="min", baseline_options=None, prominence=95.0, min_width=0.0,
+                windows=None, fit_profile=None, phase_matches=0, match_tolerance=0.2, references=None,
+                render_mode="full", dpi=None, figsize=None, output_thumbnail=None, profile=None,
+                output_plot_data=None, theta_distance_deg=None):
+    """Analyzes one scan, prints and returns the results and renders the requested formats.
 
-    # Integrate crystalline area (above the baseline)
-    crystalline_area = trapezoid(corrected_intensity, two_theta)
+    The analysis itself is xrd.XRDAnalysis. The results dict holds the
+    crystallinity metrics, the highest peak and a "peaks" table (position,
+    height, prominence, FWHM, d-spacing and Scherrer crystallite size of every
+    peak); with output_json it is also written there as a JSON document.
+    baseline_method picks the amorphous background estimate (see
+    xrd.BASELINE_METHODS), with baseline_options passed through to it. With a
+    ResultCache, repeat requests for the same file bytes and parameters are
+    answered from the cache. theta_distance, the minimum peak separation, is
+    in samples of the scan; with theta_distance None it is theta_distance_deg
+    degrees of 2θ instead (see xrd.DEFAULT_PARAMS). min_width is in degrees,
+    prominence in counts. windows ([[min_theta, max_theta], ...]) adds the
+    crystallinity of each 2θ range to the results; fit_profile ("gaussian",
+    "lorentzian" or "pseudo_voigt") adds a "fits" table of profiles fitted
+    to the detected peaks. phase_matches > 0 adds a "phases" table of the
+    best-matching reference phases, a reference line matching a peak within
+    match_tolerance degrees of 2θ; references is the reference library path
+    (see xrd.load_references), XRD_REFERENCE_DB by default. render_mode
+    ("full", "preview" or "thumbnail", see xrd.RENDER_MODES), dpi and
+    figsize set how the plots are drawn; output_thumbnail also renders a thumbnail PNG there.
+    The results carry a "timing" report: wall and CPU time of every stage
+    (load, baseline, peaks, widths, draw, savefig_png, ...), the worker's
+    lifetime peak RSS and how much this call raised it,
+    see xrd.StageTimer. With profile, a cProfile dump of the whole call is
+    written to that path (read it with pstats or snakeviz).
+    With output_plot_data the plots are not drawn here: what they need is
+    written to that .npz file, and the results carry "deferred_render"
+    ({"plot_data": path, "cache_key": key}) for render_artifact() to draw
+    each artifact afterwards, e.g. all at once on other workers. Artifacts
+    restored from the cache are not deferred.
+    Returns None when the CSV lacks the required columns.
+    """
+    if profile:
+        arguments = dict(locals(), profile=None)
+        import cProfile
 
-    # Calculate % Crystallinity
-    percent_crystallinity = (crystalline_area / total_area) * 100
+        with cProfile.Profile() as profiler:
+            results = process_xrd(**arguments)
+        profiler.dump_stats(profile)
+        return results
 
-    # Filter the data to include only 2-theta values between 20° and 70°
-    filtered_data = data[(two_theta >= min_theta) & (two_theta <= max_theta)]
-    filtered_theta = filtered_data['2theta']
-    filtered_intensity = filtered_data['intensity']
+    timer = StageTimer()
+    outputs = output_paths(output_image, output_pdf, formats, output_svg) if plot else {}
+    render = render_options(render_mode, dpi, figsize)
+    # Artifacts as cached: the requested formats plus the thumbnail
+    artifacts = dict(outputs, thumbnail=output_thumbnail) if plot and output_thumbnail else outputs
+    params = normalize_params(min_theta=min_theta, max_theta=max_theta, min_intensity=min_intensity,
+                              prominence=prominence, theta_distance=theta_distance,
+                              theta_distance_deg=theta_distance_deg, min_width=min_width,
+                              wavelength=wavelength, scherrer_k=scherrer_k,
+                              instrument_broadening=instrument_broadening, baseline_method=baseline_method,
+                              baseline_options=baseline_options, windows=windows,
+                              fit_profile=fit_profile, phase_matches=phase_matches,
+                              match_tolerance=match_tolerance)
+    library = reference_library(references) if params["phase_matches"] else None
 
-    
-    
-        # Find peaks in the filtered intensity data
-    peaks, properties = find_peaks(filtered_intensity, height=min_intensity, prominence=95, distance=theta_distance)
+    if cache is not None:
+        with timer.stage("cache_lookup"):
+            key = cache.key(file_path, dict(params, render=render, references=library and library.version))
+            results = cache.get(key, artifacts)
+        if results is not None:
+            print_results(results)
+            if output_json:
+                write_json(results, output_json)
+            print("Processing complete!")
+            return dict(results, cache="hit", timing=timer.report())
 
-    if len(peaks) > 0:
-        # Get the index of the highest peak
-        max_peak_index = np.argmax(properties['peak_heights'])
-        peak_position = filtered_theta.iloc[peaks[max_peak_index]]
-        peak_intensity = properties['peak_heights'][max_peak_index]
+    # Load the XRD data (binary copy beside the upload after the first parse)
+    try:
+        with timer.stage("load"):
+            analysis = XRDAnalysis.from_file(file_path, library, **params)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        return None
+    analysis.timer = timer
 
-        # Calculate half maximum
-        half_max = peak_intensity / 2
+    with timer.stage("results"):
+        results = analysis.results()
+    results["parameters"] = params
+    print_results(results)
+    if output_json:
+        write_json(results, output_json)
 
-        # Interpolate around the peak to find FWHM
-        interp_func = interp1d(filtered_theta, filtered_intensity, kind='linear', bounds_error=False, fill_value=0)
-        fine_theta = np.linspace(peak_position - 1, peak_position + 1, 1000)
-        fine_intensity = interp_func(fine_theta)
-        left_idx = np.where(fine_intensity >= half_max)[0][0]
-        right_idx = np.where(fine_intensity >= half_max)[0][-1]
+    deferred = None
+    if artifacts and output_plot_data:
+        with timer.stage("plot_data"):
+            save_plot_data(output_plot_data, *analysis.plot_data())
+        deferred = {"plot_data": output_plot_data, "cache_key": key if cache is not None else None}
+    else:
+        if outputs:
+            analysis.render(outputs, mode=render_mode, dpi=dpi, figsize=figsize)
+        if artifacts is not outputs:
+            with timer.stage("thumbnail"):
+                render_xrd({"png": output_thumbnail}, *analysis.plot_data(), mode="thumbnail")
+    if cache is not None:
+        with timer.stage("cache_store"):
+            # Deferred artifacts join the entry as they are rendered
+            cache.put(key, results, {} if deferred else artifacts)
+        results = dict(results, cache="miss")
+    if deferred:
+        results = dict(results, deferred_render=deferred)
+    print("Processing complete!")
+    return dict(results, timing=timer.report())
 
-        # Calculate FWHM
-        fwhm = fine_theta[right_idx] - fine_theta[left_idx]
+def render_artifact(plot_data, artifact, path, render_mode="full", dpi=None, figsize=None, cache_key=None,
+                    cache=None):
+    """Draws one artifact of a process_xrd(output_plot_data=...) analysis from its saved plot data.
 
-        print(f"Highest Peak Position (2θ): {peak_position:.2f}°")
-        print(f"Peak Intensity: {peak_intensity:.2f}")
-        print(f"FWHM: {fwhm:.2f}°")
+    artifact is a render format ("png", "pdf", "svg") or "thumbnail" (a PNG
+    in the thumbnail render mode); render_mode, dpi and figsize as in
+    process_xrd. With cache_key the artifact is added to that result cache
+    entry, so the next identical request is a hit. Returns the path and a
+    timing report.
+    """
+    timer = StageTimer()
+    with timer.stage("load_plot_data"):
+        data = load_plot_data(plot_data)
+    if artifact == "thumbnail":
+        render_xrd({"png": path}, *data, mode="thumbnail", timer=timer)
+    else:
+        render_xrd({artifact: path}, *data, mode=render_mode, dpi=dpi, figsize=figsize, timer=timer)
+    if cache is not None and cache_key:
+        with timer.stage("cache_store"):
+            cache.add_artifacts(cache_key, {artifact: path})
+    return {"artifact": artifact, "path": path, "timing": timer.report()}
+
+def analyze_session(sessions, session_id, file_path=None, outputs=None, close=False, render=None, references=None,
+                    **params):
+    """Interactive counterpart of process_xrd: re-analyzes an open session with new parameters.
+
+    sessions is an xrd.AnalysisSessions. The scan and the stages computed so
+    far stay in memory between calls, so only the stages fed by changed
+    parameters are recomputed ("recomputed" in the results, "all" when the
+    session was (re)opened). Plots are rendered only when outputs
+    ({format: path}) are given, with render holding render_xrd's mode, dpi
+    and figsize. references is the reference library path for phase_matches,
+    as in process_xrd. The results carry a "timing" report of the stages this
+    call ran. With close=True the session is dropped instead.
+    Invalid parameters raise ValueError before the session is touched, so it
+    keeps its previous parameters and stages. Returns None when the CSV lacks
+    the required columns.
+    """
+    if close:
+        return {"closed": sessions.close(session_id)}
+    timer = StageTimer()
+    params = normalize_params(**params)
+    library = reference_library(references) if params["phase_matches"] else None
+    try:
+        with timer.stage("load"):
+            analysis, recomputed = sessions.analyze(session_id, file_path, library, **params)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        return None
+
+    analysis.timer = timer
+    try:
+        with timer.stage("results"):
+            results = analysis.results()
+        results.update(parameters=analysis.params, recomputed="all" if recomputed is None else recomputed)
+        if outputs:
+            analysis.render(outputs, **(render or {}))
+    finally:
+        analysis.timer = None
+    return dict(results, timing=timer.report())
+
+def compare_report(file_paths, labels=None, outputs=None, output_json=None, reference=0, tolerance=0.3, step=None,
+                   offset=None, dpi=None, figsize=None, references=None, **params):
+    """Compares a series of scans (e.g. calcination temperatures) in one report.
+
+    The scans are aligned on their common 2θ range and analyzed together
+    (see xrd.ScanComparison) with the analysis parameters of process_xrd.
+    The report holds a "samples" table (crystallinity and highest peak of
+    every sample, with its shift from the reference sample's), the
+    "peak_shifts" of every peak of the reference sample across the series
+    (matched within tolerance degrees of 2θ), the shared "grid" and the full
+    "results" of every sample. With outputs ({format: path}) all samples are
+    drawn offset on one figure, and with output_json the report is written
+    there. labels default to the file names; reference is an index into
+    file_paths.
+    """
+    if not file_paths:
+        raise ValueError("No scans to compare")
+    if isinstance(reference, float) and reference.is_integer():
+        reference = int(reference)
+    if isinstance(reference, bool) or not isinstance(reference, int) or not 0 <= reference < len(file_paths):
+        raise ValueError(f"reference must be the index of one of the {len(file_paths)} scans")
+    timer = StageTimer()
+    params = normalize_params(**params)
+    library = reference_library(references) if params["phase_matches"] else None
+    with timer.stage("load"):
+        comparison = ScanComparison.from_files(file_paths, labels, step, library, **params)
+    with timer.stage("results"):
+        report = {
+            "samples": comparison.summary(reference, tolerance),
+            "peak_shifts": comparison.peak_shifts(reference, tolerance),
+            "reference": comparison.labels[reference],
+            "tolerance": tolerance,
+            "grid": {"min_theta": float(comparison.grid[0]), "max_theta": float(comparison.grid[-1]),
+                     "step": float(comparison.grid[1] - comparison.grid[0]) if len(comparison.grid) > 1 else 0.0,
+                     "points": len(comparison.grid)},
+            "results": [dict(results, sample=label) for label, results in zip(comparison.labels, comparison.results)],
+            "parameters": params,
+        }
+    if outputs:
+        comparison.render(outputs, offset=offset, dpi=dpi, figsize=figsize, timer=timer)
+    if output_json:
+        write_json(report, output_json)
+    return dict(report, timing=timer.report())
+
+def reference_library(path=None):
+    """The phase reference library at path (XRD_REFERENCE_DB by default), or None when neither is set.
+
+    Libraries are indexed once per process and reused (see xrd.load_references).
+    """
+    path = path or os.environ.get("XRD_REFERENCE_DB")
+    return load_references(path) if path else None
+
+def write_json(results, path):
+    """Writes results as a JSON document to path ("-" for stdout), replacing any previous file in one step."""
+    document = json.dumps(results, indent=2, ensure_ascii=False)
+    if path == "-":
+        print(document)
+        return
+    atomic_write(path, lambda f: f.write((document + "\n").encode("utf-8")))
+
+def print_results(results):
+    if results["n_peaks"] > 0:
+        print(f"Highest Peak Position (2θ): {results['peak_position']:.2f}°")
+        print(f"Peak Intensity: {results['peak_intensity']:.2f}")
+        print(f"FWHM: {results['fwhm']:.2f}°")
+        print(f"d-spacing: {results['d_spacing']:.4f} Å")
+        if results['crystallite_size_nm'] is not None:
+            print(f"Crystallite Size (Scherrer): {results['crystallite_size_nm']:.2f} nm")
     else:
         print("No peaks found in the specified range.")
 
     # Display crystallinity results
-    print(f"Baseline (Amorphous Contribution): {baseline}")
-    print(f"Total Area: {total_area:.2f}")
-    print(f"Crystalline Area: {crystalline_area:.2f}")
-    print(f"% Crystallinity: {percent_crystallinity:.2f}%")
-
-    # Plot the XRD data with the baseline and peaks
-    plt.figure(figsize=(10, 6))
-    # plt.plot(two_theta, intensity, label='Original XRD Data', color='blue')
-    plt.plot(filtered_theta, filtered_intensity, label='Original XRD Data', color='blue')
-    plt.plot(filtered_theta, [baseline] * len(filtered_theta), label='Baseline (Amorphous)', color='red', linestyle='--')
-    plt.fill_between(filtered_theta, baseline, filtered_intensity, where=(filtered_intensity > baseline), color='green', alpha=0.3,
-                     label='Crystalline Area')
-    
-    # Plot detected peaks as red dots
-    if len(peaks) > 0:
-        plt.scatter(filtered_theta.iloc[peaks], filtered_intensity.iloc[peaks], color='red', zorder=5, label='Detected Peaks')
-        
-        # Annotate each peak with its x (2θ) and y (intensity) values
-        for peak in peaks:
-            peak_x = filtered_theta.iloc[peak]
-            peak_y = filtered_intensity.iloc[peak]
-            plt.annotate(f'({peak_x:.2f}, {peak_y:.2f})', 
-                         (peak_x, peak_y), 
-                         textcoords="offset points", 
-                         xytext=(0, 10), 
-                         ha='center', color='red', fontsize=9)
-
-        # Display FWHM (Full Width at Half Maximum)
-        plt.hlines(y=half_max, xmin=fine_theta[left_idx], xmax=fine_theta[right_idx], color='purple', linestyle='--',
-                   label=f'FWHM = {fwhm:.2f}°')
-
-    # Add labels and legends
-    plt.title('XRD Data with Crystallinity Analysis and Peak Detection')
-    plt.xlabel('2θ (degrees)')
-    plt.ylabel('Intensity (a.u.)')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-
-    # Save plots
-    plt.savefig(output_image)  # Save as image
-    plt.savefig(output_pdf)    # Save as PDF
-    plt.show()
-    print("Processing complete!")
+    if results['baseline_method'] == "min":
+        print(f"Baseline (Amorphous Contribution): {results['baseline']}")
+    else:
+        print(f"Baseline (Amorphous Contribution): {results['baseline_method']}, mean {results['baseline']:.2f}")
+    print(f"Total Area: {results['total_area']:.2f}")
+    print(f"Crystalline Area: {results['crystalline_area']:.2f}")
+    percent = results['percent_crystallinity']
+    print("% Crystallinity: n/a (no area)" if percent is None else f"% Crystallinity: {percent:.2f}%")
+
+def print_timing(timing, file=None):
+    """Prints a timing report (see xrd.StageTimer.report) as a table, slowest stage first."""
+    print(f"{'stage':<22} {'wall ms':>9} {'cpu ms':>9} {'calls':>5}", file=file)
+    for name, stage in sorted(timing["stages"].items(), key=lambda item: -item[1]["wall_ms"]):
+        print(f"{name:<22} {stage['wall_ms']:>9.1f} {stage['cpu_ms']:>9.1f} {stage['calls']:>5}", file=file)
+    print(f"{'total':<22} {timing['wall_ms']:>9.1f} {timing['cpu_ms']:>9.1f}", file=file)
+    if timing["process_peak_rss_mb"] is not None:
+        print(f"Process peak RSS: {timing['process_peak_rss_mb']:.1f} MB "
+              f"(+{timing['peak_rss_growth_mb']:.1f} MB in this run)", file=file)
+
+def code_version():
+    """Hash of the analysis sources (this script and the xrd package), so cached results go stale when they change."""
+    import xrd
+
+    package_dir = os.path.dirname(xrd.__file__)
+    sources = [__file__] + sorted(os.path.join(package_dir, name) for name in os.listdir(package_dir)
+                                  if name.endswith(".py"))
+    digest = hashlib.sha256()
+    for source in sources:
+        with open(source, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def open_cache(cache_dir, max_mb=500):
+    """Opens the result cache in cache_dir, bounded to max_mb megabytes."""
+    from xrd import ResultCache
+
+    return ResultCache(cache_dir, max_bytes=int(float(max_mb) * 2**20), code_version=code_version())
+
+def warm_up():
+    """Imports the heavy modules ahead of the first job."""
+    import scipy.signal  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.backends.backend_pdf  # noqa: F401
+
+def ingest_upload(file_path):
+    """Scan store entries of a new upload: binary copy, metadata and, for ascending scans, the min/max pyramid."""
+    metadata = ingest_scan(file_path)
+    if metadata["ascending"]:
+        open_pyramid(file_path)
+    return metadata
+
+# Jobs other than analyses that the server hands to the workers
+WORKER_TASKS = {
+    "ingest": ingest_upload,
+    # A 2θ window of a scan at a bounded point count (see xrd.pyramid.scan_data)
+    "data": scan_data,
+    "compare": compare_report,
+}
+
+def run_worker():
+    """Serve process_xrd jobs from a long-lived process.
+
+    Jobs arrive on stdin as one JSON object per line, {"id": ..., "args": {...}}
+    with the keyword arguments of process_xrd(). Each job is answered with one
+    JSON line on stdout: {"id": ..., "ok": bool, "log": str, "error": str}.
+    Anything the analysis prints is captured into "log" so stdout stays free
+    for the protocol, and the numbers come back in "results".
+
+    Jobs with a "session" id run analyze_session() on this worker's open
+    sessions instead, {"id": ..., "session": ..., "args": {...}}; the caller
+    sends every job of a session to the same worker. Jobs with a "task" run
+    one of WORKER_TASKS, e.g. {"id": ..., "task": "ingest", "args": {"file_path": ...}},
+    or "render" for render_artifact().
+
+    Results are cached in XRD_CACHE_DIR (bounded by XRD_CACHE_MAX_MB) when set.
+    At most XRD_MAX_SESSIONS (default 16) sessions stay open per worker.
+    """
+    warm_up()
+    cache_dir = os.environ.get("XRD_CACHE_DIR")
+    cache = open_cache(cache_dir, os.environ.get("XRD_CACHE_MAX_MB", 500)) if cache_dir else None
+    sessions = AnalysisSessions(os.environ.get("XRD_MAX_SESSIONS", 16))
+    tasks = dict(WORKER_TASKS, render=functools.partial(render_artifact, cache=cache))
+
+    protocol = sys.stdout
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    protocol.flush()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as exc:
+            print(f"Invalid job: {exc}", file=sys.stderr)
+            continue
+
+        reply = {"id": job.get("id"), "ok": True}
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(log):
+                if "task" in job:
+                    reply["results"] = tasks[job["task"]](**job.get("args", {}))
+                elif "session" in job:
+                    reply["results"] = analyze_session(sessions, job["session"], **job.get("args", {}))
+                else:
+                    reply["results"] = process_xrd(**job.get("args", {}), cache=cache)
+            if reply["results"] is None:
+                reply["ok"] = False
+                reply["error"] = "Missing required columns ('2theta', 'Intensity') in the CSV file."
+        except Exception as exc:
+            reply["ok"] = False
+            reply["error"] = f"{type(exc).__name__}: {exc}"
+        reply["log"] = log.getvalue()
+
+        try:
+            # NaN/inf are not JSON; a result holding one becomes an error reply
+            message = json.dumps(reply, allow_nan=False)
+        except (TypeError, ValueError) as exc:
+            message = json.dumps({"id": reply["id"], "ok": False, "log": reply["log"],
+                                  "error": f"Unserializable results: {type(exc).__name__}: {exc}"})
+        protocol.write(message + "\n")
+        protocol.flush()
+
+def parse_options(pairs):
+    """Turns ["lam=1e6", "degree=3"] into {"lam": "1e6", "degree": "3"}.
+
+    The values stay text; normalize_params coerces them to the types the
+    baseline method takes (see xrd.baseline.baseline_options).
+    """
+    options = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        options[name.strip()] = value.strip()
+    return options
+
+def parse_window(text):
+    """argparse type for "20:30", a 2θ range given as min:max."""
+    import argparse
+
+    lo, _, hi = text.partition(":")
+    try:
+        return [float(lo), float(hi)]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MIN:MAX in degrees, got {text!r}") from None
+
+def parse_size(text):
+    """argparse type for "10x6", a figure size in inches."""
+    import argparse
+
+    width, _, height = text.lower().partition("x")
+    try:
+        return [float(width), float(height)]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT in inches, got {text!r}") from None
+
+def parse_args(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="XRD crystallinity and peak analysis")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_image")
+    parser.add_argument("output_pdf")
+    parser.add_argument("min_theta", type=float)
+    parser.add_argument("max_theta", type=float)
+    parser.add_argument("min_intensity", type=float)
+    parser.add_argument("theta_distance", type=float, help="minimum separation between peaks in samples of the scan")
+    parser.add_argument("--theta-distance-deg", type=float,
+                        help="minimum separation between peaks in degrees of 2θ, instead of theta_distance")
+    parser.add_argument("--prominence", type=float, default=95.0, help="minimum peak prominence in counts (default: 95)")
+    parser.add_argument("--min-width", type=float, default=0.0,
+                        help="minimum peak width at half prominence in degrees of 2θ (default: 0, off)")
+    parser.add_argument("--wavelength", type=float, default=CU_K_ALPHA,
+                        help="X-ray wavelength in Å for d-spacing and Scherrer size (default: Cu Kα1, 1.5406)")
+    parser.add_argument("--scherrer-k", type=float, default=0.9, help="Scherrer shape factor K (default: 0.9)")
+    parser.add_argument("--instrument-broadening", type=float, default=0.0,
+                        help="instrumental FWHM in degrees, removed in quadrature (default: 0)")
+    parser.add_argument("--baseline", default="min", choices=sorted(BASELINE_METHODS),
+                        help="amorphous background estimate (default: min, the global minimum)")
+    parser.add_argument("--baseline-option", action="append", default=[], metavar="NAME=VALUE",
+                        help="numeric option for the baseline method, e.g. lam=1e6 (repeatable)")
+    parser.add_argument("--window", action="append", default=[], type=parse_window, metavar="MIN:MAX",
+                        help="also report the crystallinity over this 2θ range (repeatable)")
+    parser.add_argument("--fit", choices=list(PROFILES),
+                        help="fit this profile to the detected peaks (center, FWHM, area, Lorentzian fraction)")
+    parser.add_argument("--phase-matches", type=int, default=0,
+                        help="report this many best-matching reference phases (default: 0, off)")
+    parser.add_argument("--match-tolerance", type=float, default=0.2,
+                        help="2θ tolerance in degrees for a reference line to match a peak (default: 0.2)")
+    parser.add_argument("--references", help="phase reference library: a .npz from phase_db.py, a directory of "
+                                             "card CSVs or one CSV of all cards (default: $XRD_REFERENCE_DB)")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="metrics only: skip matplotlib and write no image/PDF")
+    parser.add_argument("--formats", default="png,pdf",
+                        help="comma-separated formats to render: png, pdf, svg (default: png,pdf)")
+    parser.add_argument("--render-mode", default="full", choices=list(RENDER_MODES),
+                        help="full draws every point; preview decimates dense scans (default: full)")
+    parser.add_argument("--dpi", type=float, help="resolution of PNG renders")
+    parser.add_argument("--size", type=parse_size, metavar="WxH", help="figure size in inches (default: 10x6)")
+    parser.add_argument("--thumbnail", help="also render a small thumbnail PNG to this path")
+    parser.add_argument("--output-svg", help="SVG path (default: the image path with a .svg suffix)")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as one JSON document on stdout (the text report goes to stderr)")
+    parser.add_argument("--json-out", help="also write the JSON results to this sidecar file")
+    parser.add_argument("--cache-dir", help="reuse results and artifacts cached in this directory")
+    parser.add_argument("--cache-max-mb", type=float, default=500, help="cache size bound (default: 500 MB)")
+    parser.add_argument("--timing", action="store_true", help="print the per-stage timing report")
+    parser.add_argument("--profile", metavar="PATH", help="write a cProfile dump of the analysis to this file")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: python script.py <input_csv_path> <output_image_path> <output_pdf_path>")
+    # Set output encoding to UTF-8
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    if len(sys.argv) == 2 and sys.argv[1] == "--worker":
+        run_worker()
     else:
-        input_csv = sys.argv[1]
-        output_image = sys.argv[2]
-        output_pdf = sys.argv[3]
-        min_theta  = sys.argv[4]
-        max_theta =sys.argv[5]
-        min_intensity= sys.argv[6]
-        theta_distance = sys.argv[7]
-        process_xrd(input_csv, output_image, output_pdf,  min_theta, max_theta,min_intensity, theta_distance)
+        args = parse_args(sys.argv[1:])
+        cache = open_cache(args.cache_dir, args.cache_max_mb) if args.cache_dir else None
+        with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+            results = process_xrd(args.input_csv, args.output_image, args.output_pdf, args.min_theta, args.max_theta,
+                                  args.min_intensity,
+                                  args.theta_distance if args.theta_distance_deg is None else None,
+                                  theta_distance_deg=args.theta_distance_deg, plot=not args.no_plot,
+                                  formats=[fmt.strip() for fmt in args.formats.split(",") if fmt.strip()],
+                                  output_svg=args.output_svg, cache=cache, output_json=args.json_out,
+                                  wavelength=args.wavelength, scherrer_k=args.scherrer_k,
+                                  instrument_broadening=args.instrument_broadening,
+                                  baseline_method=args.baseline,
+                                  baseline_options=parse_options(args.baseline_option),
+                                  prominence=args.prominence, min_width=args.min_width, windows=args.window,
+                                  fit_profile=args.fit, phase_matches=args.phase_matches,
+                                  match_tolerance=args.match_tolerance, references=args.references,
+                                  render_mode=args.render_mode, dpi=args.dpi, figsize=args.size,
+                                  output_thumbnail=args.thumbnail, profile=args.profile)
+        if results is None:
+            sys.exit(1)
+        if args.timing:
+            print_timing(results["timing"], sys.stderr if args.json else sys.stdout)
+        if args.json:
+            write_json(results, "-")
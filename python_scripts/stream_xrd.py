@@ -0,0 +1,75 @@
+import sys
+import csv
+import json
+import argparse
+
+from batch_xrd import add_analysis_arguments, analysis_params
+from process_xrd import reference_library
+from xrd import analyze_frames, iter_frames
+
+FRAME_COLUMNS = ["frame", "frame_id", "status", "n_points", "n_peaks", "peak_position", "peak_intensity", "fwhm",
+                 "d_spacing", "crystallite_size_nm", "percent_crystallinity", "total_area", "crystalline_area",
+                 "amorphous_area", "error"]
+
+def frame_row(record):
+    row = {column: record.get(column, "") for column in ("frame", "frame_id", "status", "n_points", "error")}
+    results = record.get("results")
+    if results:
+        row.update({column: results[column] for column in FRAME_COLUMNS if column in results})
+    return row
+
+def stream_frames(file_path, params, chunk_rows=100_000, on_result=None, summary=None):
+    """Analyzes a multi-frame scan frame by frame; returns (frames, failed).
+
+    Each record goes to on_result(record) and, when summary is an open file,
+    to one CSV row there as soon as its frame is done. Nothing but the
+    current frame is kept, so the file can be far larger than memory.
+    """
+    params = dict(params)
+    references = params.pop("references", None)
+    library = reference_library(references) if params.get("phase_matches") else None
+    writer = None
+    if summary is not None:
+        writer = csv.DictWriter(summary, fieldnames=FRAME_COLUMNS)
+        writer.writeheader()
+    frames = failed = 0
+    for record in analyze_frames(iter_frames(file_path, chunk_rows), library, **params):
+        frames += 1
+        failed += record["status"] != "ok"
+        if on_result:
+            on_result(record)
+        if writer:
+            writer.writerow(frame_row(record))
+            summary.flush()
+    return frames, failed
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Analyze a multi-frame XRD scan frame by frame, streaming the results")
+    parser.add_argument("input_csv", help="frames in a 'frame' column, or concatenated scans (2θ restarts per frame)")
+    add_analysis_arguments(parser)
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="CSV rows read at a time (default: 100000)")
+    parser.add_argument("--summary", help="also write one CSV row per frame to this file")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+
+    def stream(record):
+        # One JSON line per frame as soon as it is analyzed
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    try:
+        if args.summary:
+            with open(args.summary, "w", newline="", encoding="utf-8") as summary:
+                frames, failed = stream_frames(args.input_csv, analysis_params(args), args.chunk_rows, stream, summary)
+        else:
+            frames, failed = stream_frames(args.input_csv, analysis_params(args), args.chunk_rows, stream)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print(f"Processed {frames} frames ({failed} failed)", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import the xrd package and the scripts the way the server runs them, from python_scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from xrd import XRDAnalysis, estimate_baseline, normalize_params
+from xrd.baseline import baseline_options
+
+TWO_THETA = np.linspace(10, 80, 3501)
+BACKGROUND = 300 + 2.0 * (TWO_THETA - 10)
+PATTERN = BACKGROUND + 2000 * np.exp(-((TWO_THETA - 40) / 0.15) ** 2) + 800 * np.exp(-((TWO_THETA - 55) / 0.2) ** 2)
+# Away from both peaks the baseline should follow the background
+OFF_PEAK = (np.abs(TWO_THETA - 40) > 3) & (np.abs(TWO_THETA - 55) > 3)
+
+@pytest.mark.parametrize("method, options, tolerance", [
+    ("min", {}, 150.0),
+    ("rolling", {"window": 2.5, "smooth": 0.5}, 5.0),
+    ("poly", {"degree": 2, "max_iter": 200, "tol": 1e-5}, 20.0),
+    ("asls", {"lam": 1e5, "p": 0.001, "max_iter": 20}, 5.0),
+])
+def test_baseline_with_options_follows_background(method, options, tolerance):
+    baseline = estimate_baseline(TWO_THETA, PATTERN, method, **options)
+    assert baseline.shape == PATTERN.shape
+    assert np.max(np.abs(baseline - BACKGROUND)[OFF_PEAK]) < tolerance
+
+@pytest.mark.parametrize("method, options", [
+    ("rolling", {"window": "2.5", "smooth": "0.5"}),
+    ("poly", {"degree": "2", "max_iter": "200.0", "tol": "1e-5"}),
+    ("asls", {"lam": "1e5", "p": "0.001", "max_iter": "20"}),
+])
+def test_text_options_match_typed_options(method, options):
+    # parse_options on the command line and form fields hand the options over as text
+    typed = baseline_options(method, options)
+    expected = estimate_baseline(TWO_THETA, PATTERN, method, **typed)
+    np.testing.assert_allclose(estimate_baseline(TWO_THETA, PATTERN, method, **options), expected)
+
+def test_integer_options_are_ints():
+    params = normalize_params(baseline_method="poly", baseline_options={"degree": 3.0, "max_iter": "50", "tol": 1})
+    assert params["baseline_options"] == {"degree": 3, "max_iter": 50, "tol": 1.0}
+    assert type(params["baseline_options"]["degree"]) is int
+    assert type(params["baseline_options"]["tol"]) is float
+    assert type(baseline_options("asls", {"max_iter": 5.0})["max_iter"]) is int
+    assert type(baseline_options("rolling", {"window": 3})["window"]) is float
+
+@pytest.mark.parametrize("method, options", [
+    ("poly", {"degree": 2.5}),
+    ("asls", {"max_iter": "ten"}),
+    ("rolling", {"degree": 2}),
+    ("min", {"window": 2}),
+    ("spline", {}),
+])
+def test_invalid_options_are_rejected(method, options):
+    with pytest.raises(ValueError):
+        normalize_params(baseline_method=method, baseline_options=options)
+
+def test_analysis_with_poly_options():
+    analysis = XRDAnalysis(TWO_THETA, PATTERN, min_theta=20, max_theta=70, baseline_method="poly",
+                           baseline_options={"degree": "2", "max_iter": "100"})
+    results = analysis.results()
+    assert results["baseline_method"] == "poly"
+    assert results["n_peaks"] == 2
+    assert 0 < results["percent_crystallinity"] < 100
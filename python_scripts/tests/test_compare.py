@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from process_xrd import compare_report
+from xrd import ScanComparison
+from xrd.peaks import refine_positions
+
+STEP = 0.02
+TWO_THETA = np.arange(20, 60 + STEP / 2, STEP)
+
+def scan(shift):
+    sigma = 0.08
+    intensity = 150 + 1200 * np.exp(-0.5 * ((TWO_THETA - 30.0 - shift) / sigma) ** 2) + \
+        600 * np.exp(-0.5 * ((TWO_THETA - 45.0 - shift) / sigma) ** 2)
+    return TWO_THETA, intensity
+
+def test_refine_positions_between_samples():
+    two_theta, intensity = scan(0.007)
+    peaks = np.array([np.argmax(intensity)])
+    assert two_theta[peaks][0] == pytest.approx(30.0, abs=1e-9)
+    assert refine_positions(two_theta, intensity, peaks)[0] == pytest.approx(30.007, abs=0.002)
+    # Peaks on the first or last sample keep their position
+    ends = np.array([0, len(two_theta) - 1])
+    assert refine_positions(two_theta, intensity, ends).tolist() == two_theta[ends].tolist()
+
+def test_shifts_smaller_than_the_grid_step():
+    shifts = [0.0, 0.005, 0.013, 0.031]
+    comparison = ScanComparison([scan(shift) for shift in shifts], min_theta=25, max_theta=55, min_intensity=300)
+    rows = comparison.peak_shifts(tolerance=0.2)
+    assert len(rows) == 2
+    for row in rows:
+        np.testing.assert_allclose(row["shifts"], shifts, atol=0.003)
+    summary = comparison.summary()
+    np.testing.assert_allclose([sample["peak_shift"] for sample in summary], shifts, atol=0.003)
+
+@pytest.mark.parametrize("reference", [1.5, -1, 2, "0", True])
+def test_invalid_reference(tmp_path, reference):
+    paths = []
+    for index, shift in enumerate([0.0, 0.02]):
+        path = tmp_path / f"scan{index}.csv"
+        two_theta, intensity = scan(shift)
+        np.savetxt(path, np.column_stack([two_theta, intensity]), delimiter=",", header="2theta,Intensity",
+                   comments="")
+        paths.append(str(path))
+    with pytest.raises(ValueError, match="reference"):
+        compare_report(paths, reference=reference)
+    assert compare_report(paths, reference=1.0, min_theta=25, max_theta=55)["reference"] == "scan1.csv"
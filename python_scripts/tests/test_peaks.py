@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from xrd import CU_K_ALPHA, StackedAnalysis, XRDAnalysis, find_xrd_peaks, peak_fwhm, scherrer_size
+
+TWO_THETA = np.linspace(10, 80, 7001)
+FWHM = 0.1
+
+def pattern(slope, center=40.0, height=1000.0, level=300.0):
+    sigma = FWHM / (2 * np.sqrt(2 * np.log(2)))
+    return level + slope * (TWO_THETA - 10) + height * np.exp(-0.5 * ((TWO_THETA - center) / sigma) ** 2)
+
+@pytest.mark.parametrize("slope", [0.0, 5.0, 20.0])
+def test_fwhm_on_sloped_background(slope):
+    # At slope 20 the background under the peak (900) is above half the peak's
+    # raw intensity (950), so a half maximum measured from zero spans the scan
+    intensity = pattern(slope)
+    peak = int(np.argmax(intensity - (300 + slope * (TWO_THETA - 10))))
+    fwhm, left, right, half_max = peak_fwhm(TWO_THETA, intensity, np.array([peak]))
+    assert fwhm[0] == pytest.approx(FWHM, rel=0.01)
+    assert left[0] < 40 < right[0]
+
+    baseline = 300 + slope * (TWO_THETA - 10)
+    fwhm, _, _, half_max = peak_fwhm(TWO_THETA, intensity, np.array([peak]), baseline)
+    assert fwhm[0] == pytest.approx(FWHM, rel=0.001)
+    assert half_max[0] == pytest.approx(baseline[peak] + 500, rel=0.001)
+
+@pytest.mark.parametrize("method", ["min", "rolling", "asls"])
+def test_analysis_fwhm_and_scherrer_size(method):
+    results = XRDAnalysis(TWO_THETA, pattern(20.0), min_theta=20, max_theta=70, baseline_method=method).results()
+    assert results["n_peaks"] == 1
+    assert results["fwhm"] == pytest.approx(FWHM, rel=0.01)
+    expected = scherrer_size(40.0, FWHM, CU_K_ALPHA)
+    assert results["crystallite_size_nm"] == pytest.approx(expected, rel=0.01)
+
+def test_stacked_fwhm_matches_single_patterns():
+    intensities = np.array([pattern(0.0), pattern(5.0, center=35.0), pattern(20.0, center=50.0, height=400.0)])
+    stacked = StackedAnalysis(TWO_THETA, intensities, min_theta=20, max_theta=70, baseline_method="asls").results()
+    for row, results in zip(intensities, stacked):
+        single = XRDAnalysis(TWO_THETA, row, min_theta=20, max_theta=70, baseline_method="asls").results()
+        assert results["fwhm"] == pytest.approx(single["fwhm"])
+        assert results["fwhm"] == pytest.approx(FWHM, rel=0.01)
+
+def test_no_peaks():
+    assert all(len(column) == 0 for column in peak_fwhm(TWO_THETA, pattern(0.0), np.array([], dtype=int)))
+
+def two_peaks(two_theta, apart=0.2):
+    return 100 + 1000 * (np.exp(-0.5 * ((two_theta - 30.0) / 0.03) ** 2) +
+                         np.exp(-0.5 * ((two_theta - 30.0 - apart) / 0.03) ** 2))
+
+@pytest.mark.parametrize("two_theta", [
+    np.round(np.arange(25, 35, 0.02), 2),
+    # Alternating 0.015/0.025 steps: not uniform, so distance is applied on the 2θ axis
+    np.round(10 + np.cumsum(np.tile([0.015, 0.025], 1000)) - 0.015, 3),
+])
+def test_peaks_exactly_distance_apart(two_theta):
+    assert np.any(np.isclose(two_theta, 30.0)) and np.any(np.isclose(two_theta, 30.2))
+    intensity = two_peaks(two_theta)
+    peaks, _ = find_xrd_peaks(two_theta, intensity, 200, prominence=50, distance=0.2)
+    np.testing.assert_allclose(two_theta[peaks], [30.0, 30.2])
+    peaks, _ = find_xrd_peaks(two_theta, intensity, 200, prominence=50, distance=0.21)
+    assert len(peaks) == 1
+
+def test_theta_distance_in_samples_or_degrees():
+    two_theta = np.round(np.arange(20, 40, 0.02), 2)
+    intensity = two_peaks(two_theta)
+
+    def positions(**params):
+        return [peak["position"] for peak in XRDAnalysis(two_theta, intensity, min_theta=25, max_theta=35,
+                                                         min_intensity=200, prominence=50, **params).results()["peaks"]]
+
+    assert positions(theta_distance=10) == positions(theta_distance_deg=0.2) == pytest.approx([30.0, 30.2])
+    assert len(positions(theta_distance_deg=0.3)) == 1
+    # A sample count takes precedence over degrees
+    assert len(positions(theta_distance=10, theta_distance_deg=0.3)) == 2
+    assert len(positions(theta_distance=11, theta_distance_deg=0.2)) == 1
+    with pytest.raises(ValueError):
+        XRDAnalysis(two_theta, intensity, theta_distance=-1)
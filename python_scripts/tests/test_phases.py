@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from xrd import read_cards
+
+@pytest.mark.parametrize("header", [
+    "d,intensity",
+    '"d","Intensity"',
+    '"D-spacing", "I"',
+    "﻿'d' , 'relative_intensity'",
+    '"hkl, index","d","Intensity"',
+])
+def test_card_directory_headers(tmp_path, header):
+    prefix = '"1,1,1",' if "hkl" in header else ""
+    rows = "".join(prefix + row + "\n" for row in ("3.14,100", "1.92,55"))
+    (tmp_path / "silicon.csv").write_text(header + "\n" + rows, encoding="utf-8")
+    [(name, formula, d, intensity)] = list(read_cards(str(tmp_path)))
+    assert (name, formula) == ("silicon", "")
+    np.testing.assert_allclose(d, [3.14, 1.92])
+    np.testing.assert_allclose(intensity, [100, 55])
+
+def test_card_table_headers(tmp_path):
+    path = tmp_path / "cards.csv"
+    path.write_text('"Phase", "Formula", "d, Å", "d", "Intensity"\n'
+                    'Silicon, Si, x, 3.1355, 100\nSilicon, Si, x, 1.9201, 55\n"Quartz, low", SiO2, x, 3.343, 100\n',
+                    encoding="utf-8")
+    cards = {name: (formula, d.tolist(), intensity.tolist()) for name, formula, d, intensity in read_cards(str(path))}
+    assert cards == {"Silicon": ("Si", [3.1355, 1.9201], [100.0, 55.0]), "Quartz, low": ("SiO2", [3.343], [100.0])}
+
+def test_missing_card_column(tmp_path):
+    (tmp_path / "card.csv").write_text('"two theta","Intensity"\n28.4,100\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="missing a d"):
+        list(read_cards(str(tmp_path)))
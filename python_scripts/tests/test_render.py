@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+from xrd import ResultCache, XRDAnalysis
+from xrd.timing import rss_mb
+
+TWO_THETA = np.arange(10, 80, 0.02)
+INTENSITY = 300 + 1500 * np.exp(-((TWO_THETA - 40) / 0.15) ** 2) + 600 * np.exp(-((TWO_THETA - 55) / 0.2) ** 2)
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs the current RSS from /proc")
+def test_repeated_renders_do_not_grow_memory(tmp_path):
+    # A pooled worker renders job after job in one process; every figure must be released
+    analysis = XRDAnalysis(TWO_THETA, INTENSITY, min_theta=20, max_theta=70)
+    outputs = {"png": str(tmp_path / "scan.png"), "pdf": str(tmp_path / "scan.pdf")}
+    for _ in range(3):
+        analysis.render(outputs, dpi=50)
+    reference = rss_mb()
+    for _ in range(20):
+        analysis.render(outputs, dpi=50)
+    # A figure left open costs about 1 MB here, so 20 leaked ones would show
+    assert rss_mb() - reference < 10
+    assert os.path.getsize(outputs["png"]) and os.path.getsize(outputs["pdf"])
+
+def test_render_replaces_the_file_in_one_step(tmp_path):
+    # A download of the previous plot still in progress must read it whole
+    analysis = XRDAnalysis(TWO_THETA, INTENSITY, min_theta=20, max_theta=70)
+    path = tmp_path / "scan.png"
+    analysis.render({"png": str(path)}, dpi=50)
+    before = path.read_bytes()
+    with open(path, "rb") as download:
+        analysis.render({"png": str(path)}, dpi=30)
+        assert download.read() == before
+    assert path.read_bytes() != before
+    assert os.listdir(tmp_path) == ["scan.png"]
+
+def test_cache_hit_replaces_outputs(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    rendered = tmp_path / "rendered.png"
+    rendered.write_bytes(b"plot")
+    cache.put("key", {"n_peaks": 2}, {"png": str(rendered)})
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "scan.png").write_bytes(b"stale plot of another job")
+    assert cache.get("key", {"png": str(out / "scan.png")}) == {"n_peaks": 2}
+    assert (out / "scan.png").read_bytes() == b"plot"
+    assert os.listdir(out) == ["scan.png"]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from xrd import ScanComparison, StackedAnalysis, XRDAnalysis, load_scan
+from xrd.scan_io import parse_scan_csv
+from xrd.stream import read_chunks
+
+ROWS = "10.0,100\n10.02,120\n10.04,,\n10.06,130\n"
+
+@pytest.mark.parametrize("header", [
+    "2theta,Intensity",
+    '"2theta","Intensity"',
+    '"2Theta", "Intensity"',
+    "'2theta' , 'intensity'",
+    "\ufeff\"2theta\",\"Intensity\"",
+    '"Angle, deg","2theta","Intensity"',
+])
+def test_header_names(tmp_path, header):
+    path = tmp_path / "scan.csv"
+    prefix = "1," if "Angle" in header else ""
+    rows = "".join(prefix + line + "\n" for line in ROWS.splitlines())
+    path.write_text(header + "\n" + rows, encoding="utf-8")
+    two_theta, intensity = parse_scan_csv(path)
+    np.testing.assert_allclose(two_theta, [10.0, 10.02, 10.06])
+    np.testing.assert_allclose(intensity, [100, 120, 130])
+    # The binary copy and the chunked reader share the header parsing
+    np.testing.assert_allclose(load_scan(str(path))[1], [100, 120, 130])
+    _, chunk_theta, _ = next(read_chunks(str(path)))
+    np.testing.assert_allclose(chunk_theta, [10.0, 10.02, 10.06])
+
+def test_missing_columns(tmp_path):
+    path = tmp_path / "scan.csv"
+    path.write_text('"angle","counts"\n10,100\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="Missing required columns"):
+        parse_scan_csv(path)
+
+TWO_THETA = np.linspace(20, 60, 2001)
+PATTERN = 200 + 1500 * np.exp(-0.5 * ((TWO_THETA - 30) / 0.05) ** 2) + \
+    900 * np.exp(-0.5 * ((TWO_THETA - 30.3) / 0.05) ** 2) + 400 * np.exp(-0.5 * ((TWO_THETA - 45) / 0.1) ** 2)
+PARAMS = {"min_theta": 25, "max_theta": 55, "min_intensity": 300, "prominence": 50, "theta_distance_deg": 0.25,
+          "windows": [[28, 32], [40, 50]]}
+
+def test_descending_scan_matches_ascending():
+    expected = XRDAnalysis(TWO_THETA, PATTERN, **PARAMS).results()
+    # Wrong integral order too, as a binary copy of a descending file holds it
+    descending = XRDAnalysis(TWO_THETA[::-1], PATTERN[::-1], np.arange(len(PATTERN)), **PARAMS).results()
+    assert [peak["position"] for peak in descending["peaks"]] == [peak["position"] for peak in expected["peaks"]]
+    assert descending["percent_crystallinity"] == pytest.approx(expected["percent_crystallinity"])
+    assert [window["total_area"] for window in descending["windows"]] == \
+        pytest.approx([window["total_area"] for window in expected["windows"]])
+    stacked = StackedAnalysis(TWO_THETA[::-1], np.array([PATTERN[::-1]]), **PARAMS).results()[0]
+    assert stacked["n_peaks"] == expected["n_peaks"] == 3
+    assert stacked["windows"][0]["total_area"] == pytest.approx(expected["windows"][0]["total_area"])
+    comparison = ScanComparison([(TWO_THETA, PATTERN), (TWO_THETA[::-1], PATTERN[::-1])], **PARAMS)
+    assert [row["shifts"] for row in comparison.peak_shifts()] == [[0.0, 0.0]] * 3
+
+def test_scan_running_both_ways_is_rejected():
+    two_theta = np.concatenate([TWO_THETA, TWO_THETA])
+    with pytest.raises(ValueError, match="one way"):
+        XRDAnalysis(two_theta, np.concatenate([PATTERN, PATTERN]), **PARAMS)
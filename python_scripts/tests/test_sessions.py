@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from process_xrd import analyze_session
+from xrd import AnalysisSessions, StageTimer, XRDAnalysis
+
+TWO_THETA = np.arange(10, 80.001, 0.02)
+INTENSITY = 300 + 2.0 * (TWO_THETA - 10) + 2000 * np.exp(-((TWO_THETA - 40) / 0.15) ** 2) + \
+    800 * np.exp(-((TWO_THETA - 55) / 0.2) ** 2)
+
+@pytest.fixture
+def scan_path(tmp_path):
+    path = tmp_path / "scan.csv"
+    np.savetxt(path, np.column_stack([TWO_THETA, INTENSITY]), delimiter=",", header="2theta,Intensity",
+               comments="")
+    return str(path)
+
+PEAK_STAGES = {"peaks", "widths", "peak_table", "fits", "fit_table", "phases"}
+BASELINE_STAGES = {"baseline", "above_baseline", "crystalline_integral", "areas", "filtered_baseline", "widths",
+                   "peak_table", "fits", "fit_table", "phases"}
+
+@pytest.mark.parametrize("change, stages", [
+    ({"prominence": 50}, PEAK_STAGES),
+    ({"theta_distance_deg": 0.5}, PEAK_STAGES),
+    ({"wavelength": 1.789}, {"peak_table", "fit_table", "phases"}),
+    ({"baseline_method": "rolling"}, BASELINE_STAGES),
+    ({"baseline_options": {"lam": 1e6}}, BASELINE_STAGES),
+    ({"min_theta": 30}, {"window", "filtered_theta", "filtered_intensity", "filtered_baseline"} | PEAK_STAGES),
+])
+def test_update_recomputes_only_affected_stages(change, stages):
+    params = {"min_theta": 20, "max_theta": 70, "baseline_method": "asls"}
+    analysis = XRDAnalysis(TWO_THETA, INTENSITY, **params)
+    analysis.results()
+    assert set(analysis.update(**change)) == stages
+
+    timer = analysis.timer = StageTimer()
+    results = analysis.results()
+    assert set(timer.report()["stages"]) == stages
+    # Same numbers as a fresh analysis with the new parameters
+    fresh = XRDAnalysis(TWO_THETA, INTENSITY, **dict(params, **change)).results()
+    assert results == fresh
+
+def test_session_reports_recomputed_stages(scan_path):
+    sessions = AnalysisSessions()
+    params = {"min_theta": 20, "max_theta": 70}
+    assert analyze_session(sessions, "s1", scan_path, **params)["recomputed"] == "all"
+    peaks_only = analyze_session(sessions, "s1", scan_path, **dict(params, prominence=50))
+    assert set(peaks_only["recomputed"]) == PEAK_STAGES
+    assert set(peaks_only["timing"]["stages"]) - {"load", "results"} == PEAK_STAGES
+    baseline = analyze_session(sessions, "s1", scan_path, **dict(params, prominence=50, baseline_method="rolling"))
+    assert set(baseline["recomputed"]) == BASELINE_STAGES
+    assert not analyze_session(sessions, "s1", scan_path, **dict(params, prominence=50,
+                                                                baseline_method="rolling"))["recomputed"]
+
+@pytest.mark.parametrize("bad", [{"baseline_options": {"foo": 1}}, {"match_tolerance": 0}])
+def test_bad_parameters_leave_the_session_usable(scan_path, bad):
+    sessions = AnalysisSessions()
+    params = {"min_theta": 20, "max_theta": 70, "baseline_method": "rolling"}
+    first = analyze_session(sessions, "s1", scan_path, **params)
+    assert first["recomputed"] == "all" and first["n_peaks"] == 2
+
+    # Rejected as invalid, not reported as a CSV without the required columns
+    with pytest.raises(ValueError):
+        analyze_session(sessions, "s1", scan_path, **dict(params, **bad))
+    assert len(sessions) == 1
+
+    again = analyze_session(sessions, "s1", scan_path, **dict(params, prominence=50))
+    assert again["recomputed"] != "all"
+    assert again["n_peaks"] == 2
+    assert again["parameters"]["baseline_options"] == first["parameters"]["baseline_options"]
+
+def test_missing_columns(tmp_path):
+    path = tmp_path / "scan.csv"
+    path.write_text("angle,counts\n10,100\n", encoding="utf-8")
+    assert analyze_session(AnalysisSessions(), "s1", str(path)) is None
@@ -0,0 +1,69 @@
+"""XRD analysis library shared by the server workers, the batch tools and notebooks.
+
+    from xrd import XRDAnalysis
+
+    analysis = XRDAnalysis.from_file("uploads/scan.csv", min_theta=20, max_theta=70)
+    print(analysis.results()["percent_crystallinity"])
+"""
+from .scan_io import ingest_scan, load_scan
+from .baseline import BASELINE_METHODS, estimate_baseline
+from .peaks import CU_K_ALPHA, find_xrd_peaks, peak_fwhm, d_spacing, scherrer_size
+from .render import (RENDER_FORMATS, RENDER_MODES, load_plot_data, output_paths, render_comparison, render_options,
+                     render_xrd, save_plot_data)
+from .result_cache import ResultCache
+from .fitting import PROFILES, fit_peaks
+from .pipeline import (DEFAULT_PARAMS, FIT_TABLE_COLUMNS, PEAK_COLUMNS, PHASE_COLUMNS, STAGE_INPUTS, WINDOW_COLUMNS,
+                       XRDAnalysis, normalize_params)
+from .stacked import StackedAnalysis
+from .sessions import AnalysisSessions
+from .stream import analyze_frames, iter_frames
+from .timing import StageTimer, peak_rss_mb
+from .phases import ReferenceLibrary, load_references, read_cards
+from .pyramid import MinMaxPyramid, open_pyramid, scan_data
+from .compare import ScanComparison, align_scans, common_grid
+
+__all__ = [
+    "ingest_scan",
+    "load_scan",
+    "BASELINE_METHODS",
+    "estimate_baseline",
+    "CU_K_ALPHA",
+    "find_xrd_peaks",
+    "peak_fwhm",
+    "d_spacing",
+    "scherrer_size",
+    "RENDER_FORMATS",
+    "RENDER_MODES",
+    "output_paths",
+    "render_options",
+    "render_xrd",
+    "render_comparison",
+    "save_plot_data",
+    "load_plot_data",
+    "ResultCache",
+    "PROFILES",
+    "fit_peaks",
+    "DEFAULT_PARAMS",
+    "FIT_TABLE_COLUMNS",
+    "PEAK_COLUMNS",
+    "PHASE_COLUMNS",
+    "STAGE_INPUTS",
+    "WINDOW_COLUMNS",
+    "XRDAnalysis",
+    "normalize_params",
+    "StackedAnalysis",
+    "AnalysisSessions",
+    "iter_frames",
+    "analyze_frames",
+    "StageTimer",
+    "peak_rss_mb",
+    "ReferenceLibrary",
+    "load_references",
+    "read_cards",
+    "MinMaxPyramid",
+    "open_pyramid",
+    "scan_data",
+    "ScanComparison",
+    "align_scans",
+    "common_grid",
+]
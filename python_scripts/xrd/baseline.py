@@ -0,0 +1,159 @@
+import inspect
+
+import numpy as np
+
+# Every estimator works along the last axis, so intensity may also be a
+# (patterns, points) stack on the shared two_theta axis.
+
+def min_baseline(two_theta, intensity):
+    """Constant baseline at the global minimum (the original estimate)."""
+    return np.broadcast_to(np.min(intensity, axis=-1, keepdims=True), np.shape(intensity)).astype(np.float64)
+
+def rolling_baseline(two_theta, intensity, window=4.0, smooth=None):
+    """Rolling-ball style baseline: a morphological opening, then a moving average.
+
+    window is the ball diameter in degrees of 2θ and should be wider than the
+    broadest peak; smooth (default: window / 2) is the moving-average width.
+    Minimum, maximum and uniform filters are each O(n) in the pattern length.
+    """
+    from scipy.ndimage import minimum_filter1d, maximum_filter1d, uniform_filter1d
+
+    step = np.median(np.diff(two_theta))
+    size = _odd_points(window, step)
+    # Opening (erode then dilate) keeps the background and cuts the peaks off
+    background = maximum_filter1d(minimum_filter1d(intensity, size, axis=-1, mode="nearest"), size, axis=-1,
+                                  mode="nearest")
+    smoothed = uniform_filter1d(background, _odd_points(smooth if smooth is not None else window / 2, step),
+                                axis=-1, mode="nearest")
+    # Smoothing must not lift the baseline above the data
+    return np.minimum(smoothed, intensity)
+
+def poly_baseline(two_theta, intensity, degree=4, max_iter=100, tol=1e-3):
+    """Iterative (modified) polynomial fit.
+
+    Fits a polynomial, clips the signal down to the fit wherever it lies above
+    it and refits, until the fit changes by less than tol (relative).
+    """
+    # Fit on x scaled to [-1, 1] so high degrees stay well conditioned. The
+    # least-squares projection onto the polynomials is factored once (QR), so
+    # each iteration is two O(n * degree) matrix-vector products (matrix
+    # products over blocks of a stack, small enough to stay in cache).
+    x = np.interp(two_theta, (two_theta[0], two_theta[-1]), (-1.0, 1.0))
+    q, _ = np.linalg.qr(np.polynomial.polynomial.polyvander(x, degree))
+    y = np.atleast_2d(np.asarray(intensity, dtype=np.float64))
+    fit = np.empty_like(y)
+    rows = max(1, _POLY_BLOCK // y.shape[1])
+    for start in range(0, len(y), rows):
+        fit[start:start + rows] = _poly_block(q, y[start:start + rows].copy(), max_iter, tol)
+    return fit.reshape(np.shape(intensity))
+
+# Stack elements per poly_baseline block (2 MB of float64)
+_POLY_BLOCK = 2**18
+
+def _poly_block(q, y, max_iter, tol):
+    """Iterates the clipped projection on a block of patterns; converged ones drop out."""
+    out = np.empty_like(y)
+    index = np.arange(len(y))
+    fit = y
+    for _ in range(max_iter):
+        new_fit = (y @ q) @ q.T
+        converged = np.linalg.norm(new_fit - fit, axis=1) <= tol * np.linalg.norm(fit, axis=1)
+        fit = new_fit
+        np.minimum(y, fit, out=y)
+        if converged.any():
+            out[index[converged]] = fit[converged]
+            keep = ~converged
+            y, fit, index = y[keep], fit[keep], index[keep]
+            if not len(index):
+                return out
+    out[index] = fit
+    return out
+
+def asls_baseline(two_theta, intensity, lam=1e6, p=0.01, max_iter=10):
+    """Asymmetric least squares baseline (Eilers & Boelens).
+
+    Minimizes sum w (y - z)^2 + lam * sum (second difference of z)^2, where
+    points above the baseline get weight p and points below get 1 - p. The
+    normal equations are pentadiagonal, so each iteration is an O(n) banded
+    Cholesky solve.
+    """
+    from scipy.linalg import solveh_banded
+
+    y = np.asarray(intensity, dtype=np.float64)
+    if y.ndim > 1:
+        # Each pattern has its own weights, so its own banded system
+        return np.array([asls_baseline(two_theta, row, lam, p, max_iter) for row in y]).reshape(y.shape)
+    n = len(y)
+    if n < 4:
+        return min_baseline(two_theta, y)
+
+    # lam * D'D in upper banded storage: second, first super-diagonal and main diagonal
+    penalty = np.zeros((3, n))
+    penalty[0, 2:] = lam
+    penalty[1, 1:] = -4 * lam
+    penalty[1, 1], penalty[1, -1] = -2 * lam, -2 * lam
+    penalty[2] = 6 * lam
+    penalty[2, [0, -1]] = lam
+    penalty[2, [1, -2]] = 5 * lam
+
+    weights = np.ones(n)
+    z = y
+    for _ in range(max_iter):
+        banded = penalty.copy()
+        banded[2] += weights
+        z = solveh_banded(banded, weights * y, check_finite=False)
+        new_weights = np.where(y > z, p, 1 - p)
+        if np.array_equal(new_weights, weights):
+            break
+        weights = new_weights
+    return z
+
+BASELINE_METHODS = {
+    "min": min_baseline,
+    "rolling": rolling_baseline,
+    "poly": poly_baseline,
+    "asls": asls_baseline,
+}
+
+def baseline_options(method, options):
+    """options for the named method, coerced to the types of its keyword defaults.
+
+    Options whose default is an int (degree, max_iter) must be whole
+    numbers and come back as ints; the rest come back as floats. Raises
+    ValueError for an unknown method, an option the method does not take
+    or a value of the wrong type.
+    """
+    try:
+        estimator = BASELINE_METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown baseline method '{method}' (choose from {', '.join(BASELINE_METHODS)})") from None
+    accepted = dict(list(inspect.signature(estimator).parameters.items())[2:])
+    unknown = [name for name in options if name not in accepted]
+    if unknown:
+        raise ValueError(f"Unknown option(s) for baseline method '{method}': {', '.join(unknown)}")
+    coerced = {}
+    for name, value in options.items():
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Baseline option '{name}' must be a number, not {value!r}") from None
+        if isinstance(accepted[name].default, int):
+            if not number.is_integer():
+                raise ValueError(f"Baseline option '{name}' must be a whole number, not {value!r}")
+            number = int(number)
+        coerced[name] = number
+    return coerced
+
+def estimate_baseline(two_theta, intensity, method="min", **options):
+    """Estimates the amorphous background with the named method; returns an array like intensity.
+
+    intensity is one pattern or a (patterns, points) stack on the shared
+    two_theta. options are checked and coerced with baseline_options().
+    """
+    options = baseline_options(method, options)
+    return BASELINE_METHODS[method](np.asarray(two_theta, dtype=np.float64), np.asarray(intensity, dtype=np.float64),
+                                    **options)
+
+def _odd_points(width, step):
+    points = max(3, int(round(width / step)))
+    return points | 1
@@ -0,0 +1,159 @@
+import os
+from functools import cached_property
+
+import numpy as np
+
+from .peaks import refine_positions, sampling_step
+from .render import render_comparison
+from .scan_io import ascending, load_scan
+from .stacked import StackedAnalysis
+
+# Columns of ScanComparison.summary(), one row per sample
+SUMMARY_COLUMNS = ("sample", "percent_crystallinity", "crystalline_area", "amorphous_area", "n_peaks",
+                   "peak_position", "peak_shift", "fwhm", "d_spacing", "crystallite_size_nm")
+
+def common_grid(scans, step=None):
+    """2θ axis shared by scans ((two_theta, intensity) pairs): their common range at step.
+
+    step defaults to the finest median step of the scans, so no scan is
+    sampled more coarsely than it was measured. Raises ValueError when the
+    scans have no 2θ range in common.
+    """
+    lo = max(float(two_theta[0]) for two_theta, _ in scans)
+    hi = min(float(two_theta[-1]) for two_theta, _ in scans)
+    if not hi > lo:
+        raise ValueError("The scans have no 2θ range in common")
+    if step is None:
+        step = min(sampling_step(two_theta)[0] for two_theta, _ in scans)
+    if not step > 0:
+        raise ValueError("step must be positive")
+    # A hair of slack so a range that is a whole number of steps keeps its last point
+    return lo + step * np.arange(int(np.floor((hi - lo) / step + 1e-9)) + 1)
+
+def align_scans(scans, grid):
+    """(scans, points) stack of every scan's intensity linearly interpolated onto grid.
+
+    All scans are interpolated in one np.interp call: each is shifted along
+    2θ by a multiple of more than the whole span, so the concatenated axes
+    stay increasing and no scan's points reach into another's. 2θ must
+    increase within each scan, and grid must lie inside all of them.
+    """
+    for two_theta, _ in scans:
+        if np.any(np.diff(two_theta) <= 0):
+            raise ValueError("2theta must be strictly increasing in every scan to compare them")
+    span = max(float(two_theta[-1]) for two_theta, _ in scans) - min(float(two_theta[0]) for two_theta, _ in scans)
+    shift = np.arange(len(scans)) * (span + 1.0)
+    x = np.concatenate([two_theta + offset for (two_theta, _), offset in zip(scans, shift)])
+    y = np.concatenate([intensity for _, intensity in scans])
+    return np.interp((shift[:, None] + grid[None, :]).ravel(), x, y).reshape(len(scans), len(grid))
+
+def match_peaks(reference, positions, tolerance):
+    """Index into positions of the peak nearest each reference position, -1 when none is within tolerance."""
+    reference, positions = np.asarray(reference, dtype=np.float64), np.asarray(positions, dtype=np.float64)
+    if not len(positions):
+        return np.full(len(reference), -1)
+    order = np.argsort(positions)
+    sorted_positions = positions[order]
+    right = np.clip(np.searchsorted(sorted_positions, reference), 0, len(positions) - 1)
+    left = np.clip(right - 1, 0, len(positions) - 1)
+    nearest = np.where(np.abs(reference - sorted_positions[left]) <= np.abs(sorted_positions[right] - reference),
+                       left, right)
+    return np.where(np.abs(sorted_positions[nearest] - reference) <= tolerance, order[nearest], -1)
+
+class ScanComparison:
+    """A series of scans (e.g. calcination temperatures) on one 2θ grid, analyzed as one stack.
+
+    The scans are interpolated onto their common 2θ range (see common_grid
+    and align_scans; descending scans are reversed first, see
+    scan_io.ascending) and analyzed with StackedAnalysis, so every sample is
+    measured at the same positions. Peak positions are refined between grid
+    points (see peaks.refine_positions), so shifts smaller than the grid
+    step still show. peak_shifts() follows the peaks of the reference
+    sample across the series; summary() is the crystallinity and
+    main peak of every sample; render() draws all of them offset on one
+    figure.
+
+        comparison = ScanComparison.from_files(["300C.csv", "500C.csv", "700C.csv"], min_theta=20, max_theta=70)
+        comparison.summary()
+    """
+
+    def __init__(self, scans, labels=None, step=None, references=None, **params):
+        if not scans:
+            raise ValueError("No scans to compare")
+        self.labels = [str(label) for label in labels] if labels is not None else \
+            [f"scan {index + 1}" for index in range(len(scans))]
+        if len(self.labels) != len(scans):
+            raise ValueError(f"{len(self.labels)} labels for {len(scans)} scans")
+        scans = [ascending(two_theta, intensity) for two_theta, intensity in scans]
+        self.grid = common_grid(scans, step)
+        self.stack = StackedAnalysis(self.grid, align_scans(scans, self.grid), references, **params)
+        self.params = self.stack.params
+
+    @classmethod
+    def from_files(cls, file_paths, labels=None, step=None, references=None, **params):
+        """Loads the scans (see scan_io.load_scan); labels default to the file names."""
+        scans = [load_scan(path, mmap=True) for path in file_paths]
+        if labels is None:
+            labels = [os.path.basename(path) for path in file_paths]
+        return cls(scans, labels, step, references, **params)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @cached_property
+    def results(self):
+        """Per-sample results, as XRDAnalysis.results()."""
+        return self.stack.results()
+
+    @cached_property
+    def peak_positions(self):
+        """Per-sample sub-sample 2θ of the detected peaks, refined on the signal above the baseline."""
+        signals = self.stack.filtered_intensities - self.stack.baseline[:, self.stack.window]
+        return [refine_positions(self.stack.filtered_theta, signal, peaks)
+                for signal, (peaks, _) in zip(signals, self.stack.peaks)]
+
+    def peak_shifts(self, reference=0, tolerance=0.3):
+        """Positions of the reference sample's peaks in every sample, as a list of JSON-ready rows.
+
+        A peak matches the nearest peak of a sample within tolerance degrees
+        of 2θ. Each row holds the reference "position" and, per sample,
+        "positions" and "shifts" (position minus the reference position),
+        None where the sample has no matching peak.
+        """
+        reference_positions = self.peak_positions[reference]
+        positions = np.full((len(self), len(reference_positions)), np.nan)
+        for row, sample_positions in enumerate(self.peak_positions):
+            matched = match_peaks(reference_positions, sample_positions, tolerance)
+            positions[row, matched >= 0] = sample_positions[matched[matched >= 0]]
+        shifts = positions - reference_positions
+        return [{"position": float(position),
+                 "positions": [None if np.isnan(value) else float(value) for value in positions[:, peak]],
+                 "shifts": [None if np.isnan(value) else float(value) for value in shifts[:, peak]]}
+                for peak, position in enumerate(reference_positions)]
+
+    def summary(self, reference=0, tolerance=0.3):
+        """One row per sample (see SUMMARY_COLUMNS); peak_shift is the highest peak's offset from the reference's.
+
+        peak_position is the refined position of the sample's highest peak.
+        """
+        top_positions = [float(positions[np.argmax(table["height"])]) if len(positions) else None
+                         for positions, table in zip(self.peak_positions, self.stack.peak_tables)]
+        reference_position = top_positions[reference]
+        rows = []
+        for label, results, position in zip(self.labels, self.results, top_positions):
+            shift = None
+            if position is not None and reference_position is not None and \
+                    abs(position - reference_position) <= tolerance:
+                shift = position - reference_position
+            rows.append({"sample": label, "percent_crystallinity": results["percent_crystallinity"],
+                         "crystalline_area": results["crystalline_area"], "amorphous_area": results["amorphous_area"],
+                         "n_peaks": results["n_peaks"], "peak_position": position, "peak_shift": shift,
+                         "fwhm": results.get("fwhm"), "d_spacing": results.get("d_spacing"),
+                         "crystallite_size_nm": results.get("crystallite_size_nm")})
+        return rows
+
+    def render(self, outputs, offset=None, dpi=None, figsize=None, timer=None):
+        """Draws every sample on one figure, offset upwards in series order ({format: path}, see render_comparison)."""
+        render_comparison(outputs, self.stack.filtered_theta, self.stack.filtered_intensities, self.labels,
+                          [peaks for peaks, _ in self.stack.peaks], offset=offset, dpi=dpi, figsize=figsize,
+                          timer=timer)
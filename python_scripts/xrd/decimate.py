@@ -0,0 +1,36 @@
+import numpy as np
+
+def lttb_indices(x, y, n_out, keep=None):
+    """Indices of about n_out points that preserve the shape of y(x): largest-triangle-three-buckets.
+
+    The first and last points are always kept. The points between are split
+    into n_out - 2 buckets; from each, the point forming the largest triangle
+    with the previously chosen point and the mean of the next bucket is kept,
+    so spikes and edges survive where plain striding would drop them. keep
+    (e.g. detected peaks) is merged in, so those points are never lost.
+    Returns sorted indices; all of them when n_out >= len(x).
+    """
+    n = len(x)
+    keep = np.asarray(keep if keep is not None else (), dtype=np.intp)
+    if n_out >= n or n < 3:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+
+    # n_out - 2 buckets over the points 1 .. n-2; the last point is its own bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    starts = np.append(edges[:-1], n - 1)
+    counts = np.diff(np.append(starts, n))
+    mean_x = np.add.reduceat(x, starts) / counts
+    mean_y = np.add.reduceat(y, starts) / counts
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        lo, hi = starts[bucket], starts[bucket + 1]
+        # Twice the triangle area (a, point, next bucket mean); the factor doesn't matter for argmax
+        area = np.abs((x[a] - mean_x[bucket + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (mean_y[bucket + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return np.union1d(selected, keep)
@@ -0,0 +1,36 @@
+import numpy as np
+
+def cumulative_trapezoid(y, x):
+    """Running trapezoid integral of y over x along the last axis, starting at 0.
+
+    The last entry is trapezoid(y, x); y may be a (patterns, points) stack.
+    """
+    cumulative = np.empty(np.shape(y), dtype=np.float64)
+    if cumulative.shape[-1]:
+        cumulative[..., 0] = 0.0
+        np.cumsum((y[..., 1:] + y[..., :-1]) * np.diff(x) / 2, axis=-1, out=cumulative[..., 1:])
+    return cumulative
+
+def integral_at(x, y, cumulative, at):
+    """Integral of the linearly interpolated y from x[0] to each point of at (clipped to the scan).
+
+    One binary search per point, so evaluating k positions costs O(k log n)
+    on top of the O(n) cumulative sums computed once per scan.
+    """
+    at = np.clip(np.asarray(at, dtype=np.float64), x[0], x[-1])
+    i = np.clip(np.searchsorted(x, at, side="right") - 1, 0, len(x) - 2)
+    dx = at - x[i]
+    step = x[i + 1] - x[i]
+    # Partial segment: trapezoid up to the interpolated value at `at`
+    y_at = y[..., i] + (y[..., i + 1] - y[..., i]) * np.divide(dx, step, out=np.zeros_like(dx), where=step > 0)
+    return cumulative[..., i] + dx * (y[..., i] + y_at) / 2
+
+def window_integral(x, y, cumulative, lo, hi):
+    """Integral of y over each [lo, hi] window (arrays or scalars) from the cumulative sums.
+
+    x must increase, as for np.searchsorted (see scan_io.ascending). For a
+    (patterns, points) stack the result is (patterns, windows).
+    """
+    if len(x) < 2:
+        return np.zeros(np.shape(y)[:-1] + np.broadcast(np.asarray(lo), np.asarray(hi)).shape)
+    return integral_at(x, y, cumulative, hi) - integral_at(x, y, cumulative, lo)
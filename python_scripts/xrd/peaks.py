@@ -0,0 +1,171 @@
+import numpy as np
+
+# Cu Kα1 wavelength (Å), the default for d-spacing and Scherrer sizes
+CU_K_ALPHA = 1.5406
+
+def sampling_step(two_theta, tolerance=0.01):
+    """Median 2θ step and whether the scan is uniformly sampled (steps within tolerance of it)."""
+    steps = np.diff(two_theta)
+    if len(steps) == 0:
+        return 0.0, True
+    step = float(np.median(steps))
+    return step, bool(np.all(np.abs(steps - step) <= tolerance * abs(step)))
+
+def samples(angle, step, tolerance=1e-6):
+    """angle in degrees of 2θ as a number of steps, snapped to a whole number within tolerance.
+
+    A measured step is rarely exact (0.0199999999999996 for 0.02), and
+    find_peaks rounds its distance up, so 0.2° would otherwise become 11
+    samples instead of 10.
+    """
+    count = angle / step
+    nearest = round(count)
+    return float(nearest) if abs(count - nearest) < tolerance else count
+
+def find_xrd_peaks(two_theta, intensity, min_intensity, prominence=95, distance=0.2, min_width=0.0,
+                   distance_samples=None):
+    """Finds peaks above min_intensity; returns (indices, properties) as scipy.signal.find_peaks does.
+
+    prominence is in intensity units; distance (minimum separation between
+    peaks) and min_width (minimum width at half prominence) are in degrees of
+    2θ, so the same request behaves the same on scans with different step
+    sizes. Uniform scans convert them to samples once from the step and let
+    find_peaks apply them; non-uniform scans apply them on the 2θ axis. Peaks
+    exactly distance apart are kept either way. distance_samples, when
+    given, replaces distance with that many (median) sampling steps.
+    two_theta must increase (see scan_io.ascending).
+    """
+    from scipy.signal import find_peaks, peak_prominences, peak_widths
+
+    step, uniform = sampling_step(two_theta)
+    if distance_samples is not None:
+        distance = distance_samples * step
+    if uniform and step > 0:
+        if distance_samples is None:
+            distance_samples = samples(distance, step)
+        return find_peaks(intensity, height=min_intensity, prominence=prominence,
+                          distance=max(1.0, distance_samples) if distance > 0 else None,
+                          width=min_width / step if min_width > 0 else None)
+
+    # Same filter order as find_peaks: height, distance, prominence, width
+    peaks, properties = find_peaks(intensity, height=min_intensity)
+    if distance > 0:
+        peaks, properties = _subset(peaks, properties,
+                                    _select_by_distance(two_theta[peaks], properties["peak_heights"], distance))
+    properties.update(zip(("prominences", "left_bases", "right_bases"), peak_prominences(intensity, peaks)))
+    peaks, properties = _subset(peaks, properties, properties["prominences"] >= prominence)
+    if min_width > 0:
+        _, _, left_ips, right_ips = peak_widths(intensity, peaks, rel_height=0.5,
+                                                prominence_data=(properties["prominences"], properties["left_bases"],
+                                                                 properties["right_bases"]))
+        sample_index = np.arange(len(two_theta))
+        widths = np.interp(right_ips, sample_index, two_theta) - np.interp(left_ips, sample_index, two_theta)
+        peaks, properties = _subset(peaks, properties, widths >= min_width)
+    return peaks, properties
+
+def _subset(peaks, properties, keep):
+    return peaks[keep], {name: values[keep] for name, values in properties.items()}
+
+def _select_by_distance(positions, heights, distance):
+    """Keeps the highest peak of any group closer than distance (in 2θ), as find_peaks does in samples."""
+    keep = np.ones(len(positions), dtype=bool)
+    for i in np.argsort(heights, kind="stable")[::-1]:
+        if not keep[i]:
+            continue
+        # positions are increasing, so the neighbours are one contiguous run
+        lo = np.searchsorted(positions, positions[i] - distance, side="right")
+        hi = np.searchsorted(positions, positions[i] + distance, side="left")
+        keep[lo:hi] = False
+        keep[i] = True
+    return keep
+
+def refine_positions(two_theta, intensity, peaks):
+    """Sub-sample 2θ of peaks: the vertex of the parabola through each peak sample and its two neighbours.
+
+    Detected peaks sit on samples, so comparing positions between scans
+    only resolves whole steps; the vertex interpolates between them. Peaks
+    at either end of the pattern, or without a downward curvature, keep
+    their sample position. The vertex, a fraction of a sample, is mapped
+    onto 2θ by interpolation, so non-uniform scans work too.
+    """
+    peaks = np.asarray(peaks, dtype=np.intp)
+    positions = np.asarray(two_theta, dtype=np.float64)[peaks]
+    inner = (peaks > 0) & (peaks < len(intensity) - 1)
+    index = peaks[inner]
+    left, centre, right = intensity[index - 1], intensity[index], intensity[index + 1]
+    curvature = left - 2 * centre + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.0)
+    positions[inner] = np.interp(index + np.clip(offset, -0.5, 0.5), np.arange(len(two_theta)), two_theta)
+    return positions
+
+def peak_fwhm(two_theta, intensity, peaks, baseline=None):
+    """FWHM of all peaks at once; returns (fwhm, left, right, half_max) arrays, widths in degrees.
+
+    The width is taken at half of each peak's prominence above the baseline
+    (intensity minus baseline, when given), so a sloped or curved background
+    neither widens nor narrows the peak. The crossings are found on the
+    linearly interpolated pattern by scipy.signal.peak_widths, walking out
+    from each peak, so the cost is linear in the pattern length. half_max is
+    the intensity of the half-maximum line at each peak.
+    """
+    from scipy.signal import peak_widths
+
+    if len(peaks) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+    signal = intensity if baseline is None else intensity - baseline
+    _, half_max, left_ips, right_ips = peak_widths(signal, peaks, rel_height=0.5)
+    if baseline is not None:
+        half_max = half_max + baseline[peaks]
+
+    # Crossing positions are fractional sample indices: map them onto 2θ
+    sample_index = np.arange(len(two_theta))
+    left = np.interp(left_ips, sample_index, two_theta)
+    right = np.interp(right_ips, sample_index, two_theta)
+    return right - left, left, right, half_max
+
+def stacked_peak_fwhm(two_theta, intensities, peaks, baselines=None):
+    """peak_fwhm for a (patterns, points) stack on one 2θ axis, in a single peak_widths call.
+
+    peaks is a per-pattern sequence of index arrays, baselines a stack like
+    intensities. The patterns are flattened with a fence above every value
+    between them: a peak's prominence bases, and so its half-maximum walk,
+    stop at the fence, so no crossing leaks into a neighbour. Returns
+    (fwhm, left, right, half_max) as flat arrays in pattern order.
+    """
+    from scipy.signal import peak_widths
+
+    signals = intensities if baselines is None else intensities - baselines
+    n_points = signals.shape[-1]
+    counts = [len(pattern_peaks) for pattern_peaks in peaks]
+    if sum(counts) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+    fence = np.full((len(signals), 1), np.max(signals) + 1.0)
+    offsets = np.repeat(np.arange(len(counts)) * (n_points + 1), counts)
+    flat_peaks = np.concatenate(peaks) + offsets
+    _, half_max, left_ips, right_ips = peak_widths(np.hstack([signals, fence]).ravel(), flat_peaks, rel_height=0.5)
+    if baselines is not None:
+        half_max = half_max + np.hstack([baselines, fence]).ravel()[flat_peaks]
+
+    sample_index = np.arange(n_points)
+    left = np.interp(left_ips - offsets, sample_index, two_theta)
+    right = np.interp(right_ips - offsets, sample_index, two_theta)
+    return right - left, left, right, half_max
+
+def d_spacing(two_theta, wavelength=CU_K_ALPHA):
+    """Calculates d-spacing (in the units of wavelength, Å) using Bragg's Law, for arrays of 2θ in degrees."""
+    return wavelength / (2 * np.sin(np.radians(two_theta) / 2))
+
+def scherrer_size(two_theta, fwhm, wavelength=CU_K_ALPHA, k=0.9, instrument_broadening=0.0):
+    """Scherrer crystallite size in nm, τ = Kλ / (β cos θ), for arrays of 2θ and FWHM in degrees.
+
+    The instrument broadening (degrees) is removed in quadrature,
+    β² = FWHM² - b²; peaks no broader than the instrument give NaN.
+    """
+    fwhm = np.asarray(fwhm, dtype=np.float64)
+    beta_sq = fwhm ** 2 - instrument_broadening ** 2
+    beta = np.radians(np.sqrt(np.where(beta_sq > 0, beta_sq, np.nan)))
+    # wavelength is in Å; report nm
+    return k * wavelength / (beta * np.cos(np.radians(two_theta) / 2)) / 10
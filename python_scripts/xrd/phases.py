@@ -0,0 +1,241 @@
+import os
+import csv
+import glob
+import hashlib
+from functools import cached_property, lru_cache
+
+import numpy as np
+
+# Header names accepted for the columns of a reference card CSV
+D_COLUMNS = ("d", "d_spacing", "d-spacing")
+INTENSITY_COLUMNS = ("intensity", "i", "relative_intensity")
+
+def _unique(values):
+    """Sorted distinct values; sorting beats np.unique's hashing on the large integer arrays here."""
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+def _ranges(starts, stops):
+    """Concatenated np.arange(start, stop) of every pair, and the pair each index came from."""
+    counts = stops - starts
+    owner = np.repeat(np.arange(len(starts)), counts)
+    first = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - first[owner] + starts[owner], owner
+
+class ReferenceLibrary:
+    """Reference patterns (d-spacings in Å and relative intensities) indexed for search-match.
+
+    All lines live in flat arrays in (card, d) order, so the lines of one card
+    in a d range are one slice found by binary search. A second ordering by d
+    alone is the search index: match() looks each observed peak up there, so
+    a query costs a few binary searches per peak plus the lines near the
+    peaks, however many cards the library holds. Intensities are scaled to
+    100 per card.
+
+        library = load_references("cards/")  # or a .csv of all cards, or a saved .npz
+        library.match(d, heights, d_lo, d_hi, d_min, d_max, top=5)
+    """
+
+    def __init__(self, names, formulas, card, d, intensity):
+        card = np.asarray(card, dtype=np.intp)
+        d = np.asarray(d, dtype=np.float64)
+        intensity = np.asarray(intensity, dtype=np.float64)
+        valid = np.isfinite(d) & (d > 0) & np.isfinite(intensity) & (intensity > 0)
+        card, d, intensity = card[valid], d[valid], intensity[valid]
+
+        order = np.lexsort((d, card))
+        self.names = np.asarray(names, dtype=str)
+        self.formulas = np.asarray(formulas, dtype=str)
+        self.card, self.d, self.intensity = card[order], d[order], intensity[order]
+        strongest = np.zeros(len(self.names))
+        np.maximum.at(strongest, self.card, self.intensity)
+        self.intensity = self.intensity / strongest[self.card] * 100
+        self.by_d = np.argsort(self.d, kind="stable")
+        self._build_keys()
+
+    def _build_keys(self):
+        # card + d / scale increases along the (card, d) order with d / scale < 1
+        self.scale = float(self.d.max()) * 1.001 if len(self.d) else 1.0
+        self.key = self.card + self.d / self.scale
+        self.sorted_d = self.d[self.by_d]
+        self.sorted_card = self.card[self.by_d]
+
+    @classmethod
+    def from_cards(cls, cards):
+        """Builds the library from (name, formula, d, intensity) cards."""
+        names, formulas, card, d, intensity = [], [], [], [], []
+        for index, (name, formula, card_d, card_intensity) in enumerate(cards):
+            names.append(name)
+            formulas.append(formula or "")
+            card.append(np.full(len(card_d), index))
+            d.append(card_d)
+            intensity.append(card_intensity)
+        if not names:
+            raise ValueError("No reference cards found")
+        return cls(names, formulas, np.concatenate(card), np.concatenate(d), np.concatenate(intensity))
+
+    def save(self, path):
+        """Writes the library with its index to a .npz file, loaded again by load() without re-indexing."""
+        np.savez(path, names=self.names, formulas=self.formulas, card=self.card, d=self.d,
+                 intensity=self.intensity, by_d=self.by_d)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            library = cls.__new__(cls)
+            for name in ("names", "formulas", "card", "d", "intensity", "by_d"):
+                setattr(library, name, data[name])
+        library._build_keys()
+        return library
+
+    def __len__(self):
+        return len(self.names)
+
+    @cached_property
+    def version(self):
+        """Content hash, so cached results go stale when the library changes."""
+        digest = hashlib.sha256()
+        for array in (self.names, self.card, self.d, self.intensity):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:16]
+
+    def match(self, d, intensity, d_lo, d_hi, d_min, d_max, top=5, max_candidates=2000):
+        """Scores the cards that explain the observed peaks; returns the best top as a dict of arrays.
+
+        d and intensity describe the observed peaks, [d_lo, d_hi] is the
+        window each may match in and [d_min, d_max] the d range the scan
+        covers. Candidates are the cards with lines in the peak windows, at
+        most max_candidates of them, those covering the most observed peak
+        intensity. Each is scored by every line it has in the measured
+        range: the share of its line intensity found among the peaks, times
+        the share of the observed peak intensity it explains, times a
+        position factor (1 for exact positions, 0.5 at the window edges). Returns "card" (index),
+        "score", "matched_lines", "lines_in_range", "reference_fraction",
+        "peak_fraction", "mean_offset" (fraction of the window) and
+        "matched_peaks" (indices into the observed peaks, one array per card).
+        """
+        d, intensity = np.asarray(d, dtype=np.float64), np.asarray(intensity, dtype=np.float64)
+        d_lo, d_hi = np.asarray(d_lo, dtype=np.float64), np.asarray(d_hi, dtype=np.float64)
+        n_peaks = len(d)
+        columns = ("card", "score", "matched_lines", "lines_in_range", "reference_fraction", "peak_fraction",
+                   "mean_offset")
+        empty = dict({name: np.empty(0) for name in columns}, card=np.empty(0, dtype=np.intp), matched_peaks=[])
+        if n_peaks == 0 or len(self) == 0:
+            return empty
+
+        # Candidates: cards with lines in the peak windows, by the peak intensity they would explain
+        lines, peak = _ranges(np.searchsorted(self.sorted_d, d_lo, "left"),
+                              np.searchsorted(self.sorted_d, d_hi, "right"))
+        if not len(lines):
+            return empty
+        # Distinct (card, peak) pairs, in card order
+        pairs = _unique(self.sorted_card[lines] * n_peaks + peak)
+        pair_card = pairs // n_peaks
+        starts = np.flatnonzero(np.concatenate(([True], pair_card[1:] != pair_card[:-1])))
+        cards = pair_card[starts]
+        if len(cards) > max_candidates:
+            covered = np.add.reduceat(intensity[pairs % n_peaks], starts)
+            cards = np.sort(cards[np.argpartition(-covered, max_candidates - 1)[:max_candidates]])
+        n_cards = len(cards)
+
+        # Every line of every candidate within the measured range
+        upper = min(d_max / self.scale, np.nextafter(1.0, 0.0))
+        lines, owner = _ranges(np.searchsorted(self.key, cards + d_min / self.scale, "left"),
+                               np.searchsorted(self.key, cards + upper, "right"))
+        line_d, line_intensity = self.d[lines], self.intensity[lines]
+        in_range = np.bincount(owner, weights=line_intensity, minlength=n_cards)
+        n_in_range = np.bincount(owner, minlength=n_cards)
+
+        # Nearest observed peak of every line, and whether the line is in its window
+        order = np.argsort(d)
+        sorted_d = d[order]
+        right = np.clip(np.searchsorted(sorted_d, line_d), 0, n_peaks - 1)
+        left = np.clip(right - 1, 0, n_peaks - 1)
+        nearest = order[np.where(np.abs(line_d - sorted_d[left]) <= np.abs(sorted_d[right] - line_d), left, right)]
+        matched = (line_d >= d_lo[nearest]) & (line_d <= d_hi[nearest])
+        offset = np.abs(line_d - d[nearest]) / ((d_hi - d_lo)[nearest] / 2)
+
+        owner, nearest = owner[matched], nearest[matched]
+        matched_lines = np.bincount(owner, minlength=n_cards)
+        reference = np.bincount(owner, weights=line_intensity[matched], minlength=n_cards)
+        mean_offset = np.bincount(owner, weights=offset[matched], minlength=n_cards) / np.maximum(matched_lines, 1)
+        # Each observed peak counts once per card, however many lines fall in its window
+        pairs = _unique(owner * n_peaks + nearest)
+        pair_card, pair_peak = pairs // n_peaks, pairs % n_peaks
+        explained = np.bincount(pair_card, weights=intensity[pair_peak], minlength=n_cards)
+
+        reference_fraction = np.divide(reference, in_range, out=np.zeros(n_cards), where=in_range > 0)
+        peak_fraction = explained / intensity.sum() if intensity.sum() > 0 else np.zeros(n_cards)
+        score = reference_fraction * peak_fraction * (1 - mean_offset / 2)
+
+        best = np.argsort(-score, kind="stable")[:top]
+        best = best[score[best] > 0]
+        splits = np.searchsorted(pair_card, np.arange(n_cards + 1))
+        return {"card": cards[best], "score": score[best], "matched_lines": matched_lines[best],
+                "lines_in_range": n_in_range[best], "reference_fraction": reference_fraction[best],
+                "peak_fraction": peak_fraction[best], "mean_offset": mean_offset[best],
+                "matched_peaks": [pair_peak[splits[i]:splits[i + 1]] for i in best]}
+
+def _header(line):
+    """Column names of a card CSV header line, as scan_io.read_header matches them.
+
+    The line is parsed as CSV, so quoted names and commas inside quotes
+    work; names are compared lower-case without surrounding quotes and spaces.
+    """
+    fields = next(csv.reader([line], skipinitialspace=True), [])
+    return [name.strip().strip("'\"").strip().lower() for name in fields]
+
+def _column(header, names, path):
+    for name in names:
+        if name in header:
+            return header.index(name)
+    raise ValueError(f"{path}: missing a {'/'.join(names)} column. Available columns: {header}")
+
+def read_cards(path):
+    """Reads reference cards from CSV; yields (name, formula, d, intensity).
+
+    A directory holds one card per .csv file (named after the file) with d
+    and intensity columns; a single .csv holds all cards, one line per row,
+    with a phase column and optionally formula. d is in Å; intensities are
+    relative, in any scale. Both are parsed as CSV, quoted fields included.
+    """
+    if os.path.isdir(path):
+        for card_path in sorted(glob.glob(os.path.join(path, "*.csv"))):
+            with open(card_path, encoding="utf-8-sig", newline="") as f:
+                header = _header(f.readline())
+                d, intensity = _column(header, D_COLUMNS, card_path), _column(header, INTENSITY_COLUMNS, card_path)
+                rows = [row for row in csv.reader(f, skipinitialspace=True) if row]
+            yield (os.path.splitext(os.path.basename(card_path))[0], "",
+                   np.array([float(row[d]) for row in rows]), np.array([float(row[intensity]) for row in rows]))
+        return
+
+    cards = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = _header(f.readline())
+        rows = csv.reader(f, skipinitialspace=True)
+        phase = _column(header, ("phase",), path)
+        d, intensity = _column(header, D_COLUMNS, path), _column(header, INTENSITY_COLUMNS, path)
+        formula = header.index("formula") if "formula" in header else None
+        for row in rows:
+            if not row:
+                continue
+            card = cards.setdefault(row[phase].strip(), [row[formula].strip() if formula is not None else "", [], []])
+            card[1].append(float(row[d]))
+            card[2].append(float(row[intensity]))
+    for name, (card_formula, d, intensity) in cards.items():
+        yield name, card_formula, np.array(d), np.array(intensity)
+
+def load_references(path):
+    """Opens a reference library: a saved .npz, a directory of card CSVs or one CSV of all cards.
+
+    Libraries are kept per path and reloaded only when the file changes,
+    so long-lived workers index them once.
+    """
+    path = os.path.abspath(path)
+    return _load_references(path, os.path.getmtime(path))
+
+@lru_cache(maxsize=4)
+def _load_references(path, mtime):
+    if path.endswith(".npz"):
+        return ReferenceLibrary.load(path)
+    return ReferenceLibrary.from_cards(read_cards(path))
@@ -0,0 +1,368 @@
+import numpy as np
+
+from .scan_io import ascending, load_scan
+from .baseline import baseline_options, estimate_baseline
+from .integrals import cumulative_trapezoid, window_integral
+from .fitting import FIT_COLUMNS, PROFILES, fit_peaks
+from .peaks import CU_K_ALPHA, find_xrd_peaks, peak_fwhm, d_spacing, scherrer_size
+from .render import render_xrd
+from .timing import timed_stage
+
+# Columns of the per-peak table in the results
+PEAK_COLUMNS = ("position", "height", "prominence", "fwhm", "d_spacing", "crystallite_size_nm")
+
+# Columns of the fitted-profile table in the results (with fit_profile set)
+FIT_TABLE_COLUMNS = FIT_COLUMNS + ("crystallite_size_nm",)
+
+# Columns of the phase-match table in the results (with phase_matches set)
+PHASE_COLUMNS = ("phase", "formula", "score", "matched_lines", "lines_in_range", "reference_fraction",
+                 "peak_fraction", "mean_offset_deg", "matched_peaks")
+
+# Columns of the per-window crystallinity table in the results
+WINDOW_COLUMNS = ("min_theta", "max_theta", "total_area", "crystalline_area", "amorphous_area",
+                  "percent_crystallinity")
+
+# Analysis parameters and their defaults. The old process_xrd-v* forks
+# differed only in these (prominence 50 vs 95, fixed vs configurable distance).
+# Angles (min/max_theta, theta_distance_deg, min_width, instrument_broadening)
+# are in degrees of 2θ, intensities and prominence in counts. The minimum
+# peak separation is theta_distance_deg in degrees or, when set,
+# theta_distance in samples of the scan (the original /process and CLI
+# unit); every endpoint and command line uses the two names this way.
+# windows lists extra [min_theta, max_theta] ranges to report the crystallinity of;
+# fit_profile (see fitting.PROFILES) adds a profile fit of every peak;
+# phase_matches > 0 reports that many best-matching reference phases, a
+# reference line matching a peak within match_tolerance degrees of 2θ.
+DEFAULT_PARAMS = {
+    "min_theta": 20.0,
+    "max_theta": 70.0,
+    "min_intensity": 200.0,
+    "prominence": 95.0,
+    "theta_distance_deg": 0.2,
+    "theta_distance": None,
+    "min_width": 0.0,
+    "wavelength": CU_K_ALPHA,
+    "scherrer_k": 0.9,
+    "instrument_broadening": 0.0,
+    "baseline_method": "min",
+    "baseline_options": {},
+    "windows": (),
+    "fit_profile": None,
+    "phase_matches": 0,
+    "match_tolerance": 0.2,
+}
+
+# What each cached stage of XRDAnalysis is computed from: analysis parameters
+# and other stages. update() drops a stage when anything it lists changes.
+STAGE_INPUTS = {
+    "baseline": ("baseline_method", "baseline_options"),
+    "above_baseline": ("baseline",),
+    "crystalline_integral": ("above_baseline",),
+    "areas": ("crystalline_integral",),
+    "window": ("min_theta", "max_theta"),
+    "filtered_theta": ("window",),
+    "filtered_intensity": ("window",),
+    "filtered_baseline": ("baseline", "window"),
+    "peaks": ("filtered_theta", "filtered_intensity", "min_intensity", "prominence", "theta_distance_deg",
+              "theta_distance", "min_width"),
+    "widths": ("peaks", "filtered_baseline"),
+    "peak_table": ("peaks", "widths", "wavelength", "scherrer_k", "instrument_broadening"),
+    "fits": ("filtered_baseline", "peaks", "fit_profile"),
+    "fit_table": ("fits", "wavelength", "scherrer_k", "instrument_broadening"),
+    "phases": ("peak_table", "phase_matches", "match_tolerance", "min_theta", "max_theta"),
+}
+
+def normalize_params(**params):
+    """Fills in defaults and coerces types; raises TypeError for unknown parameters."""
+    unknown = sorted(set(params) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise TypeError(f"Unknown analysis parameter(s): {', '.join(unknown)}")
+    merged = dict(DEFAULT_PARAMS, **{name: value for name, value in params.items() if value is not None})
+    for name, default in DEFAULT_PARAMS.items():
+        if isinstance(default, float):
+            merged[name] = float(merged[name])
+    merged["baseline_method"] = str(merged["baseline_method"])
+    merged["phase_matches"] = int(merged["phase_matches"])
+    if merged["theta_distance"] is not None:
+        merged["theta_distance"] = float(merged["theta_distance"])
+    if merged["theta_distance_deg"] < 0 or (merged["theta_distance"] or 0) < 0:
+        raise ValueError("theta_distance (samples) and theta_distance_deg (degrees) must be >= 0")
+    if merged["phase_matches"] < 0 or merged["match_tolerance"] <= 0:
+        raise ValueError("phase_matches must be >= 0 and match_tolerance > 0")
+    merged["baseline_options"] = baseline_options(merged["baseline_method"], dict(merged["baseline_options"]))
+    merged["windows"] = [[float(lo), float(hi)] for lo, hi in merged["windows"]]
+    if any(lo > hi for lo, hi in merged["windows"]):
+        raise ValueError("Every crystallinity window needs min_theta <= max_theta")
+    if merged["fit_profile"] is not None and merged["fit_profile"] not in PROFILES:
+        raise ValueError(f"Unknown peak profile '{merged['fit_profile']}' (choose from {', '.join(PROFILES)})")
+    return merged
+
+def build_results(params, table, baseline, total_area, crystalline_area, windows=None, fits=None, phases=None):
+    """Assembles the JSON-ready results of one pattern.
+
+    table holds the PEAK_COLUMNS arrays, baseline is the reported baseline
+    level, windows, when given, is (lo, hi, total, crystalline) arrays, fits
+    the FIT_TABLE_COLUMNS arrays and phases a phase_table.
+    """
+    columns = [table[name] for name in PEAK_COLUMNS]
+    results = {"n_peaks": len(table["position"]),
+               "peaks": [dict(zip(PEAK_COLUMNS, map(json_float, row))) for row in zip(*columns)]}
+
+    if len(table["height"]):
+        top = int(np.argmax(table["height"]))
+        results.update(peak_position=float(table["position"][top]), peak_intensity=float(table["height"][top]),
+                       fwhm=json_float(table["fwhm"][top]), d_spacing=json_float(table["d_spacing"][top]),
+                       crystallite_size_nm=json_float(table["crystallite_size_nm"][top]))
+
+    # An all-zero or single-point scan has no area; its crystallinity is None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.float64(crystalline_area) / np.float64(total_area) * 100
+    results.update(baseline_method=params["baseline_method"], baseline=float(baseline),
+                   total_area=float(total_area), crystalline_area=float(crystalline_area),
+                   amorphous_area=float(total_area - crystalline_area),
+                   percent_crystallinity=json_float(percent))
+
+    if windows is not None:
+        lo, hi, total, crystalline = windows
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = crystalline / total * 100
+        columns = (lo, hi, total, crystalline, total - crystalline, percent)
+        results["windows"] = [dict(zip(WINDOW_COLUMNS, map(json_float, row))) for row in zip(*columns)]
+
+    if fits is not None:
+        columns = [fits[name] for name in FIT_TABLE_COLUMNS]
+        results["fit_profile"] = params["fit_profile"]
+        results["fits"] = [dict(zip(FIT_TABLE_COLUMNS, map(json_float, row))) for row in zip(*columns)]
+
+    if phases is not None:
+        results["phases"] = [
+            {"phase": str(phase), "formula": str(formula), "score": float(score), "matched_lines": int(lines),
+             "lines_in_range": int(in_range), "reference_fraction": float(reference),
+             "peak_fraction": float(peak), "mean_offset_deg": float(offset),
+             "matched_peaks": [float(position) for position in positions]}
+            for phase, formula, score, lines, in_range, reference, peak, offset, positions
+            in zip(*(phases[name] for name in PHASE_COLUMNS))]
+    return results
+
+def fit_table(fits, params):
+    """Adds the Scherrer size from the fitted FWHM to a fitting.fit_peaks table."""
+    return dict(fits, crystallite_size_nm=scherrer_size(fits["center"], fits["fwhm"], params["wavelength"],
+                                                        params["scherrer_k"], params["instrument_broadening"]))
+
+def phase_table(references, table, params):
+    """The params["phase_matches"] reference cards best matching a peak table (see phases.ReferenceLibrary.match).
+
+    Peaks are weighted by prominence. Returns the match columns plus the
+    PHASE_COLUMNS, with matched_peaks as 2θ positions.
+    """
+    if references is None:
+        raise ValueError("phase_matches needs a reference library (process_xrd --references or XRD_REFERENCE_DB)")
+    positions, tolerance, wavelength = table["position"], params["match_tolerance"], params["wavelength"]
+    # d falls as 2θ rises: the window [2θ - tol, 2θ + tol] is [d_lo, d_hi]
+    matches = references.match(table["d_spacing"], table["prominence"],
+                               d_spacing(np.minimum(positions + tolerance, 179.999), wavelength),
+                               d_spacing(np.maximum(positions - tolerance, 1e-6), wavelength),
+                               d_spacing(params["max_theta"], wavelength),
+                               d_spacing(max(params["min_theta"], 1e-6), wavelength), top=params["phase_matches"])
+    return dict(matches, phase=references.names[matches["card"]], formula=references.formulas[matches["card"]],
+                mean_offset_deg=matches["mean_offset"] * tolerance,
+                matched_peaks=[positions[peaks] for peaks in matches["matched_peaks"]])
+
+def json_float(value):
+    """float(value), with NaN/inf mapped to None so the results stay valid JSON."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+class XRDAnalysis:
+    """One scan and its analysis pipeline.
+
+    The 2θ/intensity arrays are loaded once and held; every stage (baseline,
+    window, areas, peaks, widths, peak table) is computed the first time it
+    is used and kept, so asking only for the crystallinity never runs peak
+    detection, and results() plus render() share one computation. update()
+    changes parameters and drops only the stages that depend on them (see
+    STAGE_INPUTS), so a new theta_distance_deg re-runs peak picking but keeps the
+    baseline and areas. references (a phases.ReferenceLibrary) is searched
+    for the phases when phase_matches is set. With a timing.StageTimer as timer, every stage
+    computed and every render step is timed under its name. A descending
+    scan is reversed (see scan_io.ascending).
+
+        analysis = XRDAnalysis.from_file("scan.csv", min_theta=20, max_theta=70)
+        analysis.results()["percent_crystallinity"]
+        analysis.render({"png": "scan.png"})
+    """
+
+    timer = None
+
+    def __init__(self, two_theta, intensity, total_integral=None, references=None, **params):
+        two_theta, ordered = ascending(two_theta, intensity)
+        if ordered is not intensity:
+            # Stored running integrals follow the file's order
+            total_integral = None
+        self.two_theta = np.ascontiguousarray(two_theta, dtype=np.float64)
+        self.intensity = np.ascontiguousarray(ordered, dtype=np.float64)
+        self.references = references
+        self.params = normalize_params(**params)
+        if total_integral is not None:
+            self.total_integral = np.asarray(total_integral, dtype=np.float64)
+
+    @classmethod
+    def from_file(cls, file_path, references=None, **params):
+        """Loads a two-column scan (see scan_io.load_scan); raises ValueError for malformed CSVs.
+
+        The binary copy is memory-mapped, so the arrays are read from the page
+        cache on demand rather than copied into each analysis.
+        """
+        two_theta, intensity, total_integral = load_scan(file_path, mmap=True, with_integral=True)
+        return cls(two_theta, intensity, total_integral, references, **params)
+
+    def update(self, **params):
+        """Changes some parameters; returns the names of the stages that will be recomputed."""
+        new_params = normalize_params(**dict(self.params, **params))
+        stale = {name for name in new_params if new_params[name] != self.params[name]}
+        self.params = new_params
+
+        # STAGE_INPUTS is in pipeline order, so one pass reaches every dependent
+        dropped = []
+        for stage, inputs in STAGE_INPUTS.items():
+            if stale.intersection(inputs):
+                stale.add(stage)
+                # Stages like fits are cached as None when switched off
+                if stage in self.__dict__:
+                    del self.__dict__[stage]
+                    dropped.append(stage)
+        return dropped
+
+    # Baseline and crystallinity over the full pattern
+
+    @timed_stage
+    def baseline(self):
+        """Amorphous background under every point."""
+        return estimate_baseline(self.two_theta, self.intensity, self.params["baseline_method"],
+                                 **self.params["baseline_options"])
+
+    @timed_stage
+    def above_baseline(self):
+        """Intensity above the baseline; nothing below it counts as crystalline."""
+        return np.clip(self.intensity - self.baseline, 0, None)
+
+    # Running trapezoid integrals: the area of any 2θ range is two lookups
+    # (see window_areas). The total one is stored with the scan's binary copy.
+
+    @timed_stage
+    def total_integral(self):
+        return cumulative_trapezoid(self.intensity, self.two_theta)
+
+    @timed_stage
+    def crystalline_integral(self):
+        return cumulative_trapezoid(self.above_baseline, self.two_theta)
+
+    @timed_stage
+    def areas(self):
+        """(total_area, crystalline_area) over the full pattern."""
+        return self.total_integral[-1], self.crystalline_integral[-1]
+
+    def window_areas(self, lo, hi):
+        """(total_area, crystalline_area) over [lo, hi] 2θ windows (scalars or arrays).
+
+        Each window costs two binary searches into the running integrals, so
+        any number of ranges can be evaluated without touching the pattern.
+        """
+        total = window_integral(self.two_theta, self.intensity, self.total_integral, lo, hi)
+        crystalline = window_integral(self.two_theta, self.above_baseline, self.crystalline_integral, lo, hi)
+        return total, crystalline
+
+    # Peak analysis within the [min_theta, max_theta] window
+
+    @timed_stage
+    def window(self):
+        """Boolean mask of the points within [min_theta, max_theta]."""
+        return (self.two_theta >= self.params["min_theta"]) & (self.two_theta <= self.params["max_theta"])
+
+    @timed_stage
+    def filtered_theta(self):
+        return self.two_theta[self.window]
+
+    @timed_stage
+    def filtered_intensity(self):
+        return self.intensity[self.window]
+
+    @timed_stage
+    def filtered_baseline(self):
+        return self.baseline[self.window]
+
+    @timed_stage
+    def peaks(self):
+        """(indices into the window, find_peaks properties)."""
+        return find_xrd_peaks(self.filtered_theta, self.filtered_intensity, self.params["min_intensity"],
+                              prominence=self.params["prominence"], distance=self.params["theta_distance_deg"],
+                              min_width=self.params["min_width"], distance_samples=self.params["theta_distance"])
+
+    @timed_stage
+    def widths(self):
+        """(fwhm, left, right, half_max) of every peak, widths in degrees, above the baseline."""
+        return peak_fwhm(self.filtered_theta, self.filtered_intensity, self.peaks[0], self.filtered_baseline)
+
+    @timed_stage
+    def peak_table(self):
+        """Per-peak columns (see PEAK_COLUMNS) as arrays."""
+        peaks, properties = self.peaks
+        positions = self.filtered_theta[peaks]
+        fwhm = self.widths[0]
+        return {
+            "position": positions,
+            "height": properties["peak_heights"],
+            "prominence": properties["prominences"],
+            "fwhm": fwhm,
+            "d_spacing": d_spacing(positions, self.params["wavelength"]),
+            "crystallite_size_nm": scherrer_size(positions, fwhm, self.params["wavelength"],
+                                                 self.params["scherrer_k"], self.params["instrument_broadening"]),
+        }
+
+    @timed_stage
+    def fits(self):
+        """Profile fits of every peak (see fitting.fit_peaks), or None without fit_profile."""
+        if self.params["fit_profile"] is None:
+            return None
+        signal = self.filtered_intensity - self.filtered_baseline
+        return fit_peaks(self.filtered_theta, signal, self.peaks[0], self.params["fit_profile"])
+
+    @timed_stage
+    def fit_table(self):
+        return None if self.fits is None else fit_table(self.fits, self.params)
+
+    @timed_stage
+    def phases(self):
+        """The best-matching reference phases (see phase_table), or None with phase_matches 0."""
+        if not self.params["phase_matches"]:
+            return None
+        return phase_table(self.references, self.peak_table, self.params)
+
+    @property
+    def highest_peak(self):
+        """Index of the highest peak in the peak table, or None without peaks."""
+        heights = self.peak_table["height"]
+        return int(np.argmax(heights)) if len(heights) else None
+
+    def results(self):
+        """JSON-ready results: crystallinity metrics, the highest peak and the peak table."""
+        windows = None
+        if self.params["windows"]:
+            lo, hi = np.array(self.params["windows"]).T
+            windows = (lo, hi, *self.window_areas(lo, hi))
+        # A constant baseline is reported as its level, a curve by its mean
+        return build_results(self.params, self.peak_table, np.mean(self.baseline), *self.areas, windows,
+                             self.fit_table, self.phases)
+
+    def plot_data(self):
+        """Arguments for render.draw_xrd after the figure."""
+        fwhm_line = None
+        top = self.highest_peak
+        if top is not None:
+            fwhm, left, right, half_max = self.widths
+            fwhm_line = (half_max[top], left[top], right[top], fwhm[top])
+        return self.filtered_theta, self.filtered_intensity, self.filtered_baseline, self.peaks[0], fwhm_line
+
+    def render(self, outputs, **options):
+        """Renders the figure into every requested format ({format: path}); options as render.render_xrd."""
+        render_xrd(outputs, *self.plot_data(), timer=self.timer, **options)
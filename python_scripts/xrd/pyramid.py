@@ -0,0 +1,138 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from .scan_io import load_scan, save_binary
+
+def pyramid_path(file_path):
+    """Where the min/max pyramid of an upload lives: a hidden .pyramid.npy file beside it."""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.pyramid.npy")
+
+def level_sizes(n):
+    """Bins per pyramid level for n points: level k (from 1) has ceil(n / 2**k) bins, down to one."""
+    sizes = []
+    while n > 1:
+        n = (n + 1) // 2
+        sizes.append(n)
+    return sizes
+
+def build_levels(intensity):
+    """Index of the minimum and maximum intensity in each bin of every level, as a (2, total) array.
+
+    Level k bins 2**k consecutive points; each level is built from the one
+    below by comparing neighbouring bins, so the whole pyramid costs about
+    2n comparisons and holds about 2n indices. Levels are concatenated from
+    the finest (k = 1) up; level_sizes() gives their lengths.
+    """
+    n = len(intensity)
+    dtype = np.int32 if n < 2**31 else np.int64
+    lowest = highest = np.arange(n, dtype=dtype)
+    levels = []
+    for _ in level_sizes(n):
+        if len(lowest) % 2:
+            # The last bin of an odd level is carried up alone
+            lowest, highest = np.append(lowest, lowest[-1]), np.append(highest, highest[-1])
+        a, b = lowest[0::2], lowest[1::2]
+        lowest = np.where(intensity[b] < intensity[a], b, a)
+        a, b = highest[0::2], highest[1::2]
+        highest = np.where(intensity[b] > intensity[a], b, a)
+        levels.append(np.stack([lowest, highest]))
+    return np.concatenate(levels, axis=1) if levels else np.empty((2, 0), dtype=dtype)
+
+class MinMaxPyramid:
+    """Multi-resolution min/max summary of a scan for serving zoomed and panned views.
+
+    query() returns the points of a 2θ window, or, when there are more than
+    max_points of them, the minimum and maximum of each bin at the finest
+    level that fits. Keeping both extremes of every bin keeps peaks and
+    dips visible at any zoom. A query costs two binary searches plus
+    max_points lookups, whatever the size of the scan. 2θ must be ascending.
+
+        pyramid = open_pyramid("uploads/scan.csv")
+        two_theta, intensity, level = pyramid.query(20, 30, max_points=1000)
+    """
+
+    def __init__(self, two_theta, intensity, levels=None):
+        self.two_theta, self.intensity = two_theta, intensity
+        self.levels = build_levels(intensity) if levels is None else levels
+        self.offsets = np.concatenate(([0], np.cumsum(level_sizes(len(two_theta)))))
+
+    def __len__(self):
+        return len(self.two_theta)
+
+    def query(self, min_theta=None, max_theta=None, max_points=2000):
+        """Points of [min_theta, max_theta] (the whole scan by default), at most max_points of them.
+
+        Returns (two_theta, intensity, level): level 0 is the raw points,
+        level k summarizes bins of 2**k points by their extremes, in 2θ
+        order. At coarse levels the window widens to whole bins, by less
+        than one bin at each end.
+        """
+        if max_points < 2:
+            raise ValueError("max_points must be at least 2")
+        start = 0 if min_theta is None else int(np.searchsorted(self.two_theta, min_theta, "left"))
+        stop = len(self) if max_theta is None else int(np.searchsorted(self.two_theta, max_theta, "right"))
+        if stop - start <= max_points:
+            return self.two_theta[start:stop], self.intensity[start:stop], 0
+
+        level = max(1, int(np.ceil(np.log2((stop - start) / (max_points // 2)))))
+        # Bins straddling the window edges can add one; go up a level when they overflow
+        while 2 * (((stop - 1) >> level) - (start >> level) + 1) > max_points:
+            level += 1
+        first, last = start >> level, ((stop - 1) >> level) + 1
+        offset = self.offsets[level - 1]
+        lowest, highest = self.levels[:, offset + first:offset + last]
+        # Each bin's two extremes in 2θ order, once when they are the same point
+        pairs = np.stack([np.minimum(lowest, highest), np.maximum(lowest, highest)], axis=1).ravel()
+        keep = np.concatenate(([True], pairs[1:] != pairs[:-1]))
+        indices = pairs[keep]
+        return self.two_theta[indices], self.intensity[indices], level
+
+    def save(self, path):
+        save_binary(path, self.levels)
+
+def open_pyramid(file_path):
+    """The pyramid of an upload, built and stored beside it (see pyramid_path) on first use.
+
+    The scan and its pyramid are memory-mapped and kept per path until the
+    upload changes, so a long-lived worker answers repeated queries on the
+    same scan without touching the disk again.
+    """
+    file_path = os.path.abspath(file_path)
+    return _open_pyramid(file_path, os.path.getmtime(file_path))
+
+@lru_cache(maxsize=16)
+def _open_pyramid(file_path, mtime):
+    two_theta, intensity = load_scan(file_path, mmap=True)
+    if np.any(np.diff(two_theta) <= 0):
+        raise ValueError("2theta must be strictly increasing to serve windows of the scan")
+    path = pyramid_path(file_path)
+    try:
+        if os.path.getmtime(path) >= mtime:
+            levels = np.load(path, mmap_mode="r")
+            if levels.shape == (2, sum(level_sizes(len(two_theta)))):
+                return MinMaxPyramid(two_theta, intensity, levels)
+    except (OSError, ValueError):
+        pass
+    pyramid = MinMaxPyramid(two_theta, intensity)
+    try:
+        pyramid.save(path)
+    except OSError:
+        # A read-only upload directory just means rebuilding per worker
+        pass
+    return pyramid
+
+def scan_data(file_path, min_theta=None, max_theta=None, max_points=2000):
+    """JSON-ready points of a 2θ window of an upload, for plotting (see MinMaxPyramid.query)."""
+    pyramid = open_pyramid(file_path)
+    two_theta, intensity, level = pyramid.query(min_theta, max_theta, int(max_points))
+    return {
+        "points": len(two_theta),
+        "total_points": len(pyramid),
+        "level": level,
+        "bin_points": 2 ** level,
+        "two_theta": two_theta.tolist(),
+        "intensity": intensity.tolist(),
+    }
@@ -0,0 +1,184 @@
+import os
+import contextlib
+
+import numpy as np
+
+from .decimate import lttb_indices
+from .scan_io import atomic_write
+from .timing import timed
+
+RENDER_FORMATS = ("png", "pdf", "svg")
+
+# Render modes. full draws every point and labels every peak; preview
+# decimates dense scans to max_points with LTTB (detected peaks are always
+# kept) and labels only the max_labels highest peaks; thumbnail is a small
+# undecorated preview for listing pages. dpi None is matplotlib's default.
+RENDER_MODES = {
+    "full": {"max_points": None, "max_labels": None, "figsize": (10, 6), "dpi": None, "decorate": True},
+    "preview": {"max_points": 2000, "max_labels": 10, "figsize": (10, 6), "dpi": 80, "decorate": True},
+    "thumbnail": {"max_points": 300, "max_labels": 0, "figsize": (3.2, 2), "dpi": 60, "decorate": False},
+}
+
+def render_options(mode="full", dpi=None, figsize=None):
+    """The RENDER_MODES settings of mode, with dpi and figsize ((width, height) in inches) overridden when given."""
+    try:
+        options = dict(RENDER_MODES[mode])
+    except KeyError:
+        raise ValueError(f"Unknown render mode '{mode}' (choose from {', '.join(RENDER_MODES)})") from None
+    if dpi is not None:
+        options["dpi"] = float(dpi)
+    if figsize is not None:
+        options["figsize"] = tuple(float(size) for size in figsize)
+    return options
+
+def output_paths(output_image, output_pdf, formats=("png", "pdf"), output_svg=None):
+    """Maps each requested format to its output file; SVG defaults to the image path with a .svg suffix."""
+    paths = {"png": output_image, "pdf": output_pdf,
+             "svg": output_svg or os.path.splitext(output_image)[0] + ".svg"}
+    unknown = [fmt for fmt in formats if fmt not in RENDER_FORMATS]
+    if unknown:
+        raise ValueError(f"Unsupported output format(s): {', '.join(unknown)}")
+    return {fmt: paths[fmt] for fmt in formats}
+
+def save_plot_data(path, filtered_theta, filtered_intensity, baseline, peaks, fwhm_line):
+    """Writes the arguments of draw_xrd (see XRDAnalysis.plot_data) to a .npz file, to render elsewhere."""
+    with open(path, "wb") as f:
+        np.savez(f, theta=filtered_theta, intensity=filtered_intensity, baseline=baseline, peaks=peaks,
+                 fwhm_line=np.asarray(fwhm_line if fwhm_line is not None else (), dtype=np.float64))
+
+def load_plot_data(path):
+    """The plot data written by save_plot_data, as the tuple render_xrd takes."""
+    with np.load(path) as data:
+        fwhm_line = tuple(data["fwhm_line"]) if len(data["fwhm_line"]) else None
+        return data["theta"], data["intensity"], data["baseline"], data["peaks"], fwhm_line
+
+@contextlib.contextmanager
+def xrd_figure(figsize=(10, 6)):
+    """Yields a standalone Figure and releases it on exit.
+
+    The figure is built with the object-oriented API and never registered with
+    pyplot, so nothing outlives the render in a long-lived worker.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    try:
+        yield fig
+    finally:
+        fig.clear()
+
+def draw_xrd(fig, filtered_theta, filtered_intensity, baseline, peaks, fwhm_line, max_points=None, max_labels=None,
+             decorate=True):
+    """Draws the filtered pattern with baseline, peaks and FWHM onto fig.
+
+    With max_points the line, baseline and fill are drawn through at most
+    about that many LTTB-selected points (plus the peaks); with max_labels
+    only that many of the highest peaks are annotated. Without decorate
+    only the curves and peak markers are drawn, for thumbnails.
+    """
+    if max_points and len(filtered_theta) > max_points:
+        kept = lttb_indices(filtered_theta, filtered_intensity, max_points, keep=peaks)
+        filtered_theta, filtered_intensity, baseline = filtered_theta[kept], filtered_intensity[kept], baseline[kept]
+        peaks = np.searchsorted(kept, peaks)
+
+    ax = fig.add_subplot()
+
+    # Plot the XRD data with the baseline and peaks
+    ax.plot(filtered_theta, filtered_intensity, label='Original XRD Data', color='blue')
+    ax.plot(filtered_theta, baseline, label='Baseline (Amorphous)', color='red', linestyle='--')
+    ax.fill_between(filtered_theta, baseline, filtered_intensity, where=(filtered_intensity > baseline), color='green', alpha=0.3,
+                    label='Crystalline Area')
+
+    # Plot detected peaks as red dots
+    if len(peaks) > 0:
+        ax.scatter(filtered_theta[peaks], filtered_intensity[peaks], color='red', zorder=5, label='Detected Peaks',
+                   s=None if decorate else 6)
+    if not decorate:
+        ax.tick_params(labelsize=6)
+        fig.tight_layout(pad=0.2)
+        return
+
+    if len(peaks) > 0:
+        # Annotate each peak with its x (2θ) and y (intensity) values
+        labelled = peaks
+        if max_labels is not None and len(peaks) > max_labels:
+            labelled = peaks[np.argsort(filtered_intensity[peaks])[::-1][:max_labels]]
+        for peak in labelled:
+            peak_x = filtered_theta[peak]
+            peak_y = filtered_intensity[peak]
+            ax.annotate(f'({peak_x:.2f}, {peak_y:.2f})',
+                        (peak_x, peak_y),
+                        textcoords="offset points",
+                        xytext=(0, 10),
+                        ha='center', color='red', fontsize=9)
+
+        # Display FWHM (Full Width at Half Maximum)
+        half_max, fwhm_left, fwhm_right, fwhm = fwhm_line
+        ax.hlines(y=half_max, xmin=fwhm_left, xmax=fwhm_right, color='purple', linestyle='--',
+                  label=f'FWHM = {fwhm:.2f}°')
+
+    # Add labels and legends
+    ax.set_title('XRD Data with Crystallinity Analysis and Peak Detection')
+    ax.set_xlabel('2θ (degrees)')
+    ax.set_ylabel('Intensity (a.u.)')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+
+def render_xrd(outputs, *plot_data, mode="full", dpi=None, figsize=None, timer=None):
+    """Builds the figure once and saves it in every requested format ({format: path}).
+
+    mode, dpi and figsize select the render settings (see render_options).
+    With a timing.StageTimer, drawing and each savefig are timed ("draw",
+    "savefig_png", ...). Each file is written beside its path and moved into
+    place, so a reader never sees a half-written plot.
+    """
+    options = render_options(mode, dpi, figsize)
+    with xrd_figure(options["figsize"]) as fig:
+        with timed(timer, "draw"):
+            draw_xrd(fig, *plot_data, max_points=options["max_points"], max_labels=options["max_labels"],
+                     decorate=options["decorate"])
+        for fmt, path in outputs.items():
+            with timed(timer, f"savefig_{fmt}"):
+                atomic_write(path, lambda f: fig.savefig(f, format=fmt, dpi=options["dpi"] or "figure"))
+
+def render_comparison(outputs, two_theta, intensities, labels, peaks=None, offset=None, dpi=None, figsize=None,
+                      timer=None):
+    """Draws a stack of patterns on one shared 2θ axis, each offset above the last, and saves every format.
+
+    intensities is (patterns, points); peaks, when given, holds each
+    pattern's peak indices to mark. offset is the vertical step between
+    patterns, by default three quarters of the largest intensity range. All
+    patterns are one LineCollection on one figure, so the figure and its
+    artists are built once however many scans are compared.
+    """
+    from matplotlib import colormaps
+    from matplotlib.collections import LineCollection
+
+    n = len(intensities)
+    if offset is None:
+        offset = 0.75 * float(np.ptp(intensities, axis=1).max()) if intensities.size else 1.0
+    shifted = intensities + offset * np.arange(n)[:, None]
+    colors = colormaps["viridis"](np.linspace(0, 0.9, n))
+    with xrd_figure(figsize or (10, min(4 + 0.5 * n, 20))) as fig:
+        with timed(timer, "draw"):
+            ax = fig.add_subplot()
+            segments = np.stack([np.broadcast_to(two_theta, shifted.shape), shifted], axis=-1)
+            ax.add_collection(LineCollection(segments, colors=colors, linewidths=1))
+            if peaks is not None:
+                rows = np.repeat(np.arange(n), [len(indices) for indices in peaks])
+                columns = np.concatenate([np.asarray(indices, dtype=np.intp) for indices in peaks]) if n else []
+                ax.scatter(two_theta[columns], shifted[rows, columns], color=colors[rows], s=10, zorder=3)
+            for row, label in enumerate(labels):
+                ax.annotate(label, (two_theta[-1], shifted[row, -1]), xytext=(4, 0), textcoords="offset points",
+                            va="center", fontsize=8, color=colors[row])
+            ax.autoscale_view()
+            ax.set_xlim(two_theta[0], two_theta[-1])
+            ax.set_title('XRD Pattern Comparison')
+            ax.set_xlabel('2θ (degrees)')
+            ax.set_ylabel('Intensity (a.u., offset)')
+            ax.grid(True)
+            fig.tight_layout()
+        for fmt, path in outputs.items():
+            with timed(timer, f"savefig_{fmt}"):
+                atomic_write(path, lambda f: fig.savefig(f, format=fmt, dpi=dpi or "figure"))
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from .scan_io import atomic_write
+
+class ResultCache:
+    """Content-addressed cache of XRD analysis results and rendered artifacts.
+
+    Entries are keyed by hash(code version + parameters + file bytes) and live
+    in one directory each under root: result.json plus one artifact per render
+    format. Entry mtimes record last use, and the least recently used entries
+    are evicted whenever the cache grows past max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=500 * 2**20, code_version=""):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.code_version = code_version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, file_path, params):
+        digest = hashlib.sha256()
+        digest.update(self.code_version.encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, key, outputs):
+        """Returns the cached results and copies the cached artifacts to outputs ({format: path}).
+
+        Counts a miss and returns None unless the entry has the results and
+        every requested format.
+        """
+        entry = os.path.join(self.root, key)
+        artifacts = {fmt: os.path.join(entry, f"artifact.{fmt}") for fmt in outputs}
+        try:
+            with open(os.path.join(entry, "result.json"), encoding="utf-8") as f:
+                results = json.load(f)
+            for fmt, path in outputs.items():
+                # Another request may be serving or replacing path meanwhile
+                with open(artifacts[fmt], "rb") as src:
+                    atomic_write(path, lambda f: shutil.copyfileobj(src, f))
+            # Mark the entry as recently used for LRU eviction
+            now = time.time()
+            os.utime(entry, (now, now))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return results
+
+    def put(self, key, results, outputs):
+        """Stores results and copies of the rendered artifacts, then enforces the size bound."""
+        entry = os.path.join(self.root, key)
+        os.makedirs(entry, exist_ok=True)
+        for fmt, path in outputs.items():
+            self._write_atomic(os.path.join(entry, f"artifact.{fmt}"), lambda tmp: shutil.copyfile(path, tmp))
+        self._write_atomic(os.path.join(entry, "result.json"),
+                           lambda tmp: _dump_json(results, tmp))
+        os.utime(entry)
+        self.evict()
+
+    def add_artifacts(self, key, outputs):
+        """Adds artifacts rendered after put() (see process_xrd's output_plot_data) to an entry.
+
+        Does nothing when the entry has been evicted meanwhile.
+        """
+        entry = os.path.join(self.root, key)
+        if not os.path.isdir(entry):
+            return
+        for fmt, path in outputs.items():
+            self._write_atomic(os.path.join(entry, f"artifact.{fmt}"), lambda tmp: shutil.copyfile(path, tmp))
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                entries.append((os.path.getmtime(entry), size, entry))
+            except OSError:
+                continue
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    @staticmethod
+    def _write_atomic(path, write):
+        # Concurrent workers may fill the same entry; readers only ever see complete files
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+def _dump_json(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
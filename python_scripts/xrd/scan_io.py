@@ -0,0 +1,156 @@
+import os
+import csv
+import json
+import tempfile
+
+import numpy as np
+
+from .integrals import cumulative_trapezoid
+from .peaks import sampling_step
+
+REQUIRED_COLUMNS = ("2theta", "intensity")
+
+def binary_cache_path(file_path):
+    """Where the binary copy of an upload lives: a hidden .npy file beside it."""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.npy")
+
+def metadata_path(file_path):
+    """Where the metadata of the binary copy lives: a hidden .json file beside the upload."""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.json")
+
+def load_scan(file_path, use_cache=True, mmap=False, with_integral=False):
+    """Loads a 2theta/intensity scan as two contiguous float64 arrays.
+
+    The first load parses the CSV text and stores a (3, n) .npy copy beside
+    it: 2theta, intensity and the running trapezoid integral of the
+    intensity (see integrals.cumulative_trapezoid). Later loads read that
+    copy and skip text parsing, as long as it is newer than the CSV. With
+    mmap the cached arrays are memory-mapped read-only instead of read into
+    memory: each row of the copy is contiguous, so the arrays are views of
+    the mapping and nothing is copied. with_integral returns the integral as
+    a third array.
+    """
+    cache_path = binary_cache_path(file_path)
+    if use_cache:
+        try:
+            if os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+                data = np.load(cache_path, mmap_mode="r" if mmap else None)
+                # Copies written before the integral was stored have two rows
+                if data.ndim == 2 and len(data) == 3:
+                    return (data[0], data[1], data[2]) if with_integral else (data[0], data[1])
+        except (OSError, ValueError):
+            pass
+
+    two_theta, intensity = parse_scan_csv(file_path)
+    cumulative = cumulative_trapezoid(intensity, two_theta)
+    if use_cache:
+        try:
+            store_scan(file_path, two_theta, intensity, cumulative)
+        except OSError:
+            # A read-only upload directory just means no cache
+            pass
+    return (two_theta, intensity, cumulative) if with_integral else (two_theta, intensity)
+
+def ingest_scan(file_path):
+    """Converts an upload to its binary copy once, when it arrives; returns its metadata.
+
+    Raises ValueError for malformed CSVs, like load_scan.
+    """
+    two_theta, intensity = parse_scan_csv(file_path)
+    return store_scan(file_path, two_theta, intensity, cumulative_trapezoid(intensity, two_theta))
+
+def store_scan(file_path, two_theta, intensity, cumulative):
+    """Writes the (3, n) binary copy of a scan and then its metadata; returns the metadata."""
+    save_binary(binary_cache_path(file_path), np.stack([two_theta, intensity, cumulative]))
+    metadata = scan_metadata(two_theta, intensity)
+    atomic_write(metadata_path(file_path), lambda f: f.write(json.dumps(metadata).encode()))
+    return metadata
+
+def scan_metadata(two_theta, intensity):
+    """What the upload listing shows of a scan without opening it: size, 2theta range and sampling."""
+    step, uniform = sampling_step(two_theta)
+    return {
+        "points": len(two_theta),
+        "columns": ["2theta", "intensity", "integral"],
+        "dtype": "float64",
+        "two_theta_min": float(two_theta.min()) if len(two_theta) else None,
+        "two_theta_max": float(two_theta.max()) if len(two_theta) else None,
+        "step": step,
+        "uniform": uniform,
+        "ascending": bool(np.all(np.diff(two_theta) > 0)),
+        "intensity_max": float(intensity.max()) if len(intensity) else None,
+    }
+
+def ascending(two_theta, intensity):
+    """The scan with 2θ increasing: a scan measured from high to low angle is reversed.
+
+    intensity may be a (patterns, points) stack. Peak selection and window
+    integrals search the 2θ axis, so they need it increasing. Raises
+    ValueError when 2θ runs both ways, e.g. several scans concatenated
+    (stream_xrd.py splits those into frames).
+    """
+    steps = np.diff(two_theta)
+    if np.all(steps >= 0):
+        return two_theta, intensity
+    if np.all(steps <= 0):
+        return two_theta[::-1], intensity[..., ::-1]
+    raise ValueError("2theta must run one way through the scan; analyze multi-frame scans with stream_xrd.py")
+
+def parse_scan_csv(file_path):
+    """Parses the two-column CSV text into float64 arrays.
+
+    Header names are matched case-insensitively after stripping whitespace and
+    a UTF-8 BOM; rows with missing values are dropped. Raises ValueError when
+    the 2theta/intensity columns are missing.
+    """
+    with open(file_path, encoding="utf-8-sig") as f:
+        columns = read_header(f)
+        body_start = f.tell()
+        try:
+            data = np.loadtxt(f, delimiter=",", usecols=columns, dtype=np.float64, ndmin=2)
+        except ValueError:
+            # Empty fields: parse them as NaN and drop those rows
+            f.seek(body_start)
+            data = parse_rows(f, columns)
+    return np.ascontiguousarray(data[:, 0]), np.ascontiguousarray(data[:, 1])
+
+def read_header(f, optional=()):
+    """Reads the header line of an open scan CSV; returns the indices of the 2theta/intensity columns.
+
+    The header is parsed as CSV, so quoted names ("2theta","Intensity") and
+    commas inside quotes work; names are matched case-insensitively without
+    surrounding quotes and whitespace. Each optional column name adds its
+    index, or None when the file lacks it. Raises ValueError when a required
+    column is missing.
+    """
+    fields = next(csv.reader([f.readline()], skipinitialspace=True), [])
+    header = [name.strip().strip("'\"").strip().lower() for name in fields]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError("Missing required columns ('2theta', 'Intensity') in the CSV file. "
+                         f"Available columns: {header}")
+    return tuple(header.index(name) for name in REQUIRED_COLUMNS) + \
+        tuple(header.index(name) if name in header else None for name in optional)
+
+def parse_rows(lines, columns):
+    """Parses CSV rows (a file or a list of lines) into a (rows, columns) float64 array, dropping incomplete rows."""
+    data = np.genfromtxt(lines, delimiter=",", usecols=columns, dtype=np.float64, ndmin=2)
+    return data[~np.isnan(data).any(axis=1)]
+
+def save_binary(path, array):
+    """Writes array to a .npy file atomically, so concurrent readers never see a partial file."""
+    atomic_write(path, lambda f: np.save(f, array))
+
+def atomic_write(path, write):
+    """Calls write(f) on a temporary file beside path, then moves it into place."""
+    # Hidden, so the upload listing never shows it
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+from .pipeline import XRDAnalysis
+
+class AnalysisSessions:
+    """Open XRDAnalysis objects by session id, for interactive parameter tuning.
+
+    A session keeps its scan and every computed stage in memory; each call
+    only changes the parameters, so the next results() recomputes just the
+    stages those parameters feed (see XRDAnalysis.update). At most
+    max_sessions stay open, the least recently used is closed first.
+
+        sessions = AnalysisSessions()
+        analysis, recomputed = sessions.analyze("s1", "scan.csv", theta_distance_deg=0.2)
+        analysis, recomputed = sessions.analyze("s1", "scan.csv", theta_distance_deg=0.5)  # peaks only
+    """
+
+    def __init__(self, max_sessions=16):
+        self.max_sessions = max(1, int(max_sessions))
+        self.sessions = OrderedDict()
+
+    def analyze(self, session_id, file_path, references=None, **params):
+        """Returns (analysis, stages to recompute), opening the session for file_path if needed.
+
+        A session that was closed or evicted, or that now names another file,
+        is reopened from the file, so callers can always send the file with
+        the full parameter set. references is the phases.ReferenceLibrary to
+        match phases against. Raises ValueError for malformed CSVs.
+        """
+        session = self.sessions.get(session_id)
+        if session is not None and session[0] == file_path:
+            self.sessions.move_to_end(session_id)
+            analysis = session[1]
+            recomputed = analysis.update(**params)
+            if analysis.references is not references:
+                analysis.references = references
+                if "phases" in analysis.__dict__:
+                    del analysis.__dict__["phases"]
+                    recomputed.append("phases")
+            return analysis, recomputed
+
+        analysis = XRDAnalysis.from_file(file_path, references, **params)
+        self.sessions[session_id] = (file_path, analysis)
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return analysis, None
+
+    def close(self, session_id):
+        """Drops a session; returns whether it was open."""
+        return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,129 @@
+from functools import cached_property
+
+import numpy as np
+
+from .baseline import estimate_baseline
+from .integrals import cumulative_trapezoid, window_integral
+from .peaks import find_xrd_peaks, stacked_peak_fwhm, d_spacing, scherrer_size
+from .fitting import fit_peaks
+from .pipeline import build_results, fit_table, normalize_params, phase_table
+from .scan_io import ascending
+
+class StackedAnalysis:
+    """Many patterns on one shared 2θ axis, analyzed together.
+
+    intensities is a (patterns, points) array. Windowing, baselines,
+    integrals and FWHM run as array operations over the whole stack; only
+    peak picking loops over the patterns. results() gives the same list of
+    dicts as XRDAnalysis(two_theta, row).results() for every row. A
+    descending axis is reversed, as in XRDAnalysis.
+
+        stack = StackedAnalysis(two_theta, intensities, baseline_method="rolling")
+        [row["percent_crystallinity"] for row in stack.results()]
+    """
+
+    def __init__(self, two_theta, intensities, references=None, **params):
+        two_theta, intensities = np.asarray(two_theta), np.atleast_2d(intensities)
+        if intensities.shape[1] != len(two_theta):
+            raise ValueError(f"intensities has {intensities.shape[1]} points per pattern, "
+                             f"two_theta has {len(two_theta)}")
+        two_theta, intensities = ascending(two_theta, intensities)
+        self.two_theta = np.ascontiguousarray(two_theta, dtype=np.float64)
+        self.intensities = np.ascontiguousarray(intensities, dtype=np.float64)
+        self.references = references
+        self.params = normalize_params(**params)
+
+    def __len__(self):
+        return len(self.intensities)
+
+    @cached_property
+    def baseline(self):
+        return estimate_baseline(self.two_theta, self.intensities, self.params["baseline_method"],
+                                 **self.params["baseline_options"])
+
+    @cached_property
+    def above_baseline(self):
+        return np.clip(self.intensities - self.baseline, 0, None)
+
+    @cached_property
+    def total_integral(self):
+        return cumulative_trapezoid(self.intensities, self.two_theta)
+
+    @cached_property
+    def crystalline_integral(self):
+        return cumulative_trapezoid(self.above_baseline, self.two_theta)
+
+    @cached_property
+    def window(self):
+        return (self.two_theta >= self.params["min_theta"]) & (self.two_theta <= self.params["max_theta"])
+
+    @cached_property
+    def filtered_theta(self):
+        return self.two_theta[self.window]
+
+    @cached_property
+    def filtered_intensities(self):
+        return self.intensities[:, self.window]
+
+    @cached_property
+    def peaks(self):
+        """Per-pattern (indices into the window, find_peaks properties)."""
+        return [find_xrd_peaks(self.filtered_theta, row, self.params["min_intensity"],
+                               prominence=self.params["prominence"], distance=self.params["theta_distance_deg"],
+                               min_width=self.params["min_width"], distance_samples=self.params["theta_distance"])
+                for row in self.filtered_intensities]
+
+    @cached_property
+    def peak_tables(self):
+        """Per-pattern peak tables (see PEAK_COLUMNS), computed on all peaks of the stack at once."""
+        indices = [peaks for peaks, _ in self.peaks]
+        heights = [properties["peak_heights"] for _, properties in self.peaks]
+        fwhm = stacked_peak_fwhm(self.filtered_theta, self.filtered_intensities, indices,
+                                 self.baseline[:, self.window])[0]
+        positions = self.filtered_theta[np.concatenate(indices)] if indices else np.empty(0)
+        columns = {
+            "position": positions,
+            "height": np.concatenate(heights) if heights else np.empty(0),
+            "prominence": np.concatenate([properties["prominences"] for _, properties in self.peaks])
+                          if self.peaks else np.empty(0),
+            "fwhm": fwhm,
+            "d_spacing": d_spacing(positions, self.params["wavelength"]),
+            "crystallite_size_nm": scherrer_size(positions, fwhm, self.params["wavelength"],
+                                                 self.params["scherrer_k"], self.params["instrument_broadening"]),
+        }
+        # Back into one table per pattern
+        splits = np.cumsum([len(pattern) for pattern in indices])[:-1]
+        split_columns = {name: np.split(values, splits) for name, values in columns.items()}
+        return [{name: split_columns[name][row] for name in columns} for row in range(len(self))]
+
+    @cached_property
+    def fit_tables(self):
+        """Per-pattern profile fits (one fit_peaks call per pattern), or None without fit_profile."""
+        if self.params["fit_profile"] is None:
+            return None
+        signals = self.filtered_intensities - self.baseline[:, self.window]
+        return [fit_table(fit_peaks(self.filtered_theta, signal, peaks, self.params["fit_profile"]), self.params)
+                for signal, (peaks, _) in zip(signals, self.peaks)]
+
+    @cached_property
+    def phase_tables(self):
+        """Per-pattern phase matches against references, or None without phase_matches."""
+        if not self.params["phase_matches"]:
+            return None
+        return [phase_table(self.references, table, self.params) for table in self.peak_tables]
+
+    def results(self):
+        """A JSON-ready results dict per pattern, as XRDAnalysis.results()."""
+        total_areas = self.total_integral[:, -1]
+        crystalline_areas = self.crystalline_integral[:, -1]
+        baselines = np.mean(self.baseline, axis=1)
+        windows = None
+        if self.params["windows"]:
+            lo, hi = np.array(self.params["windows"]).T
+            windows = (lo, hi, window_integral(self.two_theta, self.intensities, self.total_integral, lo, hi),
+                       window_integral(self.two_theta, self.above_baseline, self.crystalline_integral, lo, hi))
+        return [build_results(self.params, table, baselines[row], total_areas[row], crystalline_areas[row],
+                              None if windows is None else (lo, hi, windows[2][row], windows[3][row]),
+                              None if self.fit_tables is None else self.fit_tables[row],
+                              None if self.phase_tables is None else self.phase_tables[row])
+                for row, table in enumerate(self.peak_tables)]
@@ -0,0 +1,83 @@
+import itertools
+
+import numpy as np
+
+from .scan_io import read_header, parse_rows
+from .pipeline import XRDAnalysis, normalize_params
+
+# Optional column numbering the frames of a multi-frame export
+FRAME_COLUMN = "frame"
+
+def read_chunks(file_path, chunk_rows=100_000):
+    """Yields (frames, two_theta, intensity) arrays of at most chunk_rows rows from a scan CSV.
+
+    Only one chunk of text and arrays is held at a time. frames holds the
+    frame column, or is None when the file has none.
+    """
+    with open(file_path, encoding="utf-8-sig") as f:
+        columns = read_header(f, optional=(FRAME_COLUMN,))
+        columns = tuple(column for column in columns if column is not None)
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            try:
+                data = np.loadtxt(lines, delimiter=",", usecols=columns, dtype=np.float64, ndmin=2)
+            except ValueError:
+                data = parse_rows(lines, columns)
+            if len(data):
+                yield (data[:, 2] if len(columns) == 3 else None), data[:, 0], data[:, 1]
+
+def iter_frames(file_path, chunk_rows=100_000):
+    """Yields (frame_id, two_theta, intensity) for each frame of a scan CSV, reading it in chunks.
+
+    A new frame starts where the frame column changes or, without one, where
+    2θ stops increasing (concatenated scans). Memory is bounded by one frame
+    plus one chunk, however many frames the file holds; frame_id is the
+    frame column's value, or None.
+    """
+    pieces, frame_id, previous = [], None, None
+    for frames, two_theta, intensity in read_chunks(file_path, chunk_rows):
+        key = two_theta if frames is None else frames
+        before = np.concatenate(([key[0] if previous is None else previous], key[:-1]))
+        starts = np.flatnonzero(key <= before if frames is None else key != before)
+        if previous is None and frames is not None:
+            frame_id = frames[0]
+        previous = key[-1]
+
+        cut = 0
+        for start in itertools.chain(starts, [len(key)]):
+            if start > cut:
+                pieces.append((two_theta[cut:start], intensity[cut:start]))
+            if start < len(key):
+                if pieces:
+                    yield frame_id, *_join(pieces)
+                pieces = []
+                frame_id = None if frames is None else frames[start]
+            cut = start
+    if pieces:
+        yield frame_id, *_join(pieces)
+
+def _join(pieces):
+    return (np.concatenate([two_theta for two_theta, _ in pieces]),
+            np.concatenate([intensity for _, intensity in pieces]))
+
+def analyze_frames(frames, references=None, **params):
+    """Analyzes (frame_id, two_theta, intensity) frames one at a time; yields a record per frame.
+
+    Records are {"frame", "frame_id", "n_points", "status", "results"} (or
+    "error" in place of "results"), produced as each frame finishes, so the
+    caller can stream them out while later frames are still being read.
+    references is the phases.ReferenceLibrary for phase_matches. Unknown
+    parameters raise TypeError before the first frame is read.
+    """
+    params = normalize_params(**params)
+    for index, (frame_id, two_theta, intensity) in enumerate(frames):
+        record = {"frame": index, "frame_id": None if frame_id is None else float(frame_id),
+                  "n_points": len(two_theta)}
+        try:
+            results = XRDAnalysis(two_theta, intensity, references=references, **params).results()
+        except Exception as exc:
+            yield dict(record, status="error", error=f"{type(exc).__name__}: {exc}")
+            continue
+        yield dict(record, status="ok", results=results)
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import contextlib
+from functools import cached_property
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """Peak resident set size of this process over its whole life in MB, or None where the platform doesn't report it.
+
+    This is a high-water mark: in a long-lived worker it only ever grows,
+    so it says nothing about the job that is running now on its own.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def rss_mb():
+    """Resident set size of this process right now in MB (the lifetime peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+class StageTimer:
+    """Wall and CPU time per named stage of one analysis.
+
+    Stages nest: time spent in an inner stage is charged to it, not to the
+    stage around it, so the stage times add up to the time measured overall.
+    A stage entered again (e.g. savefig once per format) accumulates.
+    The report carries the process-lifetime peak RSS and how much it rose
+    while this timer was in use (0 when the job stayed under an earlier peak).
+
+        timer = StageTimer()
+        with timer.stage("load"):
+            ...
+        timer.report()  # {"stages": {"load": {"wall_ms": ..., "cpu_ms": ..., "calls": 1}}, ...}
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._open = []
+        self._start_peak_rss_mb = peak_rss_mb()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # [wall, cpu] spent in nested stages, subtracted from this one
+        inner = [0.0, 0.0]
+        self._open.append(inner)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._open.pop()
+            if self._open:
+                self._open[-1][0] += wall
+                self._open[-1][1] += cpu
+            totals = self.stages.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0, "calls": 0})
+            totals["wall_ms"] += (wall - inner[0]) * 1000
+            totals["cpu_ms"] += (cpu - inner[1]) * 1000
+            totals["calls"] += 1
+
+    def report(self):
+        """JSON-ready stage times in ms (in the order first entered), their totals and the RSS figures."""
+        peak = peak_rss_mb()
+        return {
+            "stages": {name: dict(totals) for name, totals in self.stages.items()},
+            "wall_ms": sum(totals["wall_ms"] for totals in self.stages.values()),
+            "cpu_ms": sum(totals["cpu_ms"] for totals in self.stages.values()),
+            "process_peak_rss_mb": peak,
+            "peak_rss_growth_mb": None if peak is None else peak - self._start_peak_rss_mb,
+        }
+
+def timed(timer, name):
+    """timer.stage(name), or a no-op context when timer is None."""
+    return contextlib.nullcontext() if timer is None else timer.stage(name)
+
+class timed_stage(cached_property):
+    """cached_property whose first computation is timed under the owner's timer attribute, when set."""
+
+    def __get__(self, instance, owner=None):
+        if instance is None or self.attrname in instance.__dict__:
+            return super().__get__(instance, owner)
+        with timed(getattr(instance, "timer", None), self.attrname):
+            return super().__get__(instance, owner)